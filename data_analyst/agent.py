@@ -24,11 +24,13 @@ from google.genai import types
 
 from google.adk.agents import Agent
 from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.readonly_context import ReadonlyContext
 from google.adk.tools import load_artifacts
 
 from .sub_agents import bqml_agent
 from .sub_agents.bigquery.tools import (
     get_database_settings as get_bq_database_settings,
+    get_linked_schema as get_bq_linked_schema,
 )
 from .prompts import return_instructions_root
 from .tools import call_db_agent, call_ds_agent, call_search_agent, call_rag_agent
@@ -45,26 +47,41 @@ def setup_before_agent_call(callback_context: CallbackContext):
         db_settings["use_database"] = "BigQuery"
         callback_context.state["all_db_settings"] = db_settings
 
-    # setting up schema in instruction
+    # setting up the schema of the instruction in session.state
     if callback_context.state["all_db_settings"]["use_database"] == "BigQuery":
         callback_context.state["database_settings"] = get_bq_database_settings()
-        schema = callback_context.state["database_settings"]["bq_ddl_schema"]
+        question = ""
+        if callback_context.user_content and callback_context.user_content.parts:
+            question = " ".join(
+                part.text for part in callback_context.user_content.parts if part.text
+            )
+        # The schema linked to this session's question is kept in its state:
+        # the agent object, and hence its instruction, is shared by all sessions.
+        callback_context.state["linked_schema"] = get_bq_linked_schema(
+            question, callback_context.state["database_settings"]
+        )
+
 
-        callback_context._invocation_context.agent.instruction = (
-            return_instructions_root()
-            + f"""
+def root_instruction(context: ReadonlyContext) -> str:
+    """Returns the root agent instruction with the session's linked schema."""
+    schema = context.state.get("linked_schema")
+    if schema is None:
+        return return_instructions_root()
+    return (
+        return_instructions_root()
+        + f"""
 
     --------- The BigQuery schema of the relevant data with a few sample rows. ---------
     {schema}
 
     """
-        )
+    )
 
 
 root_agent = Agent(
     model=os.getenv("ROOT_AGENT_MODEL"),
     name="data_analyst",
-    instruction=return_instructions_root(),
+    instruction=root_instruction,
     global_instruction=(
         f"""
         You are a Data Science and Data Analytics Multi Agent System with web search and knowledge retrieval capabilities.
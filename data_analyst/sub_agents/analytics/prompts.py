@@ -75,6 +75,8 @@ def return_instructions_ds() -> str:
 
   **Available files:** Only use the files that are available as specified in the list of available files.
 
+  **Data files:** The input data of a query is usually given as a file, with its columns, row count and first rows in the prompt. Load the whole file into a pandas DataFrame and analyze that; the rows in the prompt are only a preview. NEVER edit the data that are given to you.
+
   **Data in prompt:** Some queries contain the input data directly in the prompt. You have to parse that data into a pandas DataFrame. ALWAYS parse all the data. NEVER edit the data that are given to you.
 
   **Answerability:** Some queries may not be answerable with the available data. In those cases, inform the user why you cannot process their query and suggest what type of data would be needed to fulfill their request.
@@ -20,7 +20,7 @@ from google.adk.agents import Agent
 from google.adk.agents.callback_context import CallbackContext
 from google.genai import types
 
-from . import tools
+from . import async_tools, tools
 from .chase_sql import chase_db_tools
 from .prompts import return_instructions_bigquery
 
@@ -39,14 +39,25 @@ database_agent = Agent(
     model=os.getenv("BIGQUERY_AGENT_MODEL"),
     name="database_agent",
     instruction=return_instructions_bigquery(),
-    tools=[
-        (
-            chase_db_tools.initial_bq_nl2sql
-            if NL2SQL_METHOD == "CHASE"
-            else tools.initial_bq_nl2sql
-        ),
-        tools.run_bigquery_validation,
-    ],
+    tools=(
+        [
+            (
+                async_tools.chase_initial_bq_nl2sql
+                if NL2SQL_METHOD == "CHASE"
+                else async_tools.initial_bq_nl2sql
+            ),
+            async_tools.run_bigquery_validation,
+        ]
+        if async_tools.BQ_ASYNC_TOOLS
+        else [
+            (
+                chase_db_tools.initial_bq_nl2sql
+                if NL2SQL_METHOD == "CHASE"
+                else tools.initial_bq_nl2sql
+            ),
+            tools.run_bigquery_validation,
+        ]
+    ),
     before_agent_callback=setup_before_agent_call,
     generate_content_config=types.GenerateContentConfig(temperature=0.01),
 )
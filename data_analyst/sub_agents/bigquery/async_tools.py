@@ -0,0 +1,150 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Asynchronous variants of the database agent tools.
+
+ADK runs tools on its asyncio event loop, so a synchronous tool that waits for
+a BigQuery job or an LLM call stalls every other session served by the same
+process. The tools below keep the names, arguments, docstrings and results of
+their synchronous counterparts, which the agent prompts refer to, but run the
+blocking work on a bounded thread pool and await it. The ChaseSQL tool awaits
+its Gemini calls natively instead, so that candidate generation does not hold
+a pool thread for the whole round trip.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from google.adk.tools import ToolContext
+
+from . import tools
+from .chase_sql import chase_db_tools
+from .query_policy import session_cancelled
+
+# Whether the agents register these tools instead of the synchronous ones.
+BQ_ASYNC_TOOLS = os.getenv("BQ_ASYNC_TOOLS", "1") == "1"
+# Maximum number of blocking tool calls running at once in this process.
+BQ_ASYNC_MAX_WORKERS = int(os.getenv("BQ_ASYNC_MAX_WORKERS", "16"))
+# Maximum number of quick job control calls, such as status polls and cancels,
+# running at once in this process.
+BQ_ASYNC_CONTROL_WORKERS = int(os.getenv("BQ_ASYNC_CONTROL_WORKERS", "4"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=BQ_ASYNC_MAX_WORKERS, thread_name_prefix="bigquery_tools"
+)
+# Kept apart from `_executor`, so that a control call never waits behind the
+# long-running calls, e.g. the cancel of a job that a pool thread waits for.
+_control_executor = ThreadPoolExecutor(
+    max_workers=BQ_ASYNC_CONTROL_WORKERS, thread_name_prefix="bigquery_control"
+)
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Runs a blocking function on the tool thread pool and awaits its result.
+
+    If the awaiting task is cancelled, e.g. because the session ended, the
+    `query_policy.session_cancelled` event seen by the function is set, so
+    that it can cancel its BigQuery job rather than let it run to completion.
+    """
+    loop = asyncio.get_running_loop()
+    cancelled = threading.Event()
+    context = contextvars.copy_context()
+    context.run(session_cancelled.set, cancelled)
+    try:
+        return await loop.run_in_executor(
+            _executor, context.run, functools.partial(func, *args, **kwargs)
+        )
+    except asyncio.CancelledError:
+        cancelled.set()
+        raise
+
+
+async def run_control(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Runs a quick job control call on the control thread pool and awaits it.
+
+    This is for single API requests about a job, such as polling its status
+    or cancelling it, as opposed to waiting for it or reading its results.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _control_executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+def run_detached(func: Callable[..., Any], *args, **kwargs) -> None:
+    """Runs a quick call on the control thread pool without awaiting it.
+
+    This is for clean-up, such as cancelling a job, in a task that is being
+    cancelled: the cancellation is not delayed, and the event loop is not
+    blocked, by the call. Failures are logged.
+    """
+
+    def log_failure(future):
+        if not future.cancelled() and future.exception() is not None:
+            logging.warning(
+                "%s failed: %s",
+                getattr(func, "__qualname__", func),
+                future.exception(),
+            )
+
+    _control_executor.submit(func, *args, **kwargs).add_done_callback(log_failure)
+
+
+def to_async_tool(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Wraps a blocking tool into a coroutine function.
+
+    The wrapper keeps the name, signature and docstring of `func`, so ADK
+    declares the same tool to the model.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_blocking(func, *args, **kwargs)
+
+    return wrapper
+
+
+initial_bq_nl2sql = to_async_tool(tools.initial_bq_nl2sql)
+run_bigquery_validation = to_async_tool(tools.run_bigquery_validation)
+
+
+# Declared to the model with the name and docstring of the synchronous tool.
+@functools.wraps(chase_db_tools.initial_bq_nl2sql)
+async def chase_initial_bq_nl2sql(question: str, tool_context: ToolContext) -> str:
+    print("****** Running agent with ChaseSQL algorithm.")
+    # The cache lookup, schema linking and context cache may call BigQuery or
+    # Vertex AI synchronously, so they run on the pool.
+    sql, generation_model, requests = await run_blocking(
+        chase_db_tools.prepare_generation, question, tool_context
+    )
+    if sql is not None:
+        return sql
+    responses = await generation_model.call_many(
+        requests, parser_func=chase_db_tools.parse_response
+    )
+    # Take just the first response.
+    sql = responses[0]
+
+    translator, translate_kwargs = await run_blocking(
+        chase_db_tools.prepare_translation, tool_context
+    )
+    if translator is not None:
+        sql = await translator.translate_async(sql, **translate_kwargs)
+    return sql
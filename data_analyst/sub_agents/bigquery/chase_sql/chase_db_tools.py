@@ -19,7 +19,14 @@ import os
 
 from google.adk.tools import ToolContext
 
+from ..tools import (
+    get_cached_sql,
+    get_linked_schema,
+    get_schema_columns,
+    get_value_hints,
+)
 # pylint: disable=g-importing-member
+from .context_cache import CHASE_CONTEXT_CACHE, context_cache_manager, split_prompt
 from .dc_prompt_template import DC_PROMPT_TEMPLATE
 from .llm_utils import GeminiModel
 from .qp_prompt_template import QP_PROMPT_TEMPLATE
@@ -79,69 +86,132 @@ def parse_response(response: str) -> str:
     return query.strip()
 
 
-def initial_bq_nl2sql(
-    question: str,
-    tool_context: ToolContext,
-) -> str:
-    """Generates an initial SQL query from a natural language question.
+def prepare_generation(
+    question: str, tool_context: ToolContext
+) -> tuple[str | None, GeminiModel | None, list[str]]:
+    """Looks up cached SQL, or builds the prompts generating SQL candidates.
 
     Args:
       question: Natural language question.
       tool_context: Function context.
 
     Returns:
-      str: An SQL statement to answer this question.
+      The cached SQL, or None on a miss; then the model and the prompts that
+      generate the candidates.
     """
-    print("****** Running agent with ChaseSQL algorithm.")
-    ddl_schema = tool_context.state["database_settings"]["bq_ddl_schema"]
-    project = tool_context.state["database_settings"]["bq_project_id"]
-    db = tool_context.state["database_settings"]["bq_dataset_id"]
-    transpile_to_bigquery = tool_context.state["database_settings"][
-        "transpile_to_bigquery"
-    ]
-    process_input_errors = tool_context.state["database_settings"][
-        "process_input_errors"
-    ]
-    process_tool_output_errors = tool_context.state["database_settings"][
-        "process_tool_output_errors"
-    ]
+    chase_settings = {
+        key: tool_context.state["database_settings"][key]
+        for key in (
+            "transpile_to_bigquery",
+            "number_of_candidates",
+            "model",
+            "temperature",
+            "generate_sql_type",
+        )
+    }
+    sql = get_cached_sql(question, tool_context, {"method": "CHASE", **chase_settings})
+    if sql is not None:
+        return sql, None, []
+    # Only the part of the schema relevant to the question goes into the prompt,
+    # followed by the stored values matching the question's literals.
+    linked_schema = get_linked_schema(question, tool_context.state["database_settings"])
+    value_hints = get_value_hints(question)
+    ddl_schema = linked_schema + value_hints
     number_of_candidates = tool_context.state["database_settings"][
         "number_of_candidates"
     ]
-    model = tool_context.state["database_settings"]["model"]
+    model_name = tool_context.state["database_settings"]["model"]
     temperature = tool_context.state["database_settings"]["temperature"]
     generate_sql_type = tool_context.state["database_settings"]["generate_sql_type"]
 
     if generate_sql_type == GenerateSQLType.DC.value:
-        prompt = DC_PROMPT_TEMPLATE.format(
-            SCHEMA=ddl_schema, QUESTION=question, BQ_PROJECT_ID=BQ_PROJECT_ID
-        )
+        prompt_template = DC_PROMPT_TEMPLATE
     elif generate_sql_type == GenerateSQLType.QP.value:
-        prompt = QP_PROMPT_TEMPLATE.format(
-            SCHEMA=ddl_schema, QUESTION=question, BQ_PROJECT_ID=BQ_PROJECT_ID
-        )
+        prompt_template = QP_PROMPT_TEMPLATE
     else:
         raise ValueError(f"Unsupported generate_sql_type: {generate_sql_type}")
-
-    model = GeminiModel(model_name=model, temperature=temperature)
+    prompt = prompt_template.format(
+        SCHEMA=ddl_schema, QUESTION=question, BQ_PROJECT_ID=BQ_PROJECT_ID
+    )
+
+    generation_model = GeminiModel(model_name=model_name, temperature=temperature)
+    # The instructions, examples and full schema are the same for every
+    # question, so they are served from a context cache and only the question
+    # is sent. A question-specific (linked) schema cannot be cached.
+    full_schema = tool_context.state["database_settings"]["bq_ddl_schema"]
+    if CHASE_CONTEXT_CACHE and linked_schema == full_schema:
+        prefix, suffix = split_prompt(
+            prompt_template,
+            question + value_hints,
+            SCHEMA=full_schema,
+            BQ_PROJECT_ID=BQ_PROJECT_ID,
+        )
+        cache_name = context_cache_manager.get_cache_name(model_name, prefix)
+        if cache_name is not None:
+            generation_model = GeminiModel(
+                model_name=model_name, temperature=temperature, cache_name=cache_name
+            )
+            prompt = suffix
     requests = [prompt for _ in range(number_of_candidates)]
-    responses = model.call_parallel(requests, parser_func=parse_response)
+    return None, generation_model, requests
+
+
+def prepare_translation(
+    tool_context: ToolContext,
+) -> tuple[sql_translator.SqlTranslator | None, dict]:
+    """Builds the translator post-processing the generated SQL, if enabled.
+
+    Args:
+      tool_context: Function context.
+
+    Returns:
+      The translator, or None if the SQL is not transpiled to BigQuery; then
+      the keyword arguments of its `translate` method other than the SQL.
+    """
+    settings = tool_context.state["database_settings"]
+    if not settings["transpile_to_bigquery"]:
+        return None, {}
+    translator = sql_translator.SqlTranslator(
+        model=GeminiModel(
+            model_name=settings["model"], temperature=settings["temperature"]
+        ),
+        temperature=settings["temperature"],
+        process_input_errors=settings["process_input_errors"],
+        process_tool_output_errors=settings["process_tool_output_errors"],
+    )
+    # The translator checks the SQL against the columns of every table.
+    return translator, {
+        "ddl_schema": get_schema_columns(),
+        "db": settings["bq_dataset_id"],
+        "catalog": settings["bq_project_id"],
+    }
+
+
+def initial_bq_nl2sql(
+    question: str,
+    tool_context: ToolContext,
+) -> str:
+    """Generates an initial SQL query from a natural language question.
+
+    Args:
+      question: Natural language question.
+      tool_context: Function context.
+
+    Returns:
+      str: An SQL statement to answer this question.
+    """
+    print("****** Running agent with ChaseSQL algorithm.")
+    sql, generation_model, requests = prepare_generation(question, tool_context)
+    if sql is not None:
+        return sql
+    responses = generation_model.call_parallel(requests, parser_func=parse_response)
     # Take just the first response.
     responses = responses[0]
 
     # If postprocessing of the SQL to transpile it to BigQuery is required,
     # then do it here.
-    if transpile_to_bigquery:
-        translator = sql_translator.SqlTranslator(
-            model=model,
-            temperature=temperature,
-            process_input_errors=process_input_errors,
-            process_tool_output_errors=process_tool_output_errors,
-        )
-        # pylint: disable=g-bad-todo
-        # pylint: enable=g-bad-todo
-        responses: str = translator.translate(
-            responses, ddl_schema=ddl_schema, db=db, catalog=project
-        )
+    translator, translate_kwargs = prepare_translation(tool_context)
+    if translator is not None:
+        responses: str = translator.translate(responses, **translate_kwargs)
 
     return responses
@@ -0,0 +1,176 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Vertex AI context caching of the static ChaseSQL prompt prefix.
+
+The DC and QP prompts start with several thousand tokens of instructions and
+examples followed by the schema; only the question at the end changes between
+calls. That prefix is stored once as a `CachedContent`, so that each call only
+sends, and is only billed in full for, the question.
+"""
+
+import datetime
+import hashlib
+import logging
+import os
+import threading
+
+from vertexai.preview import caching
+from vertexai.preview.generative_models import Content, Part
+
+# Whether the ChaseSQL prompt prefix is served from a Vertex AI context cache.
+CHASE_CONTEXT_CACHE = os.getenv("CHASE_CONTEXT_CACHE", "0") == "1"
+# Lifetime of a cached prefix. It is extended while the prefix is in use.
+CHASE_CONTEXT_CACHE_TTL_SECONDS = int(
+    os.getenv("CHASE_CONTEXT_CACHE_TTL_SECONDS", "3600")
+)
+
+# Remaining lifetime of a replaced prefix, for the calls still using it.
+_REPLACED_CACHE_TTL_SECONDS = 120
+
+# Marks where the question goes when a prompt is split into prefix and suffix.
+_QUESTION_MARKER = "\x00QUESTION\x00"
+
+
+def split_prompt(template: str, question: str, **kwargs: str) -> tuple[str, str]:
+    """Formats a prompt template into its static prefix and question suffix.
+
+    Args:
+      template: A prompt template with a `{QUESTION}` placeholder.
+      question: The question.
+      **kwargs: The other placeholders of the template.
+
+    Returns:
+      The text before the question, and the question with the rest of the
+      prompt. Together they are the formatted prompt.
+    """
+    prompt = template.format(QUESTION=_QUESTION_MARKER, **kwargs)
+    prefix, suffix = prompt.split(_QUESTION_MARKER, 1)
+    return prefix, question + suffix
+
+
+class ContextCacheManager:
+    """Creates, extends and replaces the cached prompt prefix of each model.
+
+    A model has at most one cached prefix: a different prefix, e.g. after a
+    schema refresh, replaces the previous one, which then expires shortly,
+    once the calls still using it are done.
+
+    The lock only guards the bookkeeping. Vertex AI is called outside of it,
+    by one thread per model at a time; meanwhile other callers use the
+    current cache, or send the prompt in full while a cache is being created.
+
+    Attributes:
+      ttl_seconds: The lifetime of a cached prefix after its last extension.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        """Initializes a manager without cached prefixes."""
+        self.ttl_seconds = ttl_seconds
+        # model name -> (prefix digest, CachedContent, expire time).
+        self._caches = {}
+        # Models whose cache is being created or extended.
+        self._updating = set()
+        self._lock = threading.Lock()
+
+    def get_cache_name(self, model_name: str, prefix: str) -> str | None:
+        """Returns the name of the context cache holding a prompt prefix.
+
+        The cache is created on first use and its TTL is extended once less
+        than half of it is left, so that a prefix in use does not expire.
+
+        Args:
+          model_name: The model the cache is used with.
+          prefix: The static start of the prompt.
+
+        Returns:
+          The resource name of the `CachedContent`, or None if it could not be
+          created, e.g. because the prefix is shorter than the minimum size of
+          a context cache, or is being created by another call. The prompt
+          should then be sent in full.
+        """
+        digest = hashlib.sha256(prefix.encode()).hexdigest()
+        ttl = datetime.timedelta(seconds=self.ttl_seconds)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        with self._lock:
+            current = self._caches.get(model_name)
+            if current is not None and current[0] == digest and current[2] > now:
+                _, cached_content, expire_time = current
+                if cached_content is None:
+                    # Creating it failed; the TTL also delays the next attempt.
+                    return None
+                if expire_time - now >= ttl / 2 or model_name in self._updating:
+                    return cached_content.resource_name
+            elif model_name in self._updating:
+                return None
+            self._updating.add(model_name)
+
+        try:
+            if current is not None and current[0] == digest and current[2] > now:
+                self._extend(model_name, current, ttl, now)
+                return current[1].resource_name
+            if current is not None and current[1] is not None:
+                self._expire_soon(current[1])
+            return self._create(model_name, prefix, digest, ttl, now)
+        finally:
+            with self._lock:
+                self._updating.discard(model_name)
+
+    def _extend(self, model_name, current, ttl, now) -> None:
+        """Extends the TTL of a model's cache, logging failures."""
+        digest, cached_content, _ = current
+        try:
+            cached_content.update(ttl=ttl)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.warning("Extending the context cache failed: %s", e)
+            return
+        with self._lock:
+            if self._caches.get(model_name) is current:
+                self._caches[model_name] = (digest, cached_content, now + ttl)
+
+    def _create(self, model_name, prefix, digest, ttl, now) -> str | None:
+        """Creates the cache of a prompt prefix and makes it the model's."""
+        try:
+            cached_content = caching.CachedContent.create(
+                model_name=model_name,
+                contents=[Content(role="user", parts=[Part.from_text(prefix)])],
+                ttl=ttl,
+                display_name=f"chase-sql-prefix-{digest[:12]}",
+            )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.warning("Creating the context cache failed: %s", e)
+            with self._lock:
+                self._caches[model_name] = (digest, None, now + ttl)
+            return None
+        with self._lock:
+            self._caches[model_name] = (digest, cached_content, now + ttl)
+        logging.info(
+            "Created context cache %s for %s.",
+            cached_content.resource_name,
+            model_name,
+        )
+        return cached_content.resource_name
+
+    @staticmethod
+    def _expire_soon(cached_content) -> None:
+        """Shortens the TTL of a replaced prefix, logging failures."""
+        try:
+            cached_content.update(
+                ttl=datetime.timedelta(seconds=_REPLACED_CACHE_TTL_SECONDS)
+            )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.warning("Expiring the replaced context cache failed: %s", e)
+
+
+context_cache_manager = ContextCacheManager(CHASE_CONTEXT_CACHE_TTL_SECONDS)
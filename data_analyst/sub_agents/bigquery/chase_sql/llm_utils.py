@@ -14,10 +14,12 @@
 
 """This code contains the LLM utils for the CHASE-SQL Agent."""
 
-import functools
+import asyncio
 import os
 import random
+import threading
 import time
+import weakref
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Callable, List, Optional
 
@@ -29,6 +31,9 @@ from vertexai.generative_models import (GenerationConfig, HarmBlockThreshold,
 from vertexai.preview import caching
 from vertexai.preview.generative_models import GenerativeModel
 
+from ..schema_renderer import estimate_tokens
+from .retry_policy import RetryPolicy, llm_retry_policy
+
 dotenv.load_dotenv(override=True)
 
 SAFETY_FILTER_CONFIG = {
@@ -42,6 +47,14 @@ SAFETY_FILTER_CONFIG = {
 GCP_PROJECT = os.getenv("GOOGLE_CLOUD_PROJECT")
 GCP_LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION")
 
+# Maximum number of Gemini calls in flight in this process, across all models:
+# on the shared thread pool, and likewise per event loop for the async API.
+CHASE_LLM_MAX_WORKERS = int(os.getenv("CHASE_LLM_MAX_WORKERS", "16"))
+# Request and estimated input token rates Gemini calls are limited to, matching
+# the Vertex AI quota of the project. 0 disables a limit.
+CHASE_LLM_REQUESTS_PER_MINUTE = int(os.getenv("CHASE_LLM_REQUESTS_PER_MINUTE", "0"))
+CHASE_LLM_TOKENS_PER_MINUTE = int(os.getenv("CHASE_LLM_TOKENS_PER_MINUTE", "0"))
+
 GEMINI_AVAILABLE_REGIONS = [
     "europe-west3",
     "australia-southeast1",
@@ -80,42 +93,113 @@ aiplatform.init(
 vertexai.init(project=GCP_PROJECT, location=GCP_LOCATION)
 
 
-def retry(max_attempts=8, base_delay=1, backoff_factor=2):
-    """Decorator to add retry logic to a function.
+class TokenBucket:
+    """A thread-safe token bucket refilled at a constant rate.
+
+    Attributes:
+      rate_per_minute: The number of tokens added per minute; also the capacity
+        of the bucket, so that at most a minute's worth is spent at once.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        """Initializes a full bucket."""
+        self.rate_per_minute = rate_per_minute
+        self._tokens = rate_per_minute
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, amount: float) -> float:
+        """Takes tokens if enough are available.
+
+        Returns:
+          0 if the tokens were taken, otherwise the seconds until they are
+          available.
+        """
+        amount = min(amount, self.rate_per_minute)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.rate_per_minute,
+                self._tokens + (now - self._updated_at) * self.rate_per_minute / 60,
+            )
+            self._updated_at = now
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0
+            return (amount - self._tokens) * 60 / self.rate_per_minute
+
+    def acquire(self, amount: float = 1) -> None:
+        """Takes tokens from the bucket, waiting until enough are available.
+
+        Args:
+          amount: The number of tokens. Amounts above the capacity take the
+            whole bucket.
+        """
+        while wait_seconds := self._take(amount):
+            time.sleep(wait_seconds)
+
+    async def acquire_async(self, amount: float = 1) -> None:
+        """Like `acquire`, but waits without blocking the event loop."""
+        while wait_seconds := self._take(amount):
+            await asyncio.sleep(wait_seconds)
+
 
-    Args:
-        max_attempts (int): The maximum number of attempts.
-        base_delay (int): The base delay in seconds for the exponential backoff.
-        backoff_factor (int): The factor by which to multiply the delay for each
-          subsequent attempt.
+class RateLimiter:
+    """Limits calls to a number of requests and tokens per minute.
 
-    Returns:
-        Callable: The decorator function.
+    Attributes:
+      requests: The bucket of requests, or None for no limit.
+      tokens: The bucket of tokens, or None for no limit.
     """
 
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            attempts = 0
-            while attempts < max_attempts:
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:  # pylint: disable=broad-exception-caught
-                    print(f"Attempt {attempts + 1} failed with error: {e}")
-                    attempts += 1
-                    if attempts >= max_attempts:
-                        raise e
-                    delay = base_delay * (backoff_factor**attempts)
-                    delay = delay + random.uniform(0, 0.1 * delay)
-                    time.sleep(delay)
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        """Initializes the limiter; a rate of 0 disables that limit."""
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, num_tokens: int) -> None:
+        """Waits until a request of `num_tokens` tokens may be sent."""
+        if self.requests is not None:
+            self.requests.acquire()
+        if self.tokens is not None:
+            self.tokens.acquire(num_tokens)
+
+    async def acquire_async(self, num_tokens: int) -> None:
+        """Like `acquire`, but waits without blocking the event loop."""
+        if self.requests is not None:
+            await self.requests.acquire_async()
+        if self.tokens is not None:
+            await self.tokens.acquire_async(num_tokens)
 
-        return wrapper
 
-    return decorator
+# Shared by all `GeminiModel` instances, so that concurrent sessions together
+# stay within the worker and quota limits instead of each bursting on its own.
+_executor = ThreadPoolExecutor(
+    max_workers=CHASE_LLM_MAX_WORKERS, thread_name_prefix="gemini"
+)
+rate_limiter = RateLimiter(CHASE_LLM_REQUESTS_PER_MINUTE, CHASE_LLM_TOKENS_PER_MINUTE)
+# The async counterpart of `_executor`, one per event loop since asyncio
+# primitives cannot be shared between loops.
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Returns the semaphore bounding the async Gemini calls of this loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(CHASE_LLM_MAX_WORKERS)
+    return semaphore
 
 
 class GeminiModel:
-    """Class for the Gemini model."""
+    """Class for the Gemini model.
+
+    Requests are retried according to `retry_policy`, which defaults to the
+    policy shared by all models, `retry_policy.llm_retry_policy`.
+    """
 
     def __init__(
         self,
@@ -124,6 +208,7 @@ class GeminiModel:
         distribute_requests: bool = False,
         cache_name: str | None = None,
         temperature: float = 0.01,
+        retry_policy: RetryPolicy | None = None,
         **kwargs,
     ):
         self.model_name = model_name or os.getenv("CHASE_NL2SQL_MODEL")
@@ -133,6 +218,7 @@ class GeminiModel:
         self.arguments = kwargs
         self.distribute_requests = distribute_requests
         self.temperature = temperature
+        self.retry_policy = retry_policy or llm_retry_policy
         model_name = self.model_name
         if not self.finetuned_model and self.distribute_requests:
             random_region = random.choice(GEMINI_AVAILABLE_REGIONS)
@@ -149,10 +235,12 @@ class GeminiModel:
         else:
             self.model = GenerativeModel(model_name=model_name)
 
-    @retry(max_attempts=12, base_delay=2, backoff_factor=2)
     def call(self, prompt: str, parser_func=None) -> str:
         """Calls the Gemini model with the given prompt.
 
+        Transient errors are retried until the deadline of the retry policy;
+        other errors are raised at once.
+
         Args:
             prompt (str): The prompt to call the model with.
             parser_func (callable, optional): A function that processes the LLM
@@ -162,6 +250,11 @@ class GeminiModel:
         Returns:
             str: The processed response from the model.
         """
+        return self.retry_policy.call(self._generate, prompt, parser_func)
+
+    def _generate(self, prompt: str, parser_func=None) -> str:
+        """Makes one attempt of `call`."""
+        rate_limiter.acquire(estimate_tokens(prompt))
         response = self.model.generate_content(
             prompt,
             generation_config=GenerationConfig(
@@ -174,20 +267,108 @@ class GeminiModel:
             return parser_func(response)
         return response
 
+    async def call_async(self, prompt: str, parser_func=None) -> str:
+        """Calls the Gemini model with the given prompt, without blocking.
+
+        The request is sent with the async generate-content API, so the event
+        loop keeps serving other sessions while it is in flight. It is retried
+        like in `call`.
+
+        Args:
+            prompt (str): The prompt to call the model with.
+            parser_func (callable, optional): A function that processes the LLM
+              output.
+
+        Returns:
+            str: The processed response from the model.
+        """
+        return await self.retry_policy.call_async(
+            self._generate_async, prompt, parser_func
+        )
+
+    async def _generate_async(self, prompt: str, parser_func=None) -> str:
+        """Makes one attempt of `call_async`."""
+        async with _get_semaphore():
+            await rate_limiter.acquire_async(estimate_tokens(prompt))
+            response = (
+                await self.model.generate_content_async(
+                    prompt,
+                    generation_config=GenerationConfig(
+                        temperature=self.temperature,
+                        **self.arguments,
+                    ),
+                    safety_settings=SAFETY_FILTER_CONFIG,
+                )
+            ).text
+        if parser_func:
+            return parser_func(response)
+        return response
+
+    async def call_many(
+        self,
+        prompts: List[str],
+        parser_func: Optional[Callable[[str], str]] = None,
+        timeout: int = 60,
+    ) -> List[Optional[str]]:
+        """Calls the Gemini model for multiple prompts concurrently.
+
+        The async counterpart of `call_parallel`, with the same results. Calls
+        run as tasks on the event loop rather than on threads. Those still
+        running after `timeout`, or when the awaiting task is cancelled, are
+        cancelled too, which aborts their requests.
+
+        Args:
+            prompts (List[str]): A list of prompts to call the model with.
+            parser_func (callable, optional): A function to process each response.
+            timeout (int): The maximum time (in seconds) to wait for all calls.
+
+        Returns:
+            List[Optional[str]]: A response, or an error description, per prompt.
+        """
+
+        async def worker(index: int, prompt: str):
+            """Calls the model for one prompt."""
+            try:
+                return await self.call_async(prompt, parser_func)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print(f"Error for prompt {index}: {str(e)}")
+                return f"Error after retries: {str(e)}"
+
+        tasks = [
+            asyncio.create_task(worker(i, prompt)) for i, prompt in enumerate(prompts)
+        ]
+        try:
+            await asyncio.wait(tasks, timeout=timeout)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Lets the cancelled calls clean up before the results are read.
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        results = []
+        for index, task in enumerate(tasks):
+            if task.cancelled():
+                print(f"Timeout occurred for prompt {index}")
+                results.append("Timeout")
+            elif task.exception() is not None:
+                print(f"Unhandled error for prompt {index}: {task.exception()}")
+                results.append("Unhandled Error")
+            else:
+                results.append(task.result())
+        return results
+
     def call_parallel(
         self,
         prompts: List[str],
         parser_func: Optional[Callable[[str], str]] = None,
         timeout: int = 60,
-        max_retries: int = 5,
     ) -> List[Optional[str]]:
-        """Calls the Gemini model for multiple prompts in parallel using threads with retry logic.
+        """Calls the Gemini model for multiple prompts in parallel using threads.
 
         Args:
             prompts (List[str]): A list of prompts to call the model with.
             parser_func (callable, optional): A function to process each response.
             timeout (int): The maximum time (in seconds) to wait for each thread.
-            max_retries (int): The maximum number of retries for timed-out threads.
 
         Returns:
             List[Optional[str]]:
@@ -196,27 +377,20 @@ class GeminiModel:
         results = [None] * len(prompts)
 
         def worker(index: int, prompt: str):
-            """Thread worker function to call the model and store the result with retries."""
-            retries = 0
-            while retries <= max_retries:
-                try:
-                    return self.call(prompt, parser_func)
-                except Exception as e:  # pylint: disable=broad-exception-caught
-                    print(f"Error for prompt {index}: {str(e)}")
-                    retries += 1
-                    if retries <= max_retries:
-                        print(f"Retrying ({retries}/{max_retries}) for prompt {index}")
-                        time.sleep(1)  # Small delay before retrying
-                    else:
-                        return f"Error after retries: {str(e)}"
-
-        # Create and start one thread for each prompt
-        with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
-            future_to_index = {
-                executor.submit(worker, i, prompt): i
-                for i, prompt in enumerate(prompts)
-            }
+            """Thread worker function to call the model and store the result."""
+            # `call` already retries transient errors, within its deadline.
+            try:
+                return self.call(prompt, parser_func)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print(f"Error for prompt {index}: {str(e)}")
+                return f"Error after retries: {str(e)}"
+
+        # Run the prompts on the process-wide pool, shared with other sessions.
+        future_to_index = {
+            _executor.submit(worker, i, prompt): i for i, prompt in enumerate(prompts)
+        }
 
+        try:
             for future in as_completed(future_to_index, timeout=timeout):
                 index = future_to_index[future]
                 try:
@@ -224,12 +398,16 @@ class GeminiModel:
                 except Exception as e:  # pylint: disable=broad-exception-caught
                     print(f"Unhandled error for prompt {index}: {e}")
                     results[index] = "Unhandled Error"
+        except TimeoutError:
+            pass
 
         # Handle remaining unfinished tasks after the timeout
         for future in future_to_index:
             index = future_to_index[future]
             if not future.done():
                 print(f"Timeout occurred for prompt {index}")
+                # Prompts still queued behind other sessions are dropped.
+                future.cancel()
                 results[index] = "Timeout"
 
         return results
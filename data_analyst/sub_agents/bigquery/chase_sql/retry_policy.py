@@ -0,0 +1,269 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Deadline-aware retries of Gemini calls.
+
+Only transient errors are retried: quota exhaustion, server errors, timeouts
+and network failures. Errors that would recur on every attempt, such as an
+invalid argument, a permission error, or a response blocked by the safety
+filters, fail on the first attempt. Retries back off exponentially with full
+jitter, capped per delay, and stop once the next attempt would start after
+the deadline of the request.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable
+
+from google.api_core import exceptions
+
+# Maximum number of attempts of a Gemini request, including the first.
+CHASE_LLM_MAX_ATTEMPTS = int(os.getenv("CHASE_LLM_MAX_ATTEMPTS", "4"))
+# Upper bound of a single backoff delay.
+CHASE_LLM_RETRY_MAX_DELAY_SECONDS = float(
+    os.getenv("CHASE_LLM_RETRY_MAX_DELAY_SECONDS", "20")
+)
+# Overall time a Gemini request may take, across all of its attempts.
+CHASE_LLM_DEADLINE_SECONDS = float(os.getenv("CHASE_LLM_DEADLINE_SECONDS", "120"))
+
+# HTTP status codes of transient API errors: timeout, rate limit and server
+# errors.
+RETRYABLE_HTTP_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Returns whether a failed Gemini call may succeed when retried.
+
+    API errors are retried if their status code is transient, and network
+    errors, including timeouts, always. Anything else, e.g. the `ValueError`
+    of a blocked response or an error of the response parser, is fatal.
+    """
+    if isinstance(error, exceptions.GoogleAPICallError):
+        return error.code in RETRYABLE_HTTP_CODES
+    return isinstance(error, OSError)
+
+
+class RetryPolicy:
+    """Retries transient failures of a call until its deadline.
+
+    The policy keeps counters of what it did, which `stats` returns. Every
+    finished call is logged with its outcome and the running totals.
+
+    Attributes:
+      max_attempts: The maximum number of attempts, including the first.
+      base_delay: The delay before the first retry, before jitter.
+      max_delay: The upper bound of a delay, before jitter.
+      backoff_factor: The factor by which the delay grows per retry.
+      deadline_seconds: The time all attempts of a call may take together, or
+        None for no deadline.
+      is_retryable: Classifies an error as retryable or fatal.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 20.0,
+        backoff_factor: float = 2.0,
+        deadline_seconds: float | None = 120.0,
+        is_retryable: Callable[[BaseException], bool] = is_retryable_error,
+    ):
+        """Initializes the policy with zeroed counters."""
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.backoff_factor = backoff_factor
+        self.deadline_seconds = deadline_seconds
+        self.is_retryable = is_retryable
+        self._stats = dict.fromkeys(
+            (
+                "calls",
+                "attempts",
+                "retries",
+                "successes",
+                "fatal_errors",
+                "exhausted",
+                "deadline_exceeded",
+            ),
+            0,
+        )
+        self._lock = threading.Lock()
+
+    def _count(self, key: str) -> None:
+        """Increments a counter."""
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self) -> dict[str, int]:
+        """Returns the counters of the calls made with the policy.
+
+        Returns:
+          The number of "calls", of "attempts" and of "retries" among them;
+          then how calls ended: in "successes", "fatal_errors", "exhausted"
+          (out of attempts) or "deadline_exceeded".
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _finish(
+        self, outcome: str, attempts: int, error: Exception | None = None
+    ) -> None:
+        """Counts how a call ended and logs it with the running totals.
+
+        Args:
+          outcome: The counter of the outcome, e.g. "successes".
+          attempts: The number of attempts the call took.
+          error: The error of the last attempt, if the call failed.
+        """
+        self._count(outcome)
+        stats = self.stats()
+        if error is None:
+            logging.info(
+                "Gemini call succeeded after %d attempt(s). Totals: %s",
+                attempts,
+                stats,
+            )
+        else:
+            logging.warning(
+                "Gemini call failed (%s) after %d attempt(s): %s. Totals: %s",
+                outcome,
+                attempts,
+                error,
+                stats,
+            )
+
+    def get_delay(self, retry_number: int) -> float:
+        """Returns the delay before a retry, the first one being 1.
+
+        The delay is drawn uniformly between 0 and the capped exponential
+        backoff ("full jitter"), so that concurrent callers that failed
+        together do not retry together.
+        """
+        backoff = self.base_delay * self.backoff_factor ** (retry_number - 1)
+        return random.uniform(0, min(self.max_delay, backoff))
+
+    def _get_retry_delay(
+        self, error: Exception, attempt: int, deadline: float | None
+    ) -> float | None:
+        """Decides whether a failed attempt is retried.
+
+        Args:
+          error: The error of the attempt.
+          attempt: The number of the attempt, the first one being 1.
+          deadline: The `time.monotonic()` deadline of the call, or None.
+
+        Returns:
+          The delay before the retry, or None if the error is to be raised.
+        """
+        if not self.is_retryable(error):
+            self._finish("fatal_errors", attempt, error)
+            return None
+        if attempt >= self.max_attempts:
+            self._finish("exhausted", attempt, error)
+            return None
+        delay = self.get_delay(attempt)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            self._finish("deadline_exceeded", attempt, error)
+            return None
+        self._count("retries")
+        logging.info(
+            "Attempt %d of a Gemini call failed, retrying in %.1fs: %s",
+            attempt,
+            delay,
+            error,
+        )
+        return delay
+
+    def _get_deadline(self) -> float | None:
+        """Returns the `time.monotonic()` deadline of a call starting now."""
+        if self.deadline_seconds is None:
+            return None
+        return time.monotonic() + self.deadline_seconds
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Calls a function, retrying its transient failures.
+
+        An attempt in progress at the deadline is not interrupted, but is not
+        retried if it fails.
+
+        Args:
+          func: The function.
+          *args: Its positional arguments.
+          **kwargs: Its keyword arguments.
+
+        Returns:
+          The result of the first successful attempt.
+
+        Raises:
+          Exception: The error of the last attempt, if none succeeded.
+        """
+        self._count("calls")
+        deadline = self._get_deadline()
+        attempt = 0
+        while True:
+            attempt += 1
+            self._count("attempts")
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                delay = self._get_retry_delay(e, attempt, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self._finish("successes", attempt)
+            return result
+
+    async def call_async(
+        self, func: Callable[..., Awaitable[Any]], *args, **kwargs
+    ) -> Any:
+        """Like `call`, for a coroutine function.
+
+        Attempts are also cancelled at the deadline, failing with
+        `TimeoutError`, and backoff delays do not block the event loop.
+        """
+        self._count("calls")
+        deadline = self._get_deadline()
+        attempt = 0
+        while True:
+            attempt += 1
+            self._count("attempts")
+            try:
+                if deadline is None:
+                    result = await func(*args, **kwargs)
+                else:
+                    result = await asyncio.wait_for(
+                        func(*args, **kwargs),
+                        timeout=max(deadline - time.monotonic(), 0),
+                    )
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                delay = self._get_retry_delay(e, attempt, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self._finish("successes", attempt)
+            return result
+
+
+# Shared by all `GeminiModel` instances that are not given a policy.
+llm_retry_policy = RetryPolicy(
+    max_attempts=CHASE_LLM_MAX_ATTEMPTS,
+    max_delay=CHASE_LLM_RETRY_MAX_DELAY_SECONDS,
+    deadline_seconds=CHASE_LLM_DEADLINE_SECONDS or None,
+)
@@ -353,6 +353,66 @@ class SqlTranslator:
             return str(e), sql_query
         return None, sql_query
 
+    def _get_correction_requests(
+        self,
+        sql_query: str,
+        sql_dialect: str,
+        apply_heuristics: bool,
+        db: str | None = None,
+        catalog: str | None = None,
+        ddl_schema: str | SQLGlotSchemaType | BirdSampleType | None = None,
+        number_of_candidates: int = 1,
+    ) -> tuple[list[str], str]:
+        """Checks the SQL query for errors and builds the prompts fixing them.
+
+        Takes the arguments of `_fix_errors`.
+
+        Returns:
+          The correction prompts, empty if there are no errors, and the checked
+          SQL query.
+        """
+        if apply_heuristics:
+            sql_query = self._apply_heuristics(sql_query)
+        # Reformat the schema if provided. This will remove any comments and
+        # `INSERT INTO` statements.
+        schema_dict = self.rewrite_schema_for_sqlglot(ddl_schema)
+        errors_and_sql: tuple[str | None, str] = self._check_for_errors(
+            sql_query=sql_query,
+            sql_dialect=self.OUTPUT_DIALECT,
+            db=db,
+            catalog=catalog,
+            schema_dict=schema_dict,
+        )
+        errors, sql_query = errors_and_sql
+        if not errors:
+            return [], sql_query
+        print("Processing input errors")
+        if schema_dict:
+            # If the schema is provided, then insert it into the prompt.
+            schema_insert = f"\nThe database schema is:\n{schema_dict}\n"
+        else:
+            schema_insert = "\n"
+        prompt: str = CORRECTION_PROMPT_TEMPLATE_V1_0.format(
+            sql_dialect=sql_dialect.lower(),
+            errors=errors,
+            sql_query=sql_query,
+            schema_insert=schema_insert,
+        )
+        requests: list[str] = [prompt for _ in range(number_of_candidates)]
+        return requests, sql_query
+
+    @classmethod
+    def _pick_response(cls, responses: list[str | None], sql_query: str) -> str:
+        """Returns the first correction, or the SQL query if there is none."""
+        # We only use the first response. Therefore the `number_of_candidates`
+        # parameter is not used.
+        # First, find the first non-None response.
+        responses = [r for r in responses if r is not None]
+        if responses:
+            # Then, return the first non-None response.
+            return responses[0]
+        return sql_query
+
     def _fix_errors(
         self,
         sql_query: str,
@@ -380,48 +440,59 @@ class SqlTranslator:
         Returns:
           str: The fixed SQL query.
         """
-        if apply_heuristics:
-            sql_query = self._apply_heuristics(sql_query)
-        # Reformat the schema if provided. This will remove any comments and
-        # `INSERT INTO` statements.
-        schema_dict = self.rewrite_schema_for_sqlglot(ddl_schema)
-        errors_and_sql: tuple[str | None, str] = self._check_for_errors(
-            sql_query=sql_query,
-            sql_dialect=self.OUTPUT_DIALECT,
+        requests, sql_query = self._get_correction_requests(
+            sql_query,
+            sql_dialect,
+            apply_heuristics,
             db=db,
             catalog=catalog,
-            schema_dict=schema_dict,
+            ddl_schema=ddl_schema,
+            number_of_candidates=number_of_candidates,
         )
-        errors, sql_query = errors_and_sql
-        responses = sql_query  # Default to the input SQL query after error check.
-        if errors:
-            print("Processing input errors")
-            if schema_dict:
-                # If the schema is provided, then insert it into the prompt.
-                schema_insert = f"\nThe database schema is:\n{schema_dict}\n"
-            else:
-                schema_insert = "\n"
-            prompt: str = CORRECTION_PROMPT_TEMPLATE_V1_0.format(
-                sql_dialect=sql_dialect.lower(),
-                errors=errors,
-                sql_query=sql_query,
-                schema_insert=schema_insert,
-            )
-            requests: list[str] = [prompt for _ in range(number_of_candidates)]
-            responses: list[str] = self._model.call_parallel(
-                requests, parser_func=self._parse_response
-            )
-            if responses:
-                # We only use the first response. Therefore the `number_of_candidates`
-                # parameter is not used.
-                # pylint: disable=g-bad-todo
-                # pylint: enable=g-bad-todo
-                # First, find the first non-None response.
-                responses = [r for r in responses if r is not None]
-                if responses:
-                    # Then, return the first non-None response.
-                    responses = responses[0]
-        return responses
+        if not requests:
+            return sql_query
+        responses = self._model.call_parallel(
+            requests, parser_func=self._parse_response
+        )
+        return self._pick_response(responses, sql_query)
+
+    async def _fix_errors_async(
+        self,
+        sql_query: str,
+        sql_dialect: str,
+        apply_heuristics: bool,
+        db: str | None = None,
+        catalog: str | None = None,
+        ddl_schema: str | SQLGlotSchemaType | BirdSampleType | None = None,
+        number_of_candidates: int = 1,
+    ) -> str:
+        """Like `_fix_errors`, but awaits the corrections of the LLM."""
+        requests, sql_query = self._get_correction_requests(
+            sql_query,
+            sql_dialect,
+            apply_heuristics,
+            db=db,
+            catalog=catalog,
+            ddl_schema=ddl_schema,
+            number_of_candidates=number_of_candidates,
+        )
+        if not requests:
+            return sql_query
+        responses = await self._model.call_many(
+            requests, parser_func=self._parse_response
+        )
+        return self._pick_response(responses, sql_query)
+
+    def _transpile(self, sql_query: str) -> str:
+        """Transpiles the SQL query from the input to the output dialect."""
+        return sqlglot.transpile(
+            sql=sql_query,
+            read=self.INPUT_DIALECT,
+            write=self.OUTPUT_DIALECT,
+            error_level=sqlglot.ErrorLevel.IMMEDIATE,
+        )[
+            0
+        ]  # Transpile returns a list of strings.
 
     def translate(
         self,
@@ -454,14 +525,7 @@ class SqlTranslator:
                 apply_heuristics=True,
             )
         print("****** sql_query after fix_errors:", sql_query)
-        sql_query = sqlglot.transpile(
-            sql=sql_query,
-            read=self.INPUT_DIALECT,
-            write=self.OUTPUT_DIALECT,
-            error_level=sqlglot.ErrorLevel.IMMEDIATE,
-        )[
-            0
-        ]  # Transpile returns a list of strings.
+        sql_query = self._transpile(sql_query)
         print("****** sql_query after transpile:", sql_query)
         if self._tool_output_errors:
             sql_query = self._fix_errors(
@@ -477,3 +541,40 @@ class SqlTranslator:
         sql_query = self._apply_heuristics(sql_query)
 
         return sql_query
+
+    async def translate_async(
+        self,
+        sql_query: str,
+        db: str | None = None,
+        catalog: str | None = None,
+        ddl_schema: str | SQLGlotSchemaType | BirdSampleType | None = None,
+    ) -> str:
+        """Like `translate`, but awaits the corrections of the LLM.
+
+        The corrections are requested with `GeminiModel.call_many`, so that the
+        event loop is not blocked while they are generated.
+        """
+        if self._process_input_errors:
+            sql_query = await self._fix_errors_async(
+                sql_query,
+                db=db,
+                catalog=catalog,
+                sql_dialect=self.OUTPUT_DIALECT,
+                ddl_schema=ddl_schema,
+                apply_heuristics=True,
+            )
+        sql_query = self._transpile(sql_query)
+        if self._tool_output_errors:
+            sql_query = await self._fix_errors_async(
+                sql_query,
+                db=db,
+                catalog=catalog,
+                sql_dialect=self.OUTPUT_DIALECT,
+                ddl_schema=ddl_schema,
+                apply_heuristics=True,
+            )
+
+        sql_query = sql_query.strip().replace('"', "`")
+        sql_query = self._apply_heuristics(sql_query)
+
+        return sql_query
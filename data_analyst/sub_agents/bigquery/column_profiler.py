@@ -0,0 +1,155 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-column statistics profiles of BigQuery tables.
+
+A profile is computed with one aggregated query per table and gives the NL2SQL
+models literal and range hints (null fraction, approximate distinct count,
+min/max and the most frequent values) at a fraction of the tokens of raw
+sample rows.
+"""
+
+from typing import Any
+
+from google.cloud import bigquery
+
+from .schema_renderer import format_sample_value
+
+# Column types, as reported by `Table.schema`, supporting each statistic.
+_DISTINCT_TYPES = frozenset(
+    {
+        "STRING",
+        "BYTES",
+        "INTEGER",
+        "FLOAT",
+        "NUMERIC",
+        "BIGNUMERIC",
+        "BOOLEAN",
+        "DATE",
+        "DATETIME",
+        "TIME",
+        "TIMESTAMP",
+    }
+)
+_MIN_MAX_TYPES = _DISTINCT_TYPES - {"BYTES", "BOOLEAN"}
+_TOP_VALUES_TYPES = frozenset({"STRING", "BOOLEAN"})
+
+ColumnType = dict[str, Any]
+ProfileType = dict[str, Any]
+
+
+def build_profile_query(
+    table_ref: str,
+    columns: list[ColumnType],
+    top_k: int = 5,
+    sample_percent: float | None = None,
+) -> str:
+    """Builds the single aggregation query profiling every column of a table.
+
+    Repeated and `RECORD` columns are not profiled.
+
+    Args:
+      table_ref: The fully qualified table name, `project.dataset.table`.
+      columns: The columns of the table, each with a `name`, `type` and `mode`.
+      top_k: The number of most frequent values returned per column.
+      sample_percent: If set, only this percentage of the table's storage
+        blocks is scanned, using `TABLESAMPLE SYSTEM`.
+
+    Returns:
+      The GoogleSQL query. Its result columns are named after the position of
+      the profiled column, e.g. `nulls_3` for the fourth column.
+    """
+    expressions = ["COUNT(*) AS row_count"]
+    for position, column in enumerate(columns):
+        if column["mode"] == "REPEATED" or column["type"] not in _DISTINCT_TYPES:
+            continue
+        name = f"`{column['name']}`"
+        expressions.append(f"COUNTIF({name} IS NULL) AS nulls_{position}")
+        expressions.append(f"APPROX_COUNT_DISTINCT({name}) AS distinct_{position}")
+        if column["type"] in _MIN_MAX_TYPES:
+            expressions.append(f"MIN({name}) AS min_{position}")
+            expressions.append(f"MAX({name}) AS max_{position}")
+        if column["type"] in _TOP_VALUES_TYPES:
+            expressions.append(
+                f"APPROX_TOP_COUNT({name}, {top_k}) AS top_{position}"
+            )
+    sample = f" TABLESAMPLE SYSTEM ({sample_percent} PERCENT)" if sample_percent else ""
+    select_list = ",\n  ".join(expressions)
+    return f"SELECT\n  {select_list}\nFROM `{table_ref}`{sample}"
+
+
+def parse_profile_row(row: Any, columns: list[ColumnType]) -> ProfileType:
+    """Converts the result row of a profile query into a JSON-serializable profile.
+
+    Args:
+      row: The single result row of the query from `build_profile_query`.
+      columns: The columns the query was built for.
+
+    Returns:
+      The profile: the scanned `row_count` and, keyed by column name, each
+      column's `null_fraction`, `approx_distinct` and, where available, `min`,
+      `max` and `top_values` as SQL literals.
+    """
+    row_count = row["row_count"]
+    profile = {"row_count": row_count, "columns": {}}
+    keys = set(row.keys())
+    for position, column in enumerate(columns):
+        if f"nulls_{position}" not in keys:
+            continue
+        stats = {
+            "null_fraction": (
+                row[f"nulls_{position}"] / row_count if row_count else 0.0
+            ),
+            "approx_distinct": row[f"distinct_{position}"],
+        }
+        if f"min_{position}" in keys and row[f"min_{position}"] is not None:
+            stats["min"] = format_sample_value(row[f"min_{position}"])
+            stats["max"] = format_sample_value(row[f"max_{position}"])
+        if f"top_{position}" in keys:
+            stats["top_values"] = [
+                [format_sample_value(item["value"]), item["count"]]
+                for item in row[f"top_{position}"]
+                if item["value"] is not None
+            ]
+        profile["columns"][column["name"]] = stats
+    return profile
+
+
+def profile_table(
+    client: bigquery.Client,
+    table_ref: str,
+    columns: list[ColumnType],
+    top_k: int = 5,
+    sample_percent: float | None = None,
+    maximum_bytes_billed: int | None = None,
+) -> ProfileType:
+    """Computes the column statistics profile of a table.
+
+    Args:
+      client: A BigQuery client.
+      table_ref: The fully qualified table name, `project.dataset.table`.
+      columns: The columns of the table, each with a `name`, `type` and `mode`.
+      top_k: The number of most frequent values returned per column.
+      sample_percent: If set, the percentage of the table to scan.
+      maximum_bytes_billed: If set, the query fails instead of billing more.
+
+    Returns:
+      The profile, see `parse_profile_row`.
+    """
+    job_config = bigquery.QueryJobConfig(
+        use_query_cache=True, maximum_bytes_billed=maximum_bytes_billed
+    )
+    query = build_profile_query(table_ref, columns, top_k, sample_percent)
+    row = next(iter(client.query(query, job_config=job_config).result()))
+    return parse_profile_row(row, columns)
@@ -0,0 +1,164 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Persistent cache of the SQL generated for natural language questions.
+
+Entries map a question, normalized so that rephrasings differing only in case,
+whitespace, punctuation or filler words share an entry, to SQL that passed
+`run_bigquery_validation`. Keys also cover the schema fingerprint, which only
+changes with the structure of the schema (see `tools.get_schema_fingerprint`),
+and the NL2SQL settings. Entries of a previous schema are not purged, since
+sessions started before a schema change still use it; they age out of the LRU
+order.
+"""
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import Any
+
+# Bump whenever the layout of the cache file changes.
+NL2SQL_CACHE_VERSION = 2
+
+# Words that do not change what a question asks for. Unlike the schema linking
+# stop words, words such as "from", "to", "not" or "per" are kept.
+FILLER_WORDS = frozenset(
+    """
+    a an the please me us i we you can could would will kindly just show give
+    tell list display find get return what which is are was were do does
+    """.split()
+)
+
+
+def normalize_question(question: str) -> str:
+    """Normalizes a question for use in cache keys.
+
+    The question is lowercased, punctuation other than inside quoted literals
+    is dropped, filler words are removed and whitespace is collapsed. Numbers
+    and quoted literals are kept as they are, since they change the SQL.
+    """
+    terms = []
+    for literal, word in re.findall(r"""('[^']*'|"[^"]*")|([\w.%-]+)""", question):
+        if literal:
+            terms.append(literal)
+            continue
+        word = word.lower().strip(".")
+        if word and word not in FILLER_WORDS:
+            terms.append(word)
+    return " ".join(terms)
+
+
+def make_nl2sql_cache_key(
+    question: str, schema_fingerprint: str, settings: dict[str, Any]
+) -> str:
+    """Returns the cache key of a question.
+
+    Args:
+      question: The natural language question.
+      schema_fingerprint: The fingerprint of the schema the SQL is generated
+        for.
+      settings: Everything else that shapes the generated SQL, e.g. the NL2SQL
+        method, model and prompt options.
+
+    Returns:
+      A hex digest.
+    """
+    key = json.dumps(
+        [normalize_question(question), schema_fingerprint, settings],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class NL2SQLCache:
+    """A thread-safe LRU cache of validated SQL, persisted as a JSON file.
+
+    The file is replaced atomically on every change, so that readers never
+    observe a partially written cache.
+
+    Attributes:
+      path: The path of the cache file.
+      max_entries: The maximum number of cached queries.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        """Initializes the cache with the entries stored at `path`, if any."""
+        self.path = path
+        self.max_entries = max_entries
+        # key -> SQL, least recent first.
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        """Loads the stored entries, ignoring a missing or unreadable file."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable NL2SQL cache %s: %s", self.path, e)
+            return
+        if snapshot.get("version") != NL2SQL_CACHE_VERSION:
+            return
+        self._entries.update(snapshot["entries"])
+
+    def _save(self) -> None:
+        """Stores the entries. Must be called with the lock held.
+
+        Failures are logged rather than raised: the cache only saves LLM calls.
+        """
+        snapshot = {"version": NL2SQL_CACHE_VERSION, "entries": self._entries}
+        cache_dir = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logging.warning("Could not write NL2SQL cache %s: %s", self.path, e)
+
+    def get(self, key: str) -> str | None:
+        """Returns the cached SQL of a key, or None on a miss."""
+        with self._lock:
+            sql = self._entries.get(key)
+            if sql is not None:
+                self._entries.move_to_end(key)
+            return sql
+
+    def put(self, key: str, sql: str) -> None:
+        """Caches validated SQL, evicting the least recently used entries.
+
+        Args:
+          key: The cache key of the question, which covers the schema.
+          sql: The SQL that answered it.
+        """
+        with self._lock:
+            self._entries[key] = sql
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
@@ -0,0 +1,193 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Detects queries that scan partitioned tables without a partition filter."""
+
+from sqlglot import exp
+
+from .schema_cache import SchemaTablesType, TableEntryType
+
+# The pseudo columns that filter ingestion time partitioned tables.
+_INGESTION_TIME_COLUMNS = frozenset({"_partitiontime", "_partitiondate"})
+
+
+def partition_filter_columns(entry: TableEntryType) -> frozenset[str]:
+    """Returns the lowercased columns that prune the partitions of a table."""
+    partitioning = entry.get("partitioning")
+    if not partitioning:
+        return frozenset()
+    if partitioning["field"] is None:
+        return _INGESTION_TIME_COLUMNS
+    return frozenset({partitioning["field"].lower()})
+
+
+def _table_entry(
+    table: exp.Table,
+    tables: SchemaTablesType,
+    project_id: str,
+    dataset_id: str,
+) -> TableEntryType | None:
+    """Finds the schema cache entry of a table referenced by a query.
+
+    The reference is resolved to its fully qualified name, like in
+    `ParsedQuery.table_refs`, and must match the table's name exactly.
+    """
+    reference = ".".join(
+        (table.catalog or project_id, table.db or dataset_id, table.name)
+    ).lower()
+    for entry in tables.values():
+        if entry["table_ref"].lower() == reference:
+            return entry
+    return None
+
+
+def _matches(column: exp.Column, qualifiers: set[str], columns: frozenset[str]) -> bool:
+    """Checks whether a column reference is one of `columns` of a relation.
+
+    Columns qualified with another relation's name or alias do not match.
+    """
+    return column.name.lower() in columns and (
+        not column.table or column.table.lower() in qualifiers
+    )
+
+
+def _output_columns(
+    select: exp.Select, qualifiers: set[str], columns: frozenset[str]
+) -> frozenset[str]:
+    """Returns the names under which a `SELECT` passes `columns` through."""
+    outputs = set()
+    for projection in select.expressions:
+        if isinstance(projection, exp.Star) or (
+            isinstance(projection, exp.Column)
+            and isinstance(projection.this, exp.Star)
+            and (not projection.table or projection.table.lower() in qualifiers)
+        ):
+            star = projection if isinstance(projection, exp.Star) else projection.this
+            excluded = {
+                column.name.lower() for column in star.args.get("except") or []
+            }
+            outputs.update(columns - excluded)
+            continue
+        inner = projection.unalias()
+        if isinstance(inner, exp.Column) and _matches(inner, qualifiers, columns):
+            outputs.add(projection.alias_or_name.lower())
+    return frozenset(outputs)
+
+
+def _is_scope_filtered(
+    select: exp.Select | None,
+    qualifiers: set[str],
+    columns: frozenset[str],
+    statement: exp.Expression,
+) -> bool:
+    """Checks whether a `SELECT`, or a query reading from it, filters `columns`.
+
+    Only `WHERE` clauses are considered, since that is where BigQuery derives
+    partition pruning from. If the `SELECT` does not filter on the columns but
+    passes them through, the filter may also be in the query that reads it as
+    a subquery or a common table expression; every query reading a common
+    table expression must then filter it.
+
+    Args:
+      select: The `SELECT` reading the relation.
+      qualifiers: The lowercased names and alias of the relation.
+      columns: The lowercased partition columns, as named by the relation.
+      statement: The statement the `SELECT` is part of.
+    """
+    if select is None:
+        return False
+    where = select.args.get("where")
+    if where and any(
+        _matches(column, qualifiers, columns) for column in where.find_all(exp.Column)
+    ):
+        return True
+    outputs = _output_columns(select, qualifiers, columns)
+    if not outputs:
+        return False
+    node = select
+    while isinstance(node.parent, exp.SetOperation):
+        node = node.parent
+    parent = node.parent
+    if isinstance(parent, exp.Subquery) and isinstance(
+        parent.parent, (exp.From, exp.Join)
+    ):
+        return _is_scope_filtered(
+            parent.parent.find_ancestor(exp.Select),
+            {parent.alias_or_name.lower()} - {""},
+            outputs,
+            statement,
+        )
+    if isinstance(parent, exp.CTE):
+        references = [
+            table
+            for table in statement.find_all(exp.Table)
+            if not table.db
+            and table.name == parent.alias_or_name
+            and table.find_ancestor(exp.CTE) is not parent
+        ]
+        return bool(references) and all(
+            _is_scope_filtered(
+                table.find_ancestor(exp.Select),
+                {table.alias_or_name.lower(), table.name.lower()},
+                outputs,
+                statement,
+            )
+            for table in references
+        )
+    return False
+
+
+def find_missing_partition_filters(
+    statements: list[exp.Expression],
+    tables: SchemaTablesType,
+    project_id: str,
+    dataset_id: str,
+) -> list[str]:
+    """Lists the partitioned tables a query scans without a partition filter.
+
+    Common table expressions are not tables, even if they share the name of
+    one, and are left out. A filter on the partition column may be applied by
+    an outer query, if the column is selected through subqueries or common
+    table expressions under the same or another name.
+
+    Args:
+      statements: The parsed statements of the query, see
+        `sql_parsing.ParsedQuery`.
+      tables: The schema cache entries keyed by table ID.
+      project_id: The project of tables referenced without one.
+      dataset_id: The dataset of tables referenced without one.
+
+    Returns:
+      The fully qualified names of the unfiltered partitioned tables, or an
+      empty list if every scan is filtered.
+    """
+    missing = []
+    for statement in statements:
+        cte_names = {cte.alias_or_name for cte in statement.find_all(exp.CTE)}
+        for table in statement.find_all(exp.Table):
+            if not table.name or (not table.db and table.name in cte_names):
+                continue
+            entry = _table_entry(table, tables, project_id, dataset_id)
+            if entry is None:
+                continue
+            columns = partition_filter_columns(entry)
+            qualifiers = {table.alias_or_name.lower(), table.name.lower()}
+            select = table.find_ancestor(exp.Select)
+            if not columns or _is_scope_filtered(
+                select, qualifiers, columns, statement
+            ):
+                continue
+            if entry["table_ref"] not in missing:
+                missing.append(entry["table_ref"])
+    return missing
@@ -0,0 +1,123 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-process cache of BigQuery query results.
+
+Results are keyed by the canonical form of the SQL (see
+`sql_parsing.ParsedQuery.cache_key`) and remember the last modification time
+of every table the query read, so that a result is dropped as soon as one of
+those tables changes.
+"""
+
+import collections
+import datetime
+import json
+import threading
+import time
+from typing import Any
+
+
+class QueryResultCache:
+    """A thread-safe LRU cache of query results with TTL and memory cap.
+
+    Attributes:
+      max_entries: The maximum number of cached results.
+      ttl_seconds: How long a result is served, regardless of table changes.
+      max_bytes: The maximum total size of the cached results, measured as
+        their JSON encoding unless given when they are cached.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, max_bytes: int):
+        """Initializes an empty cache."""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        # key -> (result, table modification times, stored at, size).
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _remove(self, key: str) -> None:
+        """Removes an entry. Must be called with the lock held."""
+        _, _, _, size = self._entries.pop(key)
+        self._size -= size
+
+    def get(
+        self, key: str, table_modified: dict[str, datetime.datetime]
+    ) -> dict[str, Any] | None:
+        """Returns a cached result if it is still valid.
+
+        Args:
+          key: The cache key of the query.
+          table_modified: The current last modification time of every table
+            the query reads.
+
+        Returns:
+          A copy of the cached result, or None on a miss. Expired results and
+          results of modified tables are evicted.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            result, cached_modified, stored_at, _ = self._entries[key]
+            if (
+                time.monotonic() - stored_at > self.ttl_seconds
+                or cached_modified != table_modified
+            ):
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return dict(result)
+
+    def put(
+        self,
+        key: str,
+        result: dict[str, Any],
+        table_modified: dict[str, datetime.datetime],
+        size: int | None = None,
+    ) -> None:
+        """Caches a result, evicting the least recently used ones as needed.
+
+        Args:
+          key: The cache key of the query.
+          result: The result. Its values must not be modified once cached.
+          table_modified: The last modification time of every table the query
+            read, as of before it ran.
+          size: The memory taken by the result. Defaults to the length of its
+            JSON encoding.
+        """
+        if size is None:
+            size = len(json.dumps(result, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (
+                dict(result),
+                dict(table_modified),
+                time.monotonic(),
+                size,
+            )
+            self._size += size
+            while (
+                len(self._entries) > self.max_entries or self._size > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        """Removes every cached result."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
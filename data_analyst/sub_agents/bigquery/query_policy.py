@@ -0,0 +1,138 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Execution policies for the BigQuery jobs started by agent tools.
+
+A policy bounds a job's wall-clock time, billed bytes and priority. Policies
+are resolved per tool and per tenant from `BQ_QUERY_POLICIES`, a JSON object
+such as:
+
+    {
+      "default": {"timeout_seconds": 120, "maximum_bytes_billed": 10000000000},
+      "tools": {"execute_bqml_code": {"priority": "BATCH"}},
+      "tenants": {
+        "acme": {
+          "maximum_bytes_billed": 1000000000,
+          "tools": {"execute_bqml_code": {"timeout_seconds": 600}}
+        }
+      }
+    }
+
+More specific settings win: tenant and tool, then tenant, then tool, then
+default. The tenant of a session is read from its `tenant_id` state key.
+"""
+
+import contextvars
+import json
+import os
+import threading
+from typing import Any
+
+from google.cloud import bigquery
+
+# Defaults of every tool, overridable by the "default" policy.
+# No timeout by default, as before policies existed; long analytical queries
+# would otherwise be cancelled.
+BQ_QUERY_TIMEOUT_SECONDS = float(os.getenv("BQ_QUERY_TIMEOUT_SECONDS", "0"))
+BQ_MAXIMUM_BYTES_BILLED = int(os.getenv("BQ_MAXIMUM_BYTES_BILLED", "0"))
+BQ_QUERY_PRIORITY = os.getenv("BQ_QUERY_PRIORITY", "INTERACTIVE")
+BQ_QUERY_POLICIES = json.loads(os.getenv("BQ_QUERY_POLICIES", "{}"))
+
+# Built-in per-tool settings. BQML jobs such as model training take minutes.
+_TOOL_DEFAULTS = {"execute_bqml_code": {"timeout_seconds": 1500}}
+
+_POLICY_KEYS = ("timeout_seconds", "maximum_bytes_billed", "priority")
+
+# Set by the async tools while the session awaiting them is alive. It is set
+# when the session goes away, so that the blocking call cancels its job.
+session_cancelled: contextvars.ContextVar[threading.Event | None] = (
+    contextvars.ContextVar("session_cancelled", default=None)
+)
+
+
+class QueryPolicy:
+    """The execution limits of a BigQuery job.
+
+    Attributes:
+      timeout_seconds: The wall-clock limit of the job, or None. The job is
+        cancelled when it is exceeded.
+      maximum_bytes_billed: The bytes billed above which the job fails, or
+        None.
+      priority: `INTERACTIVE` or `BATCH`.
+    """
+
+    def __init__(
+        self,
+        timeout_seconds: float | None = None,
+        maximum_bytes_billed: int | None = None,
+        priority: str = "INTERACTIVE",
+    ):
+        """Initializes the policy."""
+        if priority not in ("INTERACTIVE", "BATCH"):
+            raise ValueError(f"Unsupported query priority: {priority}")
+        self.timeout_seconds = timeout_seconds or None
+        self.maximum_bytes_billed = maximum_bytes_billed or None
+        self.priority = priority
+
+    def __repr__(self) -> str:
+        return (
+            f"QueryPolicy(timeout_seconds={self.timeout_seconds},"
+            f" maximum_bytes_billed={self.maximum_bytes_billed},"
+            f" priority={self.priority!r})"
+        )
+
+    def job_config(self, **kwargs: Any) -> bigquery.QueryJobConfig:
+        """Returns a job configuration enforcing the policy.
+
+        The timeout is also set as the job's server-side `job_timeout_ms`, so
+        BigQuery stops the job even if this process dies.
+
+        Args:
+          **kwargs: Further `QueryJobConfig` properties.
+        """
+        job_config = bigquery.QueryJobConfig(
+            maximum_bytes_billed=self.maximum_bytes_billed,
+            priority=self.priority,
+            **kwargs,
+        )
+        if self.timeout_seconds:
+            job_config.job_timeout_ms = int(self.timeout_seconds * 1000)
+        return job_config
+
+
+def resolve_query_policy(tool_name: str, tenant_id: str | None = None) -> QueryPolicy:
+    """Resolves the policy of a tool for a tenant.
+
+    Args:
+      tool_name: The name of the tool starting the job.
+      tenant_id: The tenant of the session, if any.
+
+    Returns:
+      The policy.
+    """
+    tenant = BQ_QUERY_POLICIES.get("tenants", {}).get(tenant_id or "", {})
+    settings = {
+        "timeout_seconds": BQ_QUERY_TIMEOUT_SECONDS,
+        "maximum_bytes_billed": BQ_MAXIMUM_BYTES_BILLED,
+        "priority": BQ_QUERY_PRIORITY,
+    }
+    for layer in (
+        BQ_QUERY_POLICIES.get("default", {}),
+        _TOOL_DEFAULTS.get(tool_name, {}),
+        BQ_QUERY_POLICIES.get("tools", {}).get(tool_name, {}),
+        tenant,
+        tenant.get("tools", {}).get(tool_name, {}),
+    ):
+        settings.update({key: layer[key] for key in _POLICY_KEYS if key in layer})
+    return QueryPolicy(**settings)
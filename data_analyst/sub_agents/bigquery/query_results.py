@@ -0,0 +1,247 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Columnar, Arrow-backed query results.
+
+Query results are fetched as Arrow tables and kept in that form: Arrow stores
+each column in one typed buffer, so a result takes a fraction of the memory of
+a list of row dicts and keeps its column types. Rows as dicts are only built
+when a consumer asks for them.
+
+Session state must stay JSON-serializable, so it holds a handle to the result
+while the Arrow table itself lives in a process-local store. The handle only
+carries the result's id, its shape and a few preview rows, so state stays
+small however many rows were fetched; the rows themselves are only read from
+the store when `load_query_result` is called.
+"""
+
+import collections
+import io
+import json
+import os
+import threading
+import uuid
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.parquet as pq
+
+# Maximum total size of the results kept for sessions in this process.
+BQ_RESULT_STORE_MAX_BYTES = int(
+    os.getenv("BQ_RESULT_STORE_MAX_BYTES", str(256 * 1024 * 1024))
+)
+
+# Number of rows copied into the session state handle of a result.
+BQ_RESULT_PREVIEW_ROWS = int(os.getenv("BQ_RESULT_PREVIEW_ROWS", "5"))
+
+# The session state key holding the handle of the last query result.
+QUERY_RESULT_STATE_KEY = "query_result"
+
+
+class QueryResult:
+    """The rows of a query result, held as an immutable Arrow table.
+
+    A result may be shared by several sessions, e.g. through the result cache,
+    since neither the table nor the rows it renders are modified in place.
+
+    Attributes:
+      table: The rows, as a `pyarrow.Table`.
+      result_id: Identifies the result in the result store.
+    """
+
+    def __init__(self, table: pa.Table):
+        """Initializes the result.
+
+        Args:
+          table: The rows of the result.
+        """
+        self.table = table
+        self.result_id = uuid.uuid4().hex
+
+    @property
+    def num_rows(self) -> int:
+        """The number of rows held."""
+        return self.table.num_rows
+
+    @property
+    def column_names(self) -> list[str]:
+        """The names of the columns."""
+        return self.table.column_names
+
+    @property
+    def nbytes(self) -> int:
+        """The memory taken by the Arrow buffers."""
+        return self.table.nbytes
+
+    def to_rows(self) -> list[dict[str, Any]]:
+        """Renders the rows as JSON-ready dicts.
+
+        Date, time and timestamp columns are rendered as ISO 8601 strings in a
+        single vectorized cast per column, e.g. "2024-01-31".
+
+        Returns:
+          One dict per row, mapping column names to values.
+        """
+        table = self.table
+        for index, field in enumerate(table.schema):
+            if pa.types.is_temporal(field.type):
+                table = table.set_column(
+                    index, field.name, table.column(index).cast(pa.string())
+                )
+        return table.to_pylist()
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Returns the rows as a DataFrame backed by the Arrow buffers.
+
+        The columns use `pd.ArrowDtype`, so the buffers are not copied and the
+        BigQuery types are kept.
+        """
+        return self.table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    def to_csv(self) -> bytes:
+        """Encodes the rows as CSV with a header line.
+
+        CSV has no nested values, so ARRAY and STRUCT columns are written as
+        JSON strings.
+        """
+        table = self.table
+        for index, field in enumerate(table.schema):
+            if pa.types.is_nested(field.type):
+                values = [
+                    None if value is None else json.dumps(value, default=str)
+                    for value in table.column(index).to_pylist()
+                ]
+                table = table.set_column(
+                    index, field.name, pa.array(values, pa.string())
+                )
+        sink = io.BytesIO()
+        pyarrow.csv.write_csv(table, sink)
+        return sink.getvalue()
+
+    def to_parquet(self) -> bytes:
+        """Encodes the rows as a Parquet file, keeping the column types."""
+        sink = io.BytesIO()
+        pq.write_table(self.table, sink)
+        return sink.getvalue()
+
+    def head(self, num_rows: int) -> "QueryResult":
+        """Returns the first rows, without copying them."""
+        return QueryResult(self.table.slice(0, num_rows))
+
+    def handle(self) -> dict[str, Any]:
+        """Returns a JSON-serializable reference to the result.
+
+        The handle is what goes into session state; `load_query_result`
+        resolves it. Besides the id it holds the row count, the column names
+        and the first `BQ_RESULT_PREVIEW_ROWS` rows, which describe the result
+        when it is no longer in this process's store. Values JSON cannot
+        represent, such as NUMERIC or BYTES, are stored as strings.
+        """
+        preview = self.head(BQ_RESULT_PREVIEW_ROWS).to_rows()
+        return {
+            "result_id": self.result_id,
+            "num_rows": self.num_rows,
+            "columns": self.column_names,
+            "preview": json.loads(json.dumps(preview, default=str)),
+        }
+
+
+class QueryResultStore:
+    """A thread-safe LRU store of query results, capped by memory.
+
+    Attributes:
+      max_bytes: The maximum total size of the stored results.
+    """
+
+    def __init__(self, max_bytes: int):
+        """Initializes an empty store."""
+        self.max_bytes = max_bytes
+        # result_id -> result.
+        self._results = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def put(self, result: QueryResult) -> None:
+        """Stores a result, evicting the least recently used ones as needed.
+
+        Storing a result again only marks it as recently used.
+        """
+        with self._lock:
+            if result.result_id in self._results:
+                self._results.move_to_end(result.result_id)
+                return
+            self._results[result.result_id] = result
+            self._size += result.nbytes
+            # The newest result is kept even if it alone exceeds the cap.
+            while self._size > self.max_bytes and len(self._results) > 1:
+                _, evicted = self._results.popitem(last=False)
+                self._size -= evicted.nbytes
+
+    def get(self, result_id: str) -> QueryResult | None:
+        """Returns a stored result, or None if it was evicted."""
+        with self._lock:
+            result = self._results.get(result_id)
+            if result is not None:
+                self._results.move_to_end(result_id)
+            return result
+
+
+result_store = QueryResultStore(BQ_RESULT_STORE_MAX_BYTES)
+
+
+def save_query_result(state: Any, result: QueryResult) -> None:
+    """Stores a result and puts its handle into session state.
+
+    Args:
+      state: The session state, e.g. `tool_context.state`.
+      result: The query result.
+    """
+    result_store.put(result)
+    state[QUERY_RESULT_STATE_KEY] = result.handle()
+
+
+def load_query_result(state: Any) -> QueryResult | None:
+    """Returns the last query result of a session.
+
+    Args:
+      state: The session state, e.g. `tool_context.state`.
+
+    Returns:
+      The result, or None if there is none or it is not in this process's
+      store, e.g. because it was evicted or the session moved to another
+      replica. The handle's preview rows are then still in session state,
+      see `load_query_result_preview`.
+    """
+    handle = state.get(QUERY_RESULT_STATE_KEY)
+    if not isinstance(handle, dict) or "result_id" not in handle:
+        return None
+    return result_store.get(handle["result_id"])
+
+
+def load_query_result_preview(state: Any) -> dict[str, Any] | None:
+    """Returns the handle of the last query result of a session.
+
+    Args:
+      state: The session state, e.g. `tool_context.state`.
+
+    Returns:
+      The handle, with the result's "num_rows", "columns" and "preview"
+      rows, or None if there is none.
+    """
+    handle = state.get(QUERY_RESULT_STATE_KEY)
+    if not isinstance(handle, dict) or "preview" not in handle:
+        return None
+    return handle
@@ -0,0 +1,189 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Token-efficient encodings of query results for LLM prompts.
+
+A list of row dicts repeats every column name on every row. The formats below
+name each column once:
+
+- "csv" / "tsv": a header line followed by one line per row.
+- "markdown": a GitHub-flavored markdown table.
+- "json": a column-oriented JSON object, mapping column names to value lists.
+
+Long cells are truncated, and trailing columns, then trailing rows, are left
+out until the encoded result fits in a token budget. What was left out is
+reported alongside the encoded result.
+"""
+
+import csv
+import io
+import json
+from typing import Any, Callable
+
+from tabulate import tabulate
+
+from .query_results import QueryResult
+from .schema_renderer import estimate_tokens
+
+# Encodes (column names, rows of cell values) -> text.
+ResultFormatterType = Callable[[list[str], list[list[Any]]], str]
+
+
+def _format_cell(value: Any) -> str:
+    """Formats a cell value for the text formats."""
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def _truncate_cell(value: Any, max_chars: int | None) -> tuple[Any, bool]:
+    """Shortens long string cells, reporting whether the cell was shortened."""
+    if max_chars is None or not isinstance(value, str) or len(value) <= max_chars:
+        return value, False
+    return value[: max(max_chars - 3, 1)] + "...", True
+
+
+def _format_delimited(delimiter: str) -> ResultFormatterType:
+    """Returns a formatter writing a header line and one line per row."""
+
+    def format_delimited(column_names, rows):
+        output = io.StringIO()
+        writer = csv.writer(output, delimiter=delimiter, lineterminator="\n")
+        writer.writerow(column_names)
+        writer.writerows([_format_cell(value) for value in row] for row in rows)
+        return output.getvalue()
+
+    return format_delimited
+
+
+def _format_markdown(column_names, rows):
+    """Formats the rows as a markdown table."""
+    return tabulate(
+        [[_format_cell(value) for value in row] for row in rows],
+        headers=column_names,
+        tablefmt="github",
+        disable_numparse=True,
+    )
+
+
+def _format_json(column_names, rows):
+    """Formats the rows as a JSON object of columns."""
+    columns = {
+        name: [row[position] for row in rows]
+        for position, name in enumerate(column_names)
+    }
+    return json.dumps(columns, default=str, separators=(",", ":"))
+
+
+RESULT_FORMATS: dict[str, ResultFormatterType] = {
+    "csv": _format_delimited(","),
+    "tsv": _format_delimited("\t"),
+    "markdown": _format_markdown,
+    "json": _format_json,
+}
+
+
+class ResultEncoder:
+    """Encodes query results in a given format within a token budget.
+
+    Attributes:
+      result_format: The name of the format, a key of `RESULT_FORMATS`.
+      max_cell_chars: The maximum length of a string cell, or None.
+      token_budget: The maximum estimated tokens of an encoded result, or
+        None. Results that exceed it first lose trailing columns, down to
+        one, then trailing rows.
+    """
+
+    def __init__(
+        self,
+        result_format: str = "csv",
+        max_cell_chars: int | None = None,
+        token_budget: int | None = None,
+    ):
+        """Initializes the encoder."""
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unsupported result format: {result_format}")
+        self.result_format = result_format
+        self.max_cell_chars = max_cell_chars
+        self.token_budget = token_budget
+
+    def encode(self, query_result: QueryResult) -> tuple[str, dict[str, Any]]:
+        """Encodes a query result.
+
+        Args:
+          query_result: The rows to encode.
+
+        Returns:
+          The encoded rows, and what was trimmed to fit the budget: the number
+          of "truncated_cells", the "omitted_columns" and the number of
+          "omitted_rows". Keys are left out when nothing of the kind was
+          trimmed.
+        """
+        formatter = RESULT_FORMATS[self.result_format]
+        column_names = query_result.column_names
+        rows = []
+        # Per row, the positions of the cells that were truncated.
+        truncated_positions = []
+        for row in query_result.to_rows():
+            cells = []
+            positions = []
+            for position, name in enumerate(column_names):
+                value, truncated = _truncate_cell(row[name], self.max_cell_chars)
+                cells.append(value)
+                if truncated:
+                    positions.append(position)
+            rows.append(cells)
+            truncated_positions.append(positions)
+
+        num_columns = len(column_names)
+        num_rows = len(rows)
+
+        def encode_part():
+            return formatter(
+                column_names[:num_columns],
+                [row[:num_columns] for row in rows[:num_rows]],
+            )
+
+        text = encode_part()
+        if self.token_budget is not None:
+            while num_columns > 1 and estimate_tokens(text) > self.token_budget:
+                num_columns -= 1
+                text = encode_part()
+            if estimate_tokens(text) > self.token_budget:
+                # The longest prefix of rows that fits, by bisection.
+                low, high = 0, num_rows
+                while low < high:
+                    num_rows = (low + high + 1) // 2
+                    if estimate_tokens(encode_part()) <= self.token_budget:
+                        low = num_rows
+                    else:
+                        high = num_rows - 1
+                num_rows = low
+                text = encode_part()
+
+        truncated_cells = sum(
+            position < num_columns
+            for positions in truncated_positions[:num_rows]
+            for position in positions
+        )
+        trimmed = {}
+        if truncated_cells:
+            trimmed["truncated_cells"] = truncated_cells
+        if num_columns < len(column_names):
+            trimmed["omitted_columns"] = column_names[num_columns:]
+        if num_rows < len(rows):
+            trimmed["omitted_rows"] = len(rows) - num_rows
+        return text, trimmed
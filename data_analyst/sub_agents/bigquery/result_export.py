@@ -0,0 +1,185 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Exports complete query results through the BigQuery Storage Read API.
+
+`run_bigquery_validation` only fetches the first `MAX_NUM_ROWS` rows of a
+result over REST. With `BQ_STORAGE_EXPORT` enabled, larger results are also
+read from the query's destination table as Arrow record batches, over
+parallel Storage Read API streams, and written to a local Arrow IPC or
+Parquet file without converting any value to a Python object. Session state
+gets a JSON-serializable handle to the file, which `call_ds_agent` resolves.
+"""
+
+import itertools
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .query_results import QueryResult
+
+# Whether results larger than what the tool returns are exported to a file.
+BQ_STORAGE_EXPORT = os.getenv("BQ_STORAGE_EXPORT", "0") == "1"
+# "arrow" (Arrow IPC, memory-mapped when read back) or "parquet" (smaller).
+BQ_STORAGE_EXPORT_FORMAT = os.getenv("BQ_STORAGE_EXPORT_FORMAT", "arrow")
+# Maximum number of parallel read streams; 0 lets BigQuery decide.
+BQ_STORAGE_EXPORT_MAX_STREAMS = int(os.getenv("BQ_STORAGE_EXPORT_MAX_STREAMS", "4"))
+BQ_STORAGE_EXPORT_DIR = os.getenv(
+    "BQ_STORAGE_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "bq_exports")
+)
+# How long exported files are kept.
+BQ_STORAGE_EXPORT_TTL_SECONDS = int(os.getenv("BQ_STORAGE_EXPORT_TTL_SECONDS", "3600"))
+
+# The session state key holding the handle of the last exported result.
+EXPORT_STATE_KEY = "query_result_export"
+
+_FILE_EXTENSIONS = {"arrow": ".arrow", "parquet": ".parquet"}
+
+_read_client = None
+_read_client_lock = threading.Lock()
+
+
+def get_read_client():
+    """Returns the shared BigQuery Storage Read API client."""
+    global _read_client
+    with _read_client_lock:
+        if _read_client is None:
+            # Only needed, and only required to be installed, when exporting.
+            from google.cloud import bigquery_storage
+
+            _read_client = bigquery_storage.BigQueryReadClient()
+        return _read_client
+
+
+def _remove_expired_exports() -> None:
+    """Deletes the exported files older than `BQ_STORAGE_EXPORT_TTL_SECONDS`."""
+    expiry = time.time() - BQ_STORAGE_EXPORT_TTL_SECONDS
+    for entry in os.scandir(BQ_STORAGE_EXPORT_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < expiry:
+                os.remove(entry.path)
+        except OSError as e:
+            logging.warning("Could not remove the export %s: %s", entry.path, e)
+
+
+def export_query_results(
+    query_job, file_format: str | None = None
+) -> dict[str, Any]:
+    """Writes every row of a finished query to a local columnar file.
+
+    Record batches are written as they arrive, so the result is never held in
+    memory as a whole.
+
+    Args:
+      query_job (bigquery.QueryJob): The finished query.
+      file_format: "arrow" or "parquet"; defaults to
+        `BQ_STORAGE_EXPORT_FORMAT`.
+
+    Returns:
+      The handle of the export: its "path", "format", "num_rows" and
+      "columns".
+    """
+    file_format = file_format or BQ_STORAGE_EXPORT_FORMAT
+    if file_format not in _FILE_EXTENSIONS:
+        raise ValueError(f"Unsupported export format: {file_format}")
+    os.makedirs(BQ_STORAGE_EXPORT_DIR, exist_ok=True)
+    _remove_expired_exports()
+
+    rows = query_job.result()
+    batches = rows.to_arrow_iterable(
+        bqstorage_client=get_read_client(),
+        max_stream_count=BQ_STORAGE_EXPORT_MAX_STREAMS or None,
+    )
+    first_batch = next(batches, None)
+    schema = (
+        first_batch.schema
+        if first_batch is not None
+        else rows.to_arrow(create_bqstorage_client=False).schema
+    )
+
+    path = os.path.join(
+        BQ_STORAGE_EXPORT_DIR, query_job.job_id + _FILE_EXTENSIONS[file_format]
+    )
+    # Written under a temporary name, so that a reader never sees half a file.
+    partial_path = path + ".partial"
+    num_rows = 0
+    if file_format == "parquet":
+        writer = pq.ParquetWriter(partial_path, schema)
+    else:
+        writer = pa.ipc.new_file(partial_path, schema)
+    try:
+        try:
+            if first_batch is not None:
+                for batch in itertools.chain([first_batch], batches):
+                    writer.write_batch(batch)
+                    num_rows += batch.num_rows
+        finally:
+            writer.close()
+        os.replace(partial_path, path)
+    except BaseException:
+        # A failed read stream or write must not leave half a file behind.
+        try:
+            os.remove(partial_path)
+        except OSError:
+            pass
+        raise
+
+    logging.info("Exported %d rows to %s.", num_rows, path)
+    return {
+        "path": path,
+        "format": file_format,
+        "num_rows": num_rows,
+        "columns": schema.names,
+    }
+
+
+def read_export(handle: dict[str, Any]) -> QueryResult | None:
+    """Reads an exported result back.
+
+    Arrow IPC files are memory-mapped rather than read into memory.
+
+    Args:
+      handle: The handle returned by `export_query_results`.
+
+    Returns:
+      The result, or None if the file was removed in the meantime.
+    """
+    path = handle["path"]
+    if not os.path.exists(path):
+        return None
+    if handle["format"] == "parquet":
+        return QueryResult(pq.read_table(path))
+    # The buffers of the table keep the mapping open.
+    return QueryResult(pa.ipc.open_file(pa.memory_map(path)).read_all())
+
+
+def load_query_result_export(state: Any) -> QueryResult | None:
+    """Returns the complete last query result of a session, if it was exported.
+
+    Args:
+      state: The session state, e.g. `tool_context.state`.
+
+    Returns:
+      The result, or None if it was not exported or its file expired.
+    """
+    handle = state.get(EXPORT_STATE_KEY)
+    if not handle:
+        return None
+    return read_export(handle)
@@ -0,0 +1,185 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Persistent on-disk cache of the BigQuery schema used by the database agent."""
+
+import datetime
+import json
+import logging
+import os
+import tempfile
+from typing import Any
+
+# Bump whenever the layout of a table entry changes, so that snapshots written
+# by older code are rebuilt instead of reused.
+SCHEMA_CACHE_VERSION = 4
+
+TableEntryType = dict[str, Any]
+SchemaTablesType = dict[str, TableEntryType]
+
+
+def make_table_entry(
+    table_ref: str,
+    columns: list[dict[str, str | None]],
+    sample_rows: list[list[str]],
+    modified: datetime.datetime | None = None,
+    etag: str | None = None,
+    profile: dict[str, Any] | None = None,
+    values: dict[str, list[str]] | None = None,
+    partitioning: dict[str, Any] | None = None,
+    clustering: list[str] | None = None,
+    settings: dict[str, Any] | None = None,
+) -> TableEntryType:
+    """Creates the cache entry for a single table.
+
+    Args:
+      table_ref: The fully qualified table name, `project.dataset.table`.
+      columns: The top-level columns, each with a `name`, `type`, `mode` and
+        `description`.
+      sample_rows: Example rows, each value already formatted as a SQL literal.
+      modified: The table's last modification time, if known.
+      etag: The table's metadata etag, if known.
+      profile: The table's column statistics profile, if computed.
+      values: The distinct values of the table's indexed string columns, if
+        fetched.
+      partitioning: The table's partitioning, if it is partitioned: its `type`
+        (e.g. `DAY`, or `RANGE`), partitioning `field` (None for ingestion
+        time), `range` (`start`, `end` and `interval` of range partitioning)
+        and whether queries `require_filter` on it.
+      clustering: The table's clustering columns, in order, if it is clustered.
+      settings: The configuration the sample rows, profile and values were
+        fetched with, e.g. the sample mode, so that entries can be re-fetched
+        once it changes.
+
+    Returns:
+      A JSON-serializable table entry.
+    """
+    return {
+        "table_ref": table_ref,
+        "columns": columns,
+        "sample_rows": sample_rows,
+        "modified": modified.isoformat() if modified else None,
+        "etag": etag,
+        "profile": profile,
+        "values": values,
+        "partitioning": partitioning,
+        "clustering": clustering,
+        "settings": settings,
+        "fetched_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def is_table_entry_fresh(
+    entry: TableEntryType,
+    modified: datetime.datetime | None,
+    etag: str | None = None,
+) -> bool:
+    """Checks whether a cached table entry still matches the table metadata.
+
+    Entries that recorded a `modified` timestamp are fresh while it, and the
+    etag if both sides know one, are unchanged. Entries loaded without them
+    (e.g. from INFORMATION_SCHEMA) are fresh if the table has not been modified
+    since the entry was fetched.
+
+    Args:
+      entry: The cached table entry.
+      modified: The table's current last modification time.
+      etag: The table's current metadata etag, if known.
+
+    Returns:
+      True if the cached entry can be reused.
+    """
+    if modified is None:
+        return False
+    if entry.get("modified"):
+        if datetime.datetime.fromisoformat(entry["modified"]) != modified:
+            return False
+        return not (etag and entry.get("etag")) or entry["etag"] == etag
+    return modified <= datetime.datetime.fromisoformat(entry["fetched_at"])
+
+
+class SchemaCache:
+    """On-disk snapshot of per-table schema entries, keyed by project/dataset.
+
+    Each dataset is stored as one JSON file that is replaced atomically on
+    save, so readers never observe a partially written snapshot.
+
+    Attributes:
+      cache_dir: The directory the snapshots are stored in.
+    """
+
+    def __init__(self, cache_dir: str):
+        """Initializes the cache."""
+        self.cache_dir = cache_dir
+
+    def _path(self, project_id: str, dataset_id: str) -> str:
+        """Returns the snapshot path of a dataset."""
+        return os.path.join(self.cache_dir, f"{project_id}.{dataset_id}.json")
+
+    def load(self, project_id: str, dataset_id: str) -> SchemaTablesType | None:
+        """Loads the cached table entries of a dataset.
+
+        Args:
+          project_id: The ID of the Google Cloud project.
+          dataset_id: The ID of the BigQuery dataset.
+
+        Returns:
+          The table entries keyed by table ID in rendering order, or None if
+          there is no usable snapshot.
+        """
+        path = self._path(project_id, dataset_id)
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable schema cache %s: %s", path, e)
+            return None
+        if snapshot.get("version") != SCHEMA_CACHE_VERSION:
+            return None
+        return snapshot["tables"]
+
+    def save(
+        self, project_id: str, dataset_id: str, tables: SchemaTablesType
+    ) -> None:
+        """Stores the table entries of a dataset.
+
+        Failures are logged rather than raised: the cache only speeds up the
+        next start and must never break the current one.
+
+        Args:
+          project_id: The ID of the Google Cloud project.
+          dataset_id: The ID of the BigQuery dataset.
+          tables: The table entries keyed by table ID in rendering order.
+        """
+        path = self._path(project_id, dataset_id)
+        snapshot = {
+            "version": SCHEMA_CACHE_VERSION,
+            "project_id": project_id,
+            "dataset_id": dataset_id,
+            "tables": tables,
+        }
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logging.warning("Could not write schema cache %s: %s", path, e)
@@ -0,0 +1,178 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Question-aware schema linking for the NL2SQL prompts.
+
+The linker keeps a local lexical index over table names, column names and
+column descriptions, and uses it to select the part of the schema that is
+relevant to a question, so that wide datasets do not dominate the prompt.
+"""
+
+import collections
+import math
+import re
+
+from .schema_cache import SchemaTablesType
+from .schema_renderer import SchemaRenderer, SchemaSelectionType, estimate_tokens
+
+# Words that carry no signal for picking tables or columns.
+STOP_WORDS = frozenset(
+    """
+    a about above after all also an and any are as at be been before below
+    between both but by can could did do does each for from get give had has
+    have how i if in into is it its list me more most my no not of on only or
+    other our out over per please show so some than that the their them then
+    there these they this those to under up us was we were what when where
+    which while who whom why will with would you your
+    """.split()
+)
+
+# Column names that are kept in pruned tables because they are likely needed
+# to join the selected tables with each other.
+_KEY_COLUMN_PATTERN = re.compile(r"^(id|ID|key)$|_(id|ID|key)$|[a-z]Id$")
+
+
+def tokenize(text: str) -> list[str]:
+    """Splits text or an identifier into normalized search terms.
+
+    Identifiers are split on underscores, digits and camelCase boundaries, terms
+    are lowercased, trailing plural `s` is dropped and stop words are removed.
+    """
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text or "")
+    terms = []
+    for term in re.findall(r"[a-z]+", text.lower()):
+        if term in STOP_WORDS:
+            continue
+        if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+class SchemaLinker:
+    """Selects the tables and columns relevant to a natural language question.
+
+    Every table and every column is indexed as a small document: the table by
+    its name and the column by its name and description. A question is scored
+    against those documents with IDF weighting, so that rare terms such as a
+    column name outweigh terms shared by many columns.
+
+    Attributes:
+      tables: The schema cache entries the index was built from.
+      renderer: The renderer used to estimate the size of a selection.
+    """
+
+    def __init__(self, tables: SchemaTablesType, renderer: SchemaRenderer):
+        """Builds the index."""
+        self.tables = tables
+        self.renderer = renderer
+        # (table ID, column name or None for the table itself) -> terms.
+        self._documents: dict[tuple[str, str | None], set[str]] = {}
+        for table_id, entry in tables.items():
+            self._documents[(table_id, None)] = set(tokenize(table_id))
+            for column in entry["columns"]:
+                self._documents[(table_id, column["name"])] = set(
+                    tokenize(column["name"]) + tokenize(column["description"])
+                )
+        document_frequency = collections.Counter(
+            term for terms in self._documents.values() for term in terms
+        )
+        self._idf = {
+            term: math.log(1 + len(self._documents) / frequency)
+            for term, frequency in document_frequency.items()
+        }
+
+    def _score(self, terms: set[str], document: set[str]) -> float:
+        """Returns the summed IDF of the question terms found in a document."""
+        return sum(self._idf[term] for term in terms & document)
+
+    def link(
+        self,
+        question: str,
+        token_budget: int,
+        min_coverage: float = 0.5,
+        min_relative_score: float = 0.2,
+        max_columns_per_table: int = 40,
+    ) -> SchemaSelectionType | None:
+        """Selects the tables and columns relevant to a question.
+
+        Tables are ranked by how well their name and columns match the question
+        and added in that order while the rendered DDL fits `token_budget`.
+        Tables scoring below `min_relative_score` times the best score are
+        considered incidental matches and left out. Tables with more than
+        `max_columns_per_table` columns are pruned to the matching columns plus
+        likely join keys.
+
+        Args:
+          question: The natural language question.
+          token_budget: The maximum estimated number of tokens of the rendered
+            selection.
+          min_coverage: The minimum fraction of the question's terms that must
+            match the schema. Below it the linker is not confident enough to
+            prune and returns None.
+          min_relative_score: The minimum score of a selected table, relative to
+            the best scoring table.
+          max_columns_per_table: Tables up to this width are kept whole.
+
+        Returns:
+          The selected columns keyed by table ID (None meaning all columns), or
+          None if the full schema should be used instead.
+        """
+        terms = set(tokenize(question))
+        if not terms:
+            return None
+        matched_terms = {term for term in terms if term in self._idf}
+        if len(matched_terms) / len(terms) < min_coverage:
+            return None
+
+        table_scores = collections.Counter()
+        column_scores = collections.defaultdict(dict)
+        for (table_id, column_name), document in self._documents.items():
+            score = self._score(matched_terms, document)
+            if not score:
+                continue
+            if column_name is None:
+                # A match on the table name is a strong signal on its own.
+                table_scores[table_id] += 2 * score
+            else:
+                table_scores[table_id] += score
+                column_scores[table_id][column_name] = score
+        if not table_scores:
+            return None
+
+        ranked_tables = table_scores.most_common()
+        min_score = min_relative_score * ranked_tables[0][1]
+        selection = {}
+        used_tokens = 0
+        for table_id, score in ranked_tables:
+            if score < min_score:
+                break
+            entry = self.tables[table_id]
+            column_names = None
+            if len(entry["columns"]) > max_columns_per_table:
+                column_names = [
+                    column["name"]
+                    for column in entry["columns"]
+                    if column["name"] in column_scores[table_id]
+                    or _KEY_COLUMN_PATTERN.search(column["name"])
+                ]
+            tokens = estimate_tokens(self.renderer.render_table(entry, column_names))
+            if used_tokens + tokens > token_budget:
+                if not selection:
+                    # Not even the best match fits; let the caller decide.
+                    return None
+                continue
+            selection[table_id] = column_names
+            used_tokens += tokens
+        return selection
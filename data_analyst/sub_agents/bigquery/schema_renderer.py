@@ -0,0 +1,387 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Renders the cached BigQuery schema entries into prompt text.
+
+Three formats are available:
+
+- `ddl`: `CREATE OR REPLACE TABLE` statements followed by `INSERT INTO`
+  example rows. This is the most verbose format and the default.
+- `compact`: one `table(column TYPE, ...)` line per table with the example rows
+  as tuples.
+- `markdown`: one column table and one example row table per table.
+
+Tables with a column statistics profile (see `column_profiler`) additionally
+get one statistics line per profiled column. Partitioned and clustered tables
+get their `PARTITION BY`, `CLUSTER BY` and `OPTIONS` clauses, so that the model
+knows which filters prune the scan.
+"""
+
+from typing import Any, Callable
+
+import tabulate
+
+from .schema_cache import SchemaTablesType, TableEntryType
+
+# Maps a table ID to the names of the columns to render, or None for all.
+SchemaSelectionType = dict[str, list[str] | None]
+
+# Renders one table: (entry, column positions, example rows, statistics lines)
+# -> text.
+TableFormatterType = Callable[
+    [TableEntryType, list[int], list[list[str]], list[str]], str
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of LLM tokens in `text`.
+
+    Uses the common approximation of four characters per token, which is close
+    enough for budgeting and needs no tokenizer round trip.
+    """
+    return (len(text) + 3) // 4
+
+
+def format_sample_value(value: Any) -> str:
+    """Formats a sample value as the literal used in `INSERT INTO` examples."""
+    if isinstance(value, str):
+        return f"'{value}'"
+    if value is None:
+        return "NULL"
+    return f"{value}"
+
+
+def truncate_literal(literal: str, max_chars: int | None) -> str:
+    """Shortens a sample value literal to at most `max_chars` characters.
+
+    Quoted string literals keep their closing quote so they stay valid SQL.
+    """
+    if max_chars is None or len(literal) <= max_chars:
+        return literal
+    if literal.startswith("'") and literal.endswith("'") and max_chars > 5:
+        return literal[: max_chars - 4] + "...'"
+    return literal[: max(max_chars - 3, 1)] + "..."
+
+
+def format_column_statistics(
+    name: str, stats: dict[str, Any], max_value_chars: int | None = None
+) -> str:
+    """Formats the profile of a column as a single line.
+
+    For example: `` `country`: 2% NULL, ~12 distinct, 'AR'..'US', top 'US' (1200) ``.
+    """
+    parts = [
+        f"{stats['null_fraction']:.0%} NULL",
+        f"~{stats['approx_distinct']} distinct",
+    ]
+    if "min" in stats:
+        parts.append(
+            f"{truncate_literal(stats['min'], max_value_chars)}.."
+            f"{truncate_literal(stats['max'], max_value_chars)}"
+        )
+    if stats.get("top_values"):
+        top_values = ", ".join(
+            f"{truncate_literal(value, max_value_chars)} ({count})"
+            for value, count in stats["top_values"]
+        )
+        parts.append(f"top {top_values}")
+    return f"`{name}`: {', '.join(parts)}"
+
+
+def _column_type(column: dict[str, Any]) -> str:
+    """Returns the rendered type of a column, e.g. `STRING ARRAY`."""
+    if column["mode"] == "REPEATED":
+        return f"{column['type']} ARRAY"
+    return column["type"]
+
+
+def partition_expression(entry: TableEntryType) -> str | None:
+    """Returns the `PARTITION BY` expression of a table, or None.
+
+    For example `DATE(created_at)` for a table partitioned daily on a
+    `TIMESTAMP` column, or `_PARTITIONDATE` for ingestion time partitioning.
+    """
+    partitioning = entry.get("partitioning")
+    if not partitioning:
+        return None
+    field = partitioning["field"]
+    unit = partitioning["type"]
+    if unit == "RANGE":
+        partition_range = partitioning["range"]
+        return (
+            f"RANGE_BUCKET(`{field}`, GENERATE_ARRAY({partition_range['start']},"
+            f" {partition_range['end']}, {partition_range['interval']}))"
+        )
+    if field is None:
+        if unit == "DAY":
+            return "_PARTITIONDATE"
+        return f"TIMESTAMP_TRUNC(_PARTITIONTIME, {unit})"
+    field_type = next(
+        (column["type"] for column in entry["columns"] if column["name"] == field),
+        "TIMESTAMP",
+    )
+    if field_type == "DATE":
+        return f"`{field}`" if unit == "DAY" else f"DATE_TRUNC(`{field}`, {unit})"
+    if field_type == "DATETIME":
+        return f"DATETIME_TRUNC(`{field}`, {unit})"
+    if unit == "DAY":
+        return f"DATE(`{field}`)"
+    return f"TIMESTAMP_TRUNC(`{field}`, {unit})"
+
+
+def _table_options(entry: TableEntryType) -> list[str]:
+    """Returns the `PARTITION BY`, `CLUSTER BY` and `OPTIONS` clauses of a table."""
+    clauses = []
+    if expression := partition_expression(entry):
+        clauses.append(f"PARTITION BY {expression}")
+    if entry.get("clustering"):
+        fields = ", ".join(f"`{field}`" for field in entry["clustering"])
+        clauses.append(f"CLUSTER BY {fields}")
+    if (entry.get("partitioning") or {}).get("require_filter"):
+        clauses.append("OPTIONS (require_partition_filter = TRUE)")
+    return clauses
+
+
+def _format_ddl(
+    entry: TableEntryType,
+    positions: list[int],
+    rows: list[list[str]],
+    statistics: list[str],
+) -> str:
+    """Renders a table as DDL followed by one `INSERT INTO` per example row."""
+    table_ref = entry["table_ref"]
+    column_lines = []
+    for position in positions:
+        column = entry["columns"][position]
+        line = f"  `{column['name']}` {_column_type(column)}"
+        if column["description"]:
+            line += f" COMMENT '{column['description']}'"
+        column_lines.append(line)
+
+    parts = [f"CREATE OR REPLACE TABLE `{table_ref}` (\n"]
+    parts.append(",\n".join(column_lines))
+    parts.append("\n)")
+    parts.extend(f"\n{clause}" for clause in _table_options(entry))
+    parts.append(";\n\n")
+    if statistics:
+        parts.append(f"-- Column statistics for table `{table_ref}`:\n")
+        parts.extend(f"-- {line}\n" for line in statistics)
+        parts.append("\n")
+    if rows:
+        parts.append(f"-- Example values for table `{table_ref}`:\n")
+        for row in rows:
+            parts.append(f"INSERT INTO `{table_ref}` VALUES\n({','.join(row)});\n\n")
+    return "".join(parts)
+
+
+def _format_compact(
+    entry: TableEntryType,
+    positions: list[int],
+    rows: list[list[str]],
+    statistics: list[str],
+) -> str:
+    """Renders a table as `table(column TYPE, ...)` plus example tuples."""
+    columns = []
+    for position in positions:
+        column = entry["columns"][position]
+        text = f"{column['name']} {_column_type(column)}"
+        if column["description"]:
+            text += f" '{column['description']}'"
+        columns.append(text)
+    parts = [f"`{entry['table_ref']}`({', '.join(columns)})\n"]
+    if clauses := _table_options(entry):
+        parts.append(f"  {' '.join(clauses)}\n")
+    if statistics:
+        parts.append(f"  stats: {'; '.join(statistics)}\n")
+    if rows:
+        examples = "; ".join(f"({', '.join(row)})" for row in rows)
+        parts.append(f"  examples: {examples}\n")
+    return "".join(parts)
+
+
+def _format_markdown(
+    entry: TableEntryType,
+    positions: list[int],
+    rows: list[list[str]],
+    statistics: list[str],
+) -> str:
+    """Renders a table as markdown column and example row tables."""
+    columns = [entry["columns"][position] for position in positions]
+    parts = [f"### `{entry['table_ref']}`\n\n"]
+    parts.append(
+        tabulate.tabulate(
+            [
+                [column["name"], _column_type(column), column["description"] or ""]
+                for column in columns
+            ],
+            headers=["column", "type", "description"],
+            tablefmt="github",
+        )
+    )
+    parts.append("\n\n")
+    if clauses := _table_options(entry):
+        parts.append(f"Storage: {' '.join(clauses)}\n\n")
+    if statistics:
+        parts.append("Column statistics:\n\n")
+        parts.extend(f"- {line}\n" for line in statistics)
+        parts.append("\n")
+    if rows:
+        parts.append("Example rows:\n\n")
+        parts.append(
+            tabulate.tabulate(
+                rows,
+                headers=[column["name"] for column in columns],
+                tablefmt="github",
+                disable_numparse=True,
+            )
+        )
+        parts.append("\n\n")
+    return "".join(parts)
+
+
+SCHEMA_FORMATS: dict[str, TableFormatterType] = {
+    "ddl": _format_ddl,
+    "compact": _format_compact,
+    "markdown": _format_markdown,
+}
+
+
+class SchemaRenderer:
+    """Renders schema entries in a given format within token budgets.
+
+    Attributes:
+      schema_format: The name of the format, a key of `SCHEMA_FORMATS`.
+      max_sample_rows: The maximum number of example rows per table.
+      max_value_chars: The maximum length of an example value, or None.
+      table_token_budget: The maximum estimated tokens per table, or None. Wider
+        tables first lose example rows, then trailing columns.
+      token_budget: The maximum estimated tokens of the whole schema, or None.
+        Tables that no longer fit are listed by name only.
+    """
+
+    def __init__(
+        self,
+        schema_format: str = "ddl",
+        max_sample_rows: int = 5,
+        max_value_chars: int | None = None,
+        table_token_budget: int | None = None,
+        token_budget: int | None = None,
+    ):
+        """Initializes the renderer."""
+        if schema_format not in SCHEMA_FORMATS:
+            raise ValueError(f"Unsupported schema format: {schema_format}")
+        self.schema_format = schema_format
+        self.max_sample_rows = max_sample_rows
+        self.max_value_chars = max_value_chars
+        self.table_token_budget = table_token_budget
+        self.token_budget = token_budget
+
+    def render_table(
+        self, entry: TableEntryType, column_names: list[str] | None = None
+    ) -> str:
+        """Renders a single table within the per-table token budget.
+
+        Args:
+          entry: The schema cache entry of the table.
+          column_names: The columns to render, or None to render all of them.
+            The example values are pruned to the same columns.
+
+        Returns:
+          The rendered table.
+        """
+        formatter = SCHEMA_FORMATS[self.schema_format]
+        positions = [
+            position
+            for position, column in enumerate(entry["columns"])
+            if column_names is None or column["name"] in column_names
+        ]
+        rows = [
+            [
+                truncate_literal(row[position], self.max_value_chars)
+                for position in positions
+            ]
+            for row in entry["sample_rows"][: self.max_sample_rows]
+        ]
+
+        def format_table(positions, rows):
+            profile = entry.get("profile") or {"columns": {}}
+            statistics = [
+                format_column_statistics(
+                    entry["columns"][position]["name"],
+                    profile["columns"][entry["columns"][position]["name"]],
+                    self.max_value_chars,
+                )
+                for position in positions
+                if entry["columns"][position]["name"] in profile["columns"]
+            ]
+            return formatter(entry, positions, rows, statistics)
+
+        text = format_table(positions, rows)
+        if self.table_token_budget is None:
+            return text
+        while rows and estimate_tokens(text) > self.table_token_budget:
+            rows = rows[:-1]
+            text = format_table(positions, rows)
+        omitted_columns = 0
+        while len(positions) > 1 and estimate_tokens(text) > self.table_token_budget:
+            positions = positions[:-1]
+            omitted_columns += 1
+            text = format_table(positions, rows)
+        if omitted_columns:
+            text += (
+                f"-- {omitted_columns} more column(s) of `{entry['table_ref']}`"
+                " omitted.\n\n"
+            )
+        return text
+
+    def render(
+        self,
+        tables: SchemaTablesType,
+        selection: SchemaSelectionType | None = None,
+    ) -> tuple[str, dict[str, int]]:
+        """Renders the schema of a dataset.
+
+        Args:
+          tables: The schema cache entries keyed by table ID.
+          selection: The tables and columns to render, or None to render all of
+            them. Tables are always rendered in the order of `tables`.
+
+        Returns:
+          The rendered schema, and the estimated number of tokens each rendered
+          table contributes to it, keyed by table ID.
+        """
+        parts = []
+        token_counts = {}
+        omitted_tables = []
+        used_tokens = 0
+        for table_id, entry in tables.items():
+            if selection is not None and table_id not in selection:
+                continue
+            text = self.render_table(
+                entry, selection[table_id] if selection is not None else None
+            )
+            tokens = estimate_tokens(text)
+            if (
+                self.token_budget is not None
+                and used_tokens + tokens > self.token_budget
+            ):
+                omitted_tables.append(entry["table_ref"])
+                continue
+            parts.append(text)
+            token_counts[table_id] = tokens
+            used_tokens += tokens
+        if omitted_tables:
+            names = ", ".join(f"`{table_ref}`" for table_ref in omitted_tables)
+            parts.append(f"-- Schema of further tables omitted: {names}\n")
+        return "".join(parts), token_counts
@@ -0,0 +1,169 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Coalesces identical concurrent BigQuery jobs into one.
+
+When several sessions run the same query at the same time, only the first
+call submits a job. The others wait for that job and receive its result, or
+its error. If every waiter gives up (e.g. on a timeout, or because its session
+ended), the job is cancelled.
+"""
+
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+# How often a waiter checks whether it was cancelled.
+_CANCEL_POLL_SECONDS = 0.5
+
+
+class _Flight:
+    """A job in flight and the callers waiting for it."""
+
+    def __init__(self, cancel: Callable[[Any], None]):
+        self.future = concurrent.futures.Future()
+        self.cancel = cancel
+        self.job = None
+        self.waiters = 0
+        self.abandoned = False
+
+
+class SingleFlight:
+    """Runs at most one job per key at a time and shares its result.
+
+    The job is submitted and awaited on a background thread, so every caller,
+    including the one that started it, is an equal waiter that may leave
+    without affecting the others.
+    """
+
+    def __init__(self):
+        """Initializes an instance without jobs in flight."""
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(
+        self,
+        key: str,
+        submit: Callable[[], Any],
+        fetch: Callable[[Any], Any],
+        cancel: Callable[[Any], None],
+        timeout: float | None = None,
+        cancelled: threading.Event | None = None,
+    ) -> Any:
+        """Runs a job, or joins the identical job already in flight.
+
+        Args:
+          key: Identifies identical jobs, e.g. the canonical SQL.
+          submit: Starts the job and returns a handle, e.g. a `QueryJob`.
+          fetch: Waits for the job and returns its result. The result is
+            shared by all waiters and must not be modified by them.
+          cancel: Cancels the job; called once the last waiter has left
+            before the job finished.
+          timeout: Seconds to wait for the result, or None to wait forever.
+          cancelled: Set when the caller no longer needs the result, e.g.
+            because its session ended.
+
+        Returns:
+          The result of `fetch`.
+
+        Raises:
+          concurrent.futures.TimeoutError: If the result is not available
+            within `timeout`.
+          concurrent.futures.CancelledError: If `cancelled` was set first.
+          Exception: Whatever `submit` or `fetch` raised.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            start = flight is None
+            if start:
+                flight = _Flight(cancel)
+                self._flights[key] = flight
+            flight.waiters += 1
+        if start:
+            threading.Thread(
+                target=self._run, args=(key, flight, submit, fetch), daemon=True
+            ).start()
+        try:
+            return self._wait(flight, timeout, cancelled)
+        finally:
+            self._leave(key, flight)
+
+    @staticmethod
+    def _wait(
+        flight: _Flight, timeout: float | None, cancelled: threading.Event | None
+    ) -> Any:
+        """Waits for the result of a flight until timed out or cancelled."""
+        if cancelled is None:
+            return flight.future.result(timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if cancelled.is_set():
+                raise concurrent.futures.CancelledError()
+            wait_seconds = _CANCEL_POLL_SECONDS
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise concurrent.futures.TimeoutError()
+                wait_seconds = min(wait_seconds, remaining)
+            try:
+                return flight.future.result(wait_seconds)
+            except concurrent.futures.TimeoutError:
+                continue
+
+    def _run(
+        self,
+        key: str,
+        flight: _Flight,
+        submit: Callable[[], Any],
+        fetch: Callable[[Any], Any],
+    ) -> None:
+        """Submits and awaits the job of a flight, then publishes its result."""
+        try:
+            job = submit()
+            with self._lock:
+                flight.job = job
+                abandoned = flight.abandoned
+            if abandoned:
+                self._cancel(flight)
+            flight.future.set_result(fetch(job))
+        except BaseException as e:  # pylint: disable=broad-exception-caught
+            flight.future.set_exception(e)
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    def _leave(self, key: str, flight: _Flight) -> None:
+        """Removes a waiter, cancelling the job if it was the last one."""
+        with self._lock:
+            flight.waiters -= 1
+            if flight.waiters or flight.future.done():
+                return
+            flight.abandoned = True
+            # New callers must not join a job that is being cancelled.
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            job_started = flight.job is not None
+        if job_started:
+            self._cancel(flight)
+
+    @staticmethod
+    def _cancel(flight: _Flight) -> None:
+        """Cancels the job of an abandoned flight, logging failures."""
+        try:
+            flight.cancel(flight.job)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.warning("Cancelling an abandoned job failed: %s", e)
@@ -0,0 +1,180 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Single-parse analysis of the SQL generated by the NL2SQL tools.
+
+A query is parsed once with sqlglot and the resulting AST is reused for every
+check `run_bigquery_validation` performs: read-only classification, `LIMIT`
+injection, table extraction and the canonical form used as cache key.
+"""
+
+import hashlib
+
+import sqlglot
+from sqlglot import exp
+
+# Statements that modify data or metadata, wherever they appear in the AST.
+_WRITE_EXPRESSIONS = (
+    exp.Alter,
+    exp.Command,
+    exp.Create,
+    exp.Delete,
+    exp.Drop,
+    exp.Insert,
+    exp.Merge,
+    exp.TruncateTable,
+    exp.Update,
+)
+
+# Functions whose result changes between runs of the same query.
+_NONDETERMINISTIC_EXPRESSIONS = (
+    exp.CurrentDate,
+    exp.CurrentDatetime,
+    exp.CurrentTime,
+    exp.CurrentTimestamp,
+    exp.CurrentUser,
+    exp.Rand,
+    exp.Uuid,
+)
+_NONDETERMINISTIC_FUNCTIONS = frozenset({"session_user"})
+
+
+class ParsedQuery:
+    """A GoogleSQL query parsed once with sqlglot.
+
+    Attributes:
+      sql: The query text the AST was parsed from.
+      statements: The parsed statements. A valid query has exactly one.
+    """
+
+    def __init__(self, sql: str):
+        """Parses the query.
+
+        Args:
+          sql: The GoogleSQL query.
+
+        Raises:
+          sqlglot.errors.SqlglotError: If sqlglot cannot tokenize or parse the
+            query.
+        """
+        self.sql = sql
+        self.statements = [
+            statement
+            for statement in sqlglot.parse(sql, read="bigquery")
+            if statement is not None
+        ]
+
+    @property
+    def statement(self) -> exp.Expression | None:
+        """The single statement of the query, or None if there is not one."""
+        return self.statements[0] if len(self.statements) == 1 else None
+
+    def is_read_only(self) -> bool:
+        """Checks whether the query is a single statement that only reads data.
+
+        Unlike a keyword blacklist, identifiers such as `created_at` or
+        `update_time` never cause a rejection.
+        """
+        statement = self.statement
+        return (
+            isinstance(statement, exp.Query)
+            and statement.find(*_WRITE_EXPRESSIONS) is None
+        )
+
+    def is_deterministic(self) -> bool:
+        """Checks whether running the query twice gives the same result.
+
+        Queries calling e.g. `CURRENT_DATE()` or `RAND()` are not, so their
+        results must not be reused.
+        """
+        for statement in self.statements:
+            if statement.find(*_NONDETERMINISTIC_EXPRESSIONS) is not None:
+                return False
+            for function in statement.find_all(exp.Anonymous):
+                if function.name.lower() in _NONDETERMINISTIC_FUNCTIONS:
+                    return False
+        return True
+
+    def with_limit(self, max_rows: int) -> str:
+        """Returns the query with its outermost `LIMIT` at most `max_rows`.
+
+        A missing limit is added and a larger literal limit is tightened; limits
+        of subqueries are left alone. The query text is returned unchanged when
+        its limit already suffices.
+
+        Args:
+          max_rows: The maximum number of rows the query may return.
+
+        Returns:
+          The query text.
+        """
+        statement = self.statement
+        if not isinstance(statement, exp.Query):
+            return self.sql
+        limit = statement.args.get("limit")
+        if limit is not None:
+            value = limit.expression
+            if not isinstance(value, exp.Literal) or value.is_string:
+                return self.sql
+            if int(value.this) <= max_rows:
+                return self.sql
+        return statement.limit(max_rows).sql(dialect="bigquery")
+
+    def table_refs(self, project_id: str, dataset_id: str) -> list[str]:
+        """Returns the fully qualified names of the tables the query reads.
+
+        Common table expressions are not tables and are left out. Unqualified
+        names are resolved against the given project and dataset.
+
+        Args:
+          project_id: The project of tables referenced without one.
+          dataset_id: The dataset of tables referenced without one.
+
+        Returns:
+          The `project.dataset.table` names, in order of first reference.
+        """
+        if self.statement is None:
+            return []
+        cte_names = {cte.alias_or_name for cte in self.statement.find_all(exp.CTE)}
+        table_refs = []
+        for table in self.statement.find_all(exp.Table):
+            if not table.name or (not table.db and table.name in cte_names):
+                continue
+            table_ref = ".".join(
+                (table.catalog or project_id, table.db or dataset_id, table.name)
+            )
+            if table_ref not in table_refs:
+                table_refs.append(table_ref)
+        return table_refs
+
+    def cache_key(self, project_id: str, dataset_id: str) -> str:
+        """Returns a key identifying the query independent of its formatting.
+
+        Whitespace, comments and keyword case do not change the key; the
+        project and dataset unqualified names resolve against do.
+
+        Args:
+          project_id: The default project of the query.
+          dataset_id: The default dataset of the query.
+
+        Returns:
+          A hex digest.
+        """
+        canonical_sql = ";\n".join(
+            statement.sql(dialect="bigquery", comments=False)
+            for statement in self.statements
+        )
+        return hashlib.sha256(
+            f"{project_id}\n{dataset_id}\n{canonical_sql}".encode()
+        ).hexdigest()
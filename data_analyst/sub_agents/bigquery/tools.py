@@ -14,17 +14,42 @@
 
 """This file contains the tools used by the database agent."""
 
-import datetime
+import concurrent.futures
+import hashlib
+import json
 import logging
 import os
 import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from data_analyst.utils.utils import get_env_var
 from google.adk.tools import ToolContext
 from google.cloud import bigquery
 from google.genai import Client
+import sqlglot
 
 from .chase_sql import chase_constants
+from .column_profiler import profile_table
+from .partition_filters import find_missing_partition_filters
+from .nl2sql_cache import NL2SQLCache, make_nl2sql_cache_key
+from .query_cache import QueryResultCache
+from .query_policy import resolve_query_policy, session_cancelled
+from .query_results import QueryResult, save_query_result
+from .result_encoder import ResultEncoder
+from .result_export import (
+    BQ_STORAGE_EXPORT,
+    EXPORT_STATE_KEY,
+    export_query_results,
+)
+from .single_flight import SingleFlight
+from .schema_linking import SchemaLinker
+from .schema_cache import SchemaCache, is_table_entry_fresh, make_table_entry
+from .schema_renderer import SchemaRenderer, format_sample_value
+from .sql_parsing import ParsedQuery
+from .value_index import ValueIndex, fetch_distinct_values
 
 # Assume that `BQ_PROJECT_ID` is set in the environment. See the
 # `data_agent` README for more details.
@@ -33,10 +58,156 @@ location = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
 llm_client = Client(vertexai=True, project=project, location=location)
 
 MAX_NUM_ROWS = 80
+# Maximum number of tables introspected concurrently by `get_bigquery_schema`.
+BQ_SCHEMA_MAX_WORKERS = int(os.getenv("BQ_SCHEMA_MAX_WORKERS", "8"))
+# How the schema is loaded: "TABLES" (one `get_table` per table) or
+# "INFORMATION_SCHEMA" (one query for the whole dataset).
+BQ_SCHEMA_LOADER = os.getenv("BQ_SCHEMA_LOADER", "TABLES")
+# Directory of the persistent schema cache. An empty value disables it.
+BQ_SCHEMA_CACHE_DIR = os.getenv(
+    "BQ_SCHEMA_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "data_analyst_schema_cache"),
+)
+# Directory of the persistent cache of validated SQL per question. An empty
+# value disables it.
+BQ_NL2SQL_CACHE_DIR = os.getenv(
+    "BQ_NL2SQL_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "data_analyst_nl2sql_cache"),
+)
+BQ_NL2SQL_CACHE_MAX_ENTRIES = int(os.getenv("BQ_NL2SQL_CACHE_MAX_ENTRIES", "1000"))
+# Seconds between incremental background schema refreshes. 0 disables them.
+BQ_SCHEMA_REFRESH_INTERVAL_SECONDS = float(
+    os.getenv("BQ_SCHEMA_REFRESH_INTERVAL_SECONDS", "0")
+)
+# Delays before retrying a failed background schema refresh, doubling per
+# consecutive failure. The maximum applies without periodic refreshes, which
+# otherwise cap the delay at their interval.
+_SCHEMA_REFRESH_RETRY_SECONDS = 30
+_SCHEMA_REFRESH_MAX_RETRY_SECONDS = 600
+# How the schema is rendered into prompts; see `schema_renderer`. Budgets are
+# estimated tokens, 0 meaning unlimited.
+BQ_SCHEMA_FORMAT = os.getenv("BQ_SCHEMA_FORMAT", "ddl")
+BQ_SCHEMA_SAMPLE_ROWS = int(os.getenv("BQ_SCHEMA_SAMPLE_ROWS", "5"))
+BQ_SCHEMA_MAX_VALUE_CHARS = int(os.getenv("BQ_SCHEMA_MAX_VALUE_CHARS", "200"))
+BQ_SCHEMA_TABLE_TOKEN_BUDGET = int(os.getenv("BQ_SCHEMA_TABLE_TOKEN_BUDGET", "0"))
+BQ_SCHEMA_TOKEN_BUDGET = int(os.getenv("BQ_SCHEMA_TOKEN_BUDGET", "0"))
+# What describes the values of each table: "rows" (example rows), "profile"
+# (per-column statistics, see `column_profiler`) or "both".
+BQ_SCHEMA_SAMPLE_MODE = os.getenv("BQ_SCHEMA_SAMPLE_MODE", "rows")
+# Column profiling knobs. 0 disables table sampling and the bytes guardrail.
+BQ_PROFILE_TOP_K = int(os.getenv("BQ_PROFILE_TOP_K", "5"))
+BQ_PROFILE_SAMPLE_PERCENT = float(os.getenv("BQ_PROFILE_SAMPLE_PERCENT", "0"))
+BQ_PROFILE_MAX_BYTES_BILLED = int(
+    os.getenv("BQ_PROFILE_MAX_BYTES_BILLED", str(10 * 1024**3))
+)
+# What `run_bigquery_validation` does with queries that scan a partitioned
+# table without filtering on its partitioning column: "off", "warn" (report it
+# next to the results) or "error" (reject the query before running it).
+BQ_PARTITION_FILTER_CHECK = os.getenv("BQ_PARTITION_FILTER_CHECK", "off")
+# Whether `run_bigquery_validation` dry-runs queries before running them, and
+# the estimated bytes above which a query is rejected ("error") or only
+# reported ("warn"). A limit of 0 disables the check.
+BQ_DRY_RUN = os.getenv("BQ_DRY_RUN", "1") == "1"
+BQ_MAX_BYTES_PROCESSED = int(os.getenv("BQ_MAX_BYTES_PROCESSED", "0"))
+BQ_MAX_BYTES_PROCESSED_MODE = os.getenv("BQ_MAX_BYTES_PROCESSED_MODE", "error")
+# Results of `run_bigquery_validation` are reused for this long, unless a table
+# the query read changed. 0 disables the result cache.
+BQ_RESULT_CACHE_TTL_SECONDS = float(os.getenv("BQ_RESULT_CACHE_TTL_SECONDS", "600"))
+BQ_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("BQ_RESULT_CACHE_MAX_ENTRIES", "256"))
+BQ_RESULT_CACHE_MAX_BYTES = int(
+    os.getenv("BQ_RESULT_CACHE_MAX_BYTES", str(64 * 1024**2))
+)
+# How long the table modification times checked by the result cache are
+# reused, so that cache hits within it do not wait for a metadata query.
+BQ_RESULT_CACHE_REVALIDATE_SECONDS = float(
+    os.getenv("BQ_RESULT_CACHE_REVALIDATE_SECONDS", "10")
+)
+# How `run_bigquery_validation` returns rows to the model: "csv", "tsv",
+# "markdown", "json" (see `result_encoder`) or "rows" for a list of dicts. The
+# encoded rows are kept within a token budget, cutting cells longer than
+# BQ_RESULT_MAX_CELL_CHARS characters.
+BQ_RESULT_FORMAT = os.getenv("BQ_RESULT_FORMAT", "csv")
+BQ_RESULT_MAX_CELL_CHARS = int(os.getenv("BQ_RESULT_MAX_CELL_CHARS", "200"))
+BQ_RESULT_TOKEN_BUDGET = int(os.getenv("BQ_RESULT_TOKEN_BUDGET", "4000"))
+# Whether NL2SQL prompts get the stored values closest to the question's
+# literals, and the maximum number of distinct values of an indexed column.
+BQ_VALUE_INDEX = os.getenv("BQ_VALUE_INDEX", "0") == "1"
+BQ_VALUE_INDEX_MAX_DISTINCT = int(os.getenv("BQ_VALUE_INDEX_MAX_DISTINCT", "1000"))
+# Whether NL2SQL prompts only include the part of the schema relevant to the
+# question, and the maximum estimated number of tokens of that part.
+BQ_SCHEMA_LINKING = os.getenv("BQ_SCHEMA_LINKING", "0") == "1"
+BQ_SCHEMA_LINKING_TOKEN_BUDGET = int(
+    os.getenv("BQ_SCHEMA_LINKING_TOKEN_BUDGET", "8000")
+)
+
+# GoogleSQL type names that `Table.schema` reports under their legacy names.
+_INFORMATION_SCHEMA_TYPES = {
+    "INT64": "INTEGER",
+    "FLOAT64": "FLOAT",
+    "BOOL": "BOOLEAN",
+    "STRUCT": "RECORD",
+}
+
+# The schema cache entry keys that describe a table, as opposed to the keys
+# used to track its freshness.
+_TABLE_CONTENT_KEYS = (
+    "columns",
+    "sample_rows",
+    "profile",
+    "values",
+    "partitioning",
+    "clustering",
+)
 
 
 database_settings = None
 bq_client = None
+schema_cache = SchemaCache(BQ_SCHEMA_CACHE_DIR) if BQ_SCHEMA_CACHE_DIR else None
+schema_renderer = SchemaRenderer(
+    schema_format=BQ_SCHEMA_FORMAT,
+    max_sample_rows=BQ_SCHEMA_SAMPLE_ROWS,
+    max_value_chars=BQ_SCHEMA_MAX_VALUE_CHARS or None,
+    table_token_budget=BQ_SCHEMA_TABLE_TOKEN_BUDGET or None,
+    token_budget=BQ_SCHEMA_TOKEN_BUDGET or None,
+)
+result_cache = (
+    QueryResultCache(
+        max_entries=BQ_RESULT_CACHE_MAX_ENTRIES,
+        ttl_seconds=BQ_RESULT_CACHE_TTL_SECONDS,
+        max_bytes=BQ_RESULT_CACHE_MAX_BYTES,
+    )
+    if BQ_RESULT_CACHE_TTL_SECONDS
+    else None
+)
+nl2sql_cache = (
+    NL2SQLCache(
+        os.path.join(BQ_NL2SQL_CACHE_DIR, "nl2sql_cache.json"),
+        max_entries=BQ_NL2SQL_CACHE_MAX_ENTRIES,
+    )
+    if BQ_NL2SQL_CACHE_DIR
+    else None
+)
+result_encoder = (
+    ResultEncoder(
+        result_format=BQ_RESULT_FORMAT,
+        max_cell_chars=BQ_RESULT_MAX_CELL_CHARS or None,
+        token_budget=BQ_RESULT_TOKEN_BUDGET or None,
+    )
+    if BQ_RESULT_FORMAT != "rows"
+    else None
+)
+query_flights = SingleFlight()
+# "project.dataset" -> (time.monotonic() of listing, modified time per table).
+_dataset_modified_times = {}
+_dataset_modified_times_lock = threading.Lock()
+# Per-table schema entries `database_settings` was built from.
+_schema_tables = None
+_schema_refresher = None
+# (schema tables, SchemaLinker) of the current schema.
+_schema_linker = None
+# (schema tables, ValueIndex) of the current schema.
+_value_index = None
+_database_settings_lock = threading.RLock()
 
 
 def get_bq_client():
@@ -48,93 +219,935 @@ def get_bq_client():
 
 
 def get_database_settings():
-    """Get database settings."""
-    global database_settings
-    if database_settings is None:
-        database_settings = update_database_settings()
+    """Get database settings.
+
+    On the first call the settings are served from the on-disk schema cache if
+    there is a snapshot for the dataset taken with the current sample and value
+    index settings, and the snapshot is revalidated in a background thread.
+    Otherwise the schema is built from scratch. If
+    `BQ_SCHEMA_REFRESH_INTERVAL_SECONDS` is set, the same background thread
+    keeps refreshing the schema incrementally; callers are never blocked by it.
+    """
+    with _database_settings_lock:
+        if database_settings is None:
+            cached_tables = None
+            if schema_cache is not None:
+                cached_tables = schema_cache.load(
+                    get_env_var("BQ_PROJECT_ID"), get_env_var("BQ_DATASET_ID")
+                )
+            if cached_tables is not None and not _has_current_settings(
+                cached_tables
+            ):
+                logging.info("Rebuilding the schema cached with other settings.")
+                cached_tables = None
+            if cached_tables is None:
+                update_database_settings()
+            else:
+                _swap_database_settings(cached_tables)
+            _start_schema_refresher(revalidate_now=cached_tables is not None)
     return database_settings
 
 
 def update_database_settings():
-    """Update database settings."""
-    global database_settings
-    ddl_schema = get_bigquery_schema(
+    """Update database settings by rebuilding the whole schema."""
+    tables = get_bigquery_schema_tables(
+        get_env_var("BQ_DATASET_ID"),
+        client=get_bq_client(),
+        project_id=get_env_var("BQ_PROJECT_ID"),
+    )
+    if schema_cache is not None:
+        schema_cache.save(
+            get_env_var("BQ_PROJECT_ID"), get_env_var("BQ_DATASET_ID"), tables
+        )
+    return _swap_database_settings(tables)
+
+
+def refresh_database_settings():
+    """Refresh database settings, re-fetching only tables that changed.
+
+    Returns:
+        dict: The current database settings. They are only replaced if the
+        schema changed.
+    """
+    tables = refresh_bigquery_schema_tables(
         get_env_var("BQ_DATASET_ID"),
+        _schema_tables,
         client=get_bq_client(),
         project_id=get_env_var("BQ_PROJECT_ID"),
     )
-    database_settings = {
+    if tables == _schema_tables:
+        return database_settings
+    if schema_cache is not None:
+        schema_cache.save(
+            get_env_var("BQ_PROJECT_ID"), get_env_var("BQ_DATASET_ID"), tables
+        )
+    changed = [
+        table_id
+        for table_id, entry in tables.items()
+        if table_id not in _schema_tables
+        or any(
+            _schema_tables[table_id].get(key) != entry.get(key)
+            for key in _TABLE_CONTENT_KEYS
+        )
+    ]
+    dropped = [table_id for table_id in _schema_tables if table_id not in tables]
+    if changed or dropped:
+        logging.info(
+            "Schema refreshed: %d table(s) changed, %d dropped.",
+            len(changed),
+            len(dropped),
+        )
+    return _swap_database_settings(tables)
+
+
+def _swap_database_settings(tables):
+    """Replaces the database settings with ones built from `tables`.
+
+    The new settings are built first and then published by rebinding the
+    globals, so readers always see either the old or the new settings in full.
+    """
+    global database_settings, _schema_tables
+    ddl_schema, token_counts = schema_renderer.render(tables)
+    largest_tables = sorted(token_counts.items(), key=lambda item: -item[1])[:5]
+    logging.info(
+        "Rendered schema of %d table(s), ~%d tokens. Largest: %s",
+        len(token_counts),
+        sum(token_counts.values()),
+        ", ".join(f"{table_id} (~{tokens})" for table_id, tokens in largest_tables),
+    )
+    settings = {
         "bq_project_id": get_env_var("BQ_PROJECT_ID"),
         "bq_dataset_id": get_env_var("BQ_DATASET_ID"),
         "bq_ddl_schema": ddl_schema,
+        "bq_schema_fingerprint": get_schema_fingerprint(tables),
         # Include ChaseSQL-specific constants.
         **chase_constants.chase_sql_constants_dict,
     }
-    return database_settings
+    with _database_settings_lock:
+        _schema_tables = tables
+        database_settings = settings
+    return settings
 
 
-def get_bigquery_schema(dataset_id, client=None, project_id=None):
-    """Retrieves schema and generates DDL with example values for a BigQuery dataset.
+def get_schema_fingerprint(tables):
+    """Returns a fingerprint of the structure of a schema.
+
+    Only what generated SQL depends on is covered: the tables, their columns
+    and types, and their partitioning and clustering. Sample rows, profiles
+    and descriptions are left out, so that routine refreshes of the data do
+    not change the fingerprint.
+
+    Args:
+        tables (dict): The schema cache entries keyed by table ID.
+
+    Returns:
+        str: A hex digest.
+    """
+    structure = sorted(
+        [
+            entry["table_ref"],
+            [
+                [column["name"], column["type"], column["mode"]]
+                for column in entry["columns"]
+            ],
+            entry.get("partitioning"),
+            entry.get("clustering"),
+        ]
+        for entry in tables.values()
+    )
+    return hashlib.sha256(
+        json.dumps(structure, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def _start_schema_refresher(revalidate_now):
+    """Starts the background schema refresher thread if there is work for it.
+
+    Args:
+        revalidate_now (bool): Whether to refresh once right away, e.g. because
+          the settings were served from a possibly stale on-disk snapshot.
+    """
+    global _schema_refresher
+    if _schema_refresher is not None:
+        return
+    if not revalidate_now and BQ_SCHEMA_REFRESH_INTERVAL_SECONDS <= 0:
+        return
+    _schema_refresher = threading.Thread(
+        target=_run_schema_refresher,
+        args=(revalidate_now,),
+        name="bq-schema-refresher",
+        daemon=True,
+    )
+    _schema_refresher.start()
+
+
+def _get_schema_refresh_retry_delay(failures):
+    """Returns the delay before retrying a failed background schema refresh.
+
+    The delay doubles with every consecutive failure, up to the refresh
+    interval, or up to `_SCHEMA_REFRESH_MAX_RETRY_SECONDS` without periodic
+    refreshes.
+
+    Args:
+        failures (int): The number of consecutive failed refreshes.
+
+    Returns:
+        float: The delay in seconds.
+    """
+    max_delay = BQ_SCHEMA_REFRESH_INTERVAL_SECONDS or _SCHEMA_REFRESH_MAX_RETRY_SECONDS
+    return min(_SCHEMA_REFRESH_RETRY_SECONDS * 2 ** (failures - 1), max_delay)
+
+
+def _run_schema_refresher(revalidate_now):
+    """Body of the background schema refresher thread.
+
+    Failed refreshes are retried with backoff, see
+    `_get_schema_refresh_retry_delay`. Without periodic refreshes, the thread
+    exits once the snapshot it was started for has been revalidated.
+    """
+    failures = 0
+    refresh = revalidate_now
+    while True:
+        if refresh:
+            failures = 0 if _refresh_database_settings_in_background() else failures + 1
+        if failures:
+            delay = _get_schema_refresh_retry_delay(failures)
+        elif BQ_SCHEMA_REFRESH_INTERVAL_SECONDS > 0:
+            delay = BQ_SCHEMA_REFRESH_INTERVAL_SECONDS
+        else:
+            return
+        time.sleep(delay)
+        refresh = True
+
+
+def _refresh_database_settings_in_background():
+    """Refreshes the database settings, logging instead of raising errors.
+
+    Returns:
+        bool: Whether the refresh succeeded. On failure the current settings
+        are kept.
+    """
+    try:
+        refresh_database_settings()
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logging.warning("Background schema refresh failed: %s", e)
+        return False
+    return True
+
+
+def get_linked_schema(question, settings=None):
+    """Returns the part of the schema DDL that is relevant to a question.
+
+    With `BQ_SCHEMA_LINKING` enabled, the tables and columns matching the
+    question are selected from a lexical index of the schema, within
+    `BQ_SCHEMA_LINKING_TOKEN_BUDGET`. The full schema is returned when linking
+    is disabled or when the linker is not confident in its selection.
+
+    Args:
+        question (str): The natural language question.
+        settings (dict): The database settings to fall back to. Defaults to the
+          current settings.
+
+    Returns:
+        str: The DDL statements to put in the prompt.
+    """
+    global _schema_linker
+    if settings is None:
+        settings = get_database_settings()
+    if not BQ_SCHEMA_LINKING or not question:
+        return settings["bq_ddl_schema"]
+
+    current_settings = get_database_settings()
+    tables = _schema_tables
+    if _schema_linker is None or _schema_linker[0] is not tables:
+        _schema_linker = (tables, SchemaLinker(tables, schema_renderer))
+    linker = _schema_linker[1]
+
+    selection = linker.link(question, token_budget=BQ_SCHEMA_LINKING_TOKEN_BUDGET)
+    if selection is None:
+        logging.info("Schema linking not confident, using the full schema.")
+        return settings["bq_ddl_schema"]
+    linked_schema, _ = schema_renderer.render(linker.tables, selection)
+    logging.info(
+        "Schema linking selected %d of %d tables (%d of %d characters).",
+        len(selection),
+        len(linker.tables),
+        len(linked_schema),
+        len(current_settings["bq_ddl_schema"]),
+    )
+    return linked_schema
+
+
+def get_value_hints(question):
+    """Returns the stored values that resemble the literals of a question.
+
+    With `BQ_VALUE_INDEX` enabled, the literals of the question are looked up
+    in a local trigram index over the distinct values of low-cardinality
+    string columns, so that the generated SQL filters on values that exist
+    (e.g. 'New York' rather than 'NY').
+
+    Args:
+        question (str): The natural language question.
+
+    Returns:
+        str: SQL comment lines to append to the schema in the prompt, or an
+        empty string.
+    """
+    global _value_index
+    if not BQ_VALUE_INDEX or not question:
+        return ""
+    get_database_settings()
+    tables = _schema_tables
+    if _value_index is None or _value_index[0] is not tables:
+        _value_index = (tables, ValueIndex(tables))
+    return _value_index[1].hints(question)
+
+
+def get_schema_columns():
+    """Returns the column names and types of every table in the schema.
+
+    This is the `DDLSchemaType` accepted by the ChaseSQL `SqlTranslator`, which
+    therefore does not depend on the format the schema is rendered in.
+
+    Returns:
+        list[tuple[str, list[tuple[str, str]]]]: The columns of each table,
+        keyed by fully qualified table name.
+    """
+    get_database_settings()
+    return [
+        (
+            entry["table_ref"],
+            [(column["name"], column["type"]) for column in entry["columns"]],
+        )
+        for entry in _schema_tables.values()
+    ]
+
+
+def _make_table_entry(
+    table_ref, fields, rows, table_obj=None, profile=None, values=None
+):
+    """Builds the schema cache entry of a table from its columns and rows.
+
+    Args:
+        table_ref (bigquery.TableReference): The table being described.
+        fields (list[bigquery.SchemaField]): The top-level columns of the table.
+        rows (pandas.DataFrame): Example rows of the table, or None.
+        table_obj (bigquery.Table): The table's metadata, if fetched.
+        profile (dict): The column statistics profile of the table, if any.
+        values (dict): The distinct values of the indexed string columns, if
+          any.
+
+    Returns:
+        dict: The schema cache entry of the table.
+    """
+    return make_table_entry(
+        str(table_ref),
+        columns=[
+            {
+                "name": field.name,
+                "type": field.field_type,
+                "mode": field.mode,
+                "description": field.description,
+            }
+            for field in fields
+        ],
+        sample_rows=[
+            [format_sample_value(value) for value in row.values]
+            for _, row in (rows.iterrows() if rows is not None else [])
+        ],
+        modified=table_obj.modified if table_obj is not None else None,
+        etag=table_obj.etag if table_obj is not None else None,
+        profile=profile,
+        values=values,
+        partitioning=_get_partitioning(table_obj) if table_obj is not None else None,
+        clustering=table_obj.clustering_fields if table_obj is not None else None,
+        settings=_get_table_entry_settings(),
+    )
+
+
+def _get_partitioning(table_obj):
+    """Extracts the partitioning of a table for its schema cache entry.
+
+    Args:
+        table_obj (bigquery.Table): The table's metadata.
+
+    Returns:
+        dict: The partitioning, see `make_table_entry`, or None if the table is
+        not partitioned.
+    """
+    require_filter = bool(table_obj.require_partition_filter)
+    if table_obj.time_partitioning is not None:
+        return {
+            "type": table_obj.time_partitioning.type_,
+            "field": table_obj.time_partitioning.field,
+            "range": None,
+            "require_filter": require_filter,
+        }
+    if table_obj.range_partitioning is not None:
+        partition_range = table_obj.range_partitioning.range_
+        return {
+            "type": "RANGE",
+            "field": table_obj.range_partitioning.field,
+            "range": {
+                "start": partition_range.start,
+                "end": partition_range.end,
+                "interval": partition_range.interval,
+            },
+            "require_filter": require_filter,
+        }
+    return None
+
+
+def _profile_table(client, table_ref, fields):
+    """Computes a table's column statistics if `BQ_SCHEMA_SAMPLE_MODE` asks for it.
+
+    Profiling is best effort: a failed profile query (e.g. one exceeding
+    `BQ_PROFILE_MAX_BYTES_BILLED`) is logged and the table is described without
+    statistics.
+
+    Args:
+        client (bigquery.Client): A BigQuery client.
+        table_ref (bigquery.TableReference): The table to profile.
+        fields (list[bigquery.SchemaField]): The top-level columns of the table.
+
+    Returns:
+        dict: The column statistics profile, or None.
+    """
+    if BQ_SCHEMA_SAMPLE_MODE == "rows":
+        return None
+    try:
+        return profile_table(
+            client,
+            str(table_ref),
+            [
+                {"name": field.name, "type": field.field_type, "mode": field.mode}
+                for field in fields
+            ],
+            top_k=BQ_PROFILE_TOP_K,
+            sample_percent=BQ_PROFILE_SAMPLE_PERCENT or None,
+            maximum_bytes_billed=BQ_PROFILE_MAX_BYTES_BILLED or None,
+        )
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logging.warning("Profiling table %s failed: %s", table_ref, e)
+        return None
+
+
+def _index_table_values(client, table_ref, fields):
+    """Fetches a table's distinct string values if `BQ_VALUE_INDEX` is enabled.
+
+    Like profiling, this is best effort and failures are only logged.
+
+    Args:
+        client (bigquery.Client): A BigQuery client.
+        table_ref (bigquery.TableReference): The table to index.
+        fields (list[bigquery.SchemaField]): The top-level columns of the table.
+
+    Returns:
+        dict: The distinct values keyed by column name, or None.
+    """
+    if not BQ_VALUE_INDEX:
+        return None
+    try:
+        return fetch_distinct_values(
+            client,
+            str(table_ref),
+            [
+                {"name": field.name, "type": field.field_type, "mode": field.mode}
+                for field in fields
+            ],
+            max_distinct=BQ_VALUE_INDEX_MAX_DISTINCT,
+            maximum_bytes_billed=BQ_PROFILE_MAX_BYTES_BILLED or None,
+        )
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logging.warning("Indexing the values of table %s failed: %s", table_ref, e)
+        return None
+
+
+def _get_table_entry_settings():
+    """Returns the configuration that shapes the data of a schema cache entry.
+
+    It is recorded in every entry, see `make_table_entry`, and entries fetched
+    with another configuration are re-fetched.
+    """
+    return {
+        "sample_mode": BQ_SCHEMA_SAMPLE_MODE,
+        "sample_rows": BQ_SCHEMA_SAMPLE_ROWS,
+        "profile_top_k": BQ_PROFILE_TOP_K,
+        "profile_sample_percent": BQ_PROFILE_SAMPLE_PERCENT,
+        "value_index_max_distinct": (
+            BQ_VALUE_INDEX_MAX_DISTINCT if BQ_VALUE_INDEX else None
+        ),
+    }
+
+
+def _has_current_settings(tables):
+    """Checks whether cached entries were all fetched with the current settings."""
+    settings = _get_table_entry_settings()
+    return all(entry.get("settings") == settings for entry in tables.values())
+
+
+def _has_required_data(entry):
+    """Checks whether a cached entry has the data the configuration asks for.
+
+    Entries fetched with other settings, e.g. another sample mode or value
+    index limit, are re-fetched, and so are entries missing a profile or
+    values, e.g. because profiling or indexing failed the last time.
+    """
+    if entry.get("settings") != _get_table_entry_settings():
+        return False
+    if BQ_SCHEMA_SAMPLE_MODE != "rows" and entry.get("profile") is None:
+        return False
+    return not BQ_VALUE_INDEX or entry.get("values") is not None
+
+
+def _get_table_entry(client, table_ref, table_obj=None):
+    """Fetches a table's metadata and sample rows and renders its DDL.
+
+    Args:
+        client (bigquery.Client): A BigQuery client.
+        table_ref (bigquery.TableReference): The table to describe.
+        table_obj (bigquery.Table): The table's metadata, if already fetched.
+
+    Returns:
+        dict: The schema cache entry of the table, or None if the table is not
+        a regular table (e.g. a view).
+    """
+    if table_obj is None:
+        table_obj = client.get_table(table_ref)
+
+    # Check if table is a view
+    if table_obj.table_type != "TABLE":
+        return None
+
+    # Add example values if available. Passing the fetched table (rather than
+    # the reference) avoids a second `get_table` round trip inside list_rows.
+    rows = None
+    if BQ_SCHEMA_SAMPLE_MODE != "profile" and BQ_SCHEMA_SAMPLE_ROWS > 0:
+        rows = client.list_rows(
+            table_obj, max_results=BQ_SCHEMA_SAMPLE_ROWS
+        ).to_dataframe()
+    profile = _profile_table(client, table_ref, table_obj.schema)
+    values = _index_table_values(client, table_ref, table_obj.schema)
+    return _make_table_entry(
+        table_ref, table_obj.schema, rows, table_obj, profile, values
+    )
+
+
+def _get_table_entry_from_fields(client, table_ref, fields):
+    """Renders a table's DDL from already known columns.
+
+    Only the sample rows are fetched. Tables with `RECORD` columns fall back to
+    `_get_table_entry`, because decoding their rows needs the nested field
+    definitions that INFORMATION_SCHEMA.COLUMNS does not provide. The caller
+    falls back the same way for partitioned and clustered tables, whose
+    partitioning details INFORMATION_SCHEMA.COLUMNS does not provide either.
+
+    Args:
+        client (bigquery.Client): A BigQuery client.
+        table_ref (bigquery.TableReference): The table to describe.
+        fields (list[bigquery.SchemaField]): The top-level columns of the table.
+
+    Returns:
+        dict: The schema cache entry of the table.
+    """
+    if any(field.field_type == "RECORD" for field in fields):
+        return _get_table_entry(client, table_ref)
+
+    # With `selected_fields` set, list_rows does not need to call `get_table`.
+    rows = None
+    if BQ_SCHEMA_SAMPLE_MODE != "profile" and BQ_SCHEMA_SAMPLE_ROWS > 0:
+        rows = client.list_rows(
+            table_ref, selected_fields=fields, max_results=BQ_SCHEMA_SAMPLE_ROWS
+        ).to_dataframe()
+    profile = _profile_table(client, table_ref, fields)
+    values = _index_table_values(client, table_ref, fields)
+    return _make_table_entry(table_ref, fields, rows, profile=profile, values=values)
+
+
+def _field_from_information_schema(column_name, data_type, description):
+    """Builds a SchemaField from an INFORMATION_SCHEMA.COLUMNS row.
+
+    The GoogleSQL type names used by INFORMATION_SCHEMA are mapped back to the
+    names `Table.schema` reports, so both loaders render identical DDL.
+
+    Args:
+        column_name (str): The column name.
+        data_type (str): The GoogleSQL data type, e.g. `ARRAY<INT64>`.
+        description (str): The column description, or None.
+
+    Returns:
+        bigquery.SchemaField: The equivalent top-level field.
+    """
+    mode = "NULLABLE"
+    if data_type.startswith("ARRAY<"):
+        mode = "REPEATED"
+        data_type = data_type[len("ARRAY<") : -1]
+    # Drop type parameters and element types, e.g. STRING(10) or STRUCT<a INT64>.
+    base_type = re.match(r"\w+", data_type).group(0).upper()
+    field_type = _INFORMATION_SCHEMA_TYPES.get(base_type, base_type)
+    return bigquery.SchemaField(
+        column_name, field_type, mode=mode, description=description or None
+    )
+
+
+def _map_concurrently(func, items, max_workers):
+    """Applies `func` to `items` on a bounded thread pool.
+
+    `executor.map` yields results in submission order, which keeps the rendered
+    DDL deterministic regardless of which fetch finishes first.
+    """
+    if not items:
+        return []
+    max_workers = max(1, min(max_workers, len(items)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, items))
+
+
+def _get_schema_tables_from_information_schema(dataset_ref, client, max_workers):
+    """Builds the per-table schema entries from a single INFORMATION_SCHEMA query.
+
+    Args:
+        dataset_ref (bigquery.DatasetReference): The dataset to describe.
+        client (bigquery.Client): A BigQuery client.
+        max_workers (int): Maximum number of sample row fetches run concurrently.
+
+    Returns:
+        dict: The schema cache entries keyed by table ID.
+    """
+    information_schema = (
+        f"`{dataset_ref.project}.{dataset_ref.dataset_id}`.INFORMATION_SCHEMA"
+    )
+    query = f"""
+        SELECT
+          c.table_name,
+          c.column_name,
+          c.data_type,
+          p.description,
+          c.is_partitioning_column = 'YES'
+            OR c.clustering_ordinal_position IS NOT NULL AS is_layout_column
+        FROM {information_schema}.COLUMNS AS c
+        JOIN {information_schema}.TABLES AS t
+          ON t.table_name = c.table_name
+        LEFT JOIN {information_schema}.COLUMN_FIELD_PATHS AS p
+          ON p.table_name = c.table_name
+          AND p.column_name = c.column_name
+          AND p.field_path = c.column_name
+        WHERE t.table_type = 'BASE TABLE'
+        ORDER BY c.table_name, c.ordinal_position
+    """
+
+    fields_by_table = {}
+    # Partitioned or clustered tables, whose layout needs `get_table`.
+    layout_tables = set()
+    for row in client.query(query).result():
+        fields_by_table.setdefault(row["table_name"], []).append(
+            _field_from_information_schema(
+                row["column_name"], row["data_type"], row["description"]
+            )
+        )
+        if row["is_layout_column"]:
+            layout_tables.add(row["table_name"])
+
+    def get_table_entry(table_id):
+        if table_id in layout_tables:
+            return _get_table_entry(client, dataset_ref.table(table_id))
+        return _get_table_entry_from_fields(
+            client, dataset_ref.table(table_id), fields_by_table[table_id]
+        )
+
+    table_ids = list(fields_by_table)
+    entries = _map_concurrently(get_table_entry, table_ids, max_workers)
+    return dict(zip(table_ids, entries))
+
+
+def get_bigquery_schema_tables(
+    dataset_id, client=None, project_id=None, max_workers=None, loader=None
+):
+    """Retrieves the schema of a BigQuery dataset as per-table DDL entries.
+
+    Two loaders are available:
+
+    - `TABLES` lists the tables and calls `get_table` on each of them.
+    - `INFORMATION_SCHEMA` reads every column of the dataset in one query and
+      falls back to `TABLES` if that query fails.
+
+    Either way, table metadata and sample rows are fetched concurrently by a
+    bounded thread pool, so the cold-start cost scales with the pool size
+    rather than with the number of tables.
 
     Args:
         dataset_id (str): The ID of the BigQuery dataset (e.g., 'my_dataset').
         client (bigquery.Client): A BigQuery client.
         project_id (str): The ID of your Google Cloud Project.
+        max_workers (int): Maximum number of tables introspected concurrently.
+          Defaults to `BQ_SCHEMA_MAX_WORKERS`; 1 fetches tables serially.
+        loader (str): `TABLES` or `INFORMATION_SCHEMA`. Defaults to
+          `BQ_SCHEMA_LOADER`.
 
     Returns:
-        str: A string containing the generated DDL statements.
+        dict: The schema cache entries keyed by table ID, in table name order.
+        Views are omitted.
     """
 
     if client is None:
         client = bigquery.Client(project=project_id)
 
+    if max_workers is None:
+        max_workers = BQ_SCHEMA_MAX_WORKERS
+    if loader is None:
+        loader = BQ_SCHEMA_LOADER
+
     # dataset_ref = client.dataset(dataset_id)
     dataset_ref = bigquery.DatasetReference(project_id, dataset_id)
 
-    ddl_statements = ""
+    if loader == "INFORMATION_SCHEMA":
+        try:
+            return _get_schema_tables_from_information_schema(
+                dataset_ref, client, max_workers
+            )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.warning(
+                "INFORMATION_SCHEMA schema load failed, falling back to"
+                " per-table metadata: %s",
+                e,
+            )
+    elif loader != "TABLES":
+        raise ValueError(f"Unknown schema loader: {loader}")
+
+    table_refs = [
+        dataset_ref.table(table.table_id) for table in client.list_tables(dataset_ref)
+    ]
+    entries = _map_concurrently(
+        lambda table_ref: _get_table_entry(client, table_ref),
+        table_refs,
+        max_workers,
+    )
+    return {
+        table_ref.table_id: entry
+        for table_ref, entry in zip(table_refs, entries)
+        if entry is not None
+    }
+
+
+def _list_table_modified_times(dataset_ref, client):
+    """Lists the last-modified time of every table in a dataset with one query.
+
+    Args:
+        dataset_ref (bigquery.DatasetReference): The dataset to list.
+        client (bigquery.Client): A BigQuery client.
+
+    Returns:
+        dict: The last-modified time of each regular table (views and external
+        tables are omitted), keyed by table ID in table name order.
+    """
+    query = f"""
+        SELECT
+          table_id,
+          TIMESTAMP_MILLIS(last_modified_time) AS last_modified_time
+        FROM `{dataset_ref.project}.{dataset_ref.dataset_id}.__TABLES__`
+        WHERE type = 1
+        ORDER BY table_id
+    """
+    return {
+        row["table_id"]: row["last_modified_time"]
+        for row in client.query(query).result()
+    }
+
+
+def refresh_bigquery_schema_tables(
+    dataset_id, cached_tables, client=None, project_id=None, max_workers=None
+):
+    """Revalidates cached schema entries against the current table metadata.
 
-    for table in client.list_tables(dataset_ref):
-        table_ref = dataset_ref.table(table.table_id)
+    The last-modified times of all tables are read with a single `__TABLES__`
+    query and diffed against the cached entries. Only new or modified tables
+    have their metadata and sample rows re-fetched; dropped tables are removed.
+    If that query fails, every table's metadata is fetched instead and entries
+    are compared by `modified` timestamp and etag.
+
+    Args:
+        dataset_id (str): The ID of the BigQuery dataset (e.g., 'my_dataset').
+        cached_tables (dict): The cached schema entries keyed by table ID.
+        client (bigquery.Client): A BigQuery client.
+        project_id (str): The ID of your Google Cloud Project.
+        max_workers (int): Maximum number of tables revalidated concurrently.
+          Defaults to `BQ_SCHEMA_MAX_WORKERS`.
+
+    Returns:
+        dict: The up-to-date schema cache entries keyed by table ID.
+    """
+
+    if client is None:
+        client = bigquery.Client(project=project_id)
+
+    if max_workers is None:
+        max_workers = BQ_SCHEMA_MAX_WORKERS
+
+    dataset_ref = bigquery.DatasetReference(project_id, dataset_id)
+
+    try:
+        modified_times = _list_table_modified_times(dataset_ref, client)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logging.warning(
+            "Listing table modification times failed, revalidating every"
+            " table: %s",
+            e,
+        )
+    else:
+        table_ids = list(modified_times)
+        entries = {
+            table_id: {
+                **cached_tables[table_id],
+                "modified": modified_times[table_id].isoformat(),
+            }
+            for table_id in table_ids
+            if table_id in cached_tables
+            and _has_required_data(cached_tables[table_id])
+            and is_table_entry_fresh(
+                cached_tables[table_id], modified_times[table_id]
+            )
+        }
+        stale_ids = [table_id for table_id in table_ids if table_id not in entries]
+        stale_entries = _map_concurrently(
+            lambda table_id: _get_table_entry(client, dataset_ref.table(table_id)),
+            stale_ids,
+            max_workers,
+        )
+        entries.update(zip(stale_ids, stale_entries))
+        return {
+            table_id: entries[table_id]
+            for table_id in table_ids
+            if entries[table_id] is not None
+        }
+
+    def revalidate(table_ref):
         table_obj = client.get_table(table_ref)
+        cached = cached_tables.get(table_ref.table_id)
+        if (
+            cached is not None
+            and _has_required_data(cached)
+            and is_table_entry_fresh(cached, table_obj.modified, table_obj.etag)
+        ):
+            return {
+                **cached,
+                "modified": table_obj.modified.isoformat(),
+                "etag": table_obj.etag,
+            }
+        return _get_table_entry(client, table_ref, table_obj)
+
+    table_refs = [
+        dataset_ref.table(table.table_id) for table in client.list_tables(dataset_ref)
+    ]
+    entries = _map_concurrently(revalidate, table_refs, max_workers)
+    return {
+        table_ref.table_id: entry
+        for table_ref, entry in zip(table_refs, entries)
+        if entry is not None
+    }
 
-        # Check if table is a view
-        if table_obj.table_type != "TABLE":
-            continue
-
-        ddl_statement = f"CREATE OR REPLACE TABLE `{table_ref}` (\n"
-
-        for field in table_obj.schema:
-            ddl_statement += f"  `{field.name}` {field.field_type}"
-            if field.mode == "REPEATED":
-                ddl_statement += " ARRAY"
-            if field.description:
-                ddl_statement += f" COMMENT '{field.description}'"
-            ddl_statement += ",\n"
-
-        ddl_statement = ddl_statement[:-2] + "\n);\n\n"
-
-        # Add example values if available (limited to first row)
-        rows = client.list_rows(table_ref, max_results=5).to_dataframe()
-        if not rows.empty:
-            ddl_statement += f"-- Example values for table `{table_ref}`:\n"
-            for _, row in rows.iterrows():  # Iterate over DataFrame rows
-                ddl_statement += f"INSERT INTO `{table_ref}` VALUES\n"
-                example_row_str = "("
-                for value in row.values:  # Now row is a pandas Series and has values
-                    if isinstance(value, str):
-                        example_row_str += f"'{value}',"
-                    elif value is None:
-                        example_row_str += "NULL,"
-                    else:
-                        example_row_str += f"{value},"
-                example_row_str = (
-                    example_row_str[:-1] + ");\n\n"
-                )  # remove trailing comma
-                ddl_statement += example_row_str
-
-        ddl_statements += ddl_statement
-
-    return ddl_statements
+
+def get_bigquery_schema(
+    dataset_id, client=None, project_id=None, max_workers=None, loader=None
+):
+    """Retrieves schema and generates DDL with example values for a BigQuery dataset.
+
+    Args:
+        dataset_id (str): The ID of the BigQuery dataset (e.g., 'my_dataset').
+        client (bigquery.Client): A BigQuery client.
+        project_id (str): The ID of your Google Cloud Project.
+        max_workers (int): Maximum number of tables introspected concurrently.
+        loader (str): `TABLES` or `INFORMATION_SCHEMA`.
+
+    Returns:
+        str: A string containing the generated DDL statements.
+    """
+    tables = get_bigquery_schema_tables(
+        dataset_id,
+        client=client,
+        project_id=project_id,
+        max_workers=max_workers,
+        loader=loader,
+    )
+    ddl_schema, _ = schema_renderer.render(tables)
+    return ddl_schema
+
+
+def get_cached_sql(question, tool_context, nl2sql_settings):
+    """Returns the validated SQL generated for the same question before.
+
+    The cache key is kept in the session state, so that `run_bigquery_validation`
+    can store the SQL once it passed validation.
+
+    Args:
+        question (str): Natural language question.
+        tool_context (ToolContext): The tool context of the NL2SQL tool.
+        nl2sql_settings (dict): The method, model and options generating the
+            SQL; questions only share SQL if these are equal.
+
+    Returns:
+        str: The cached SQL, or None on a miss.
+    """
+    if nl2sql_cache is None:
+        return None
+    settings = {
+        **nl2sql_settings,
+        "max_num_rows": MAX_NUM_ROWS,
+        "schema_linking": BQ_SCHEMA_LINKING,
+        "value_index": BQ_VALUE_INDEX,
+    }
+    key = make_nl2sql_cache_key(
+        question,
+        tool_context.state["database_settings"]["bq_schema_fingerprint"],
+        settings,
+    )
+    tool_context.state["nl2sql_cache_key"] = key
+    sql = nl2sql_cache.get(key)
+    if sql is not None:
+        logging.info("Serving the SQL of the question from the NL2SQL cache.")
+        tool_context.state["sql_query"] = sql
+    return sql
+
+
+def _take_nl2sql_cache_key(tool_context):
+    """Takes the NL2SQL cache key of the last question out of session state.
+
+    Every validation uses the key up, so that the SQL of a later turn is never
+    stored under an earlier question.
+
+    Args:
+        tool_context (ToolContext): The tool context of the session.
+
+    Returns:
+        str: The key set by `get_cached_sql`, or None.
+    """
+    key = tool_context.state.get("nl2sql_cache_key")
+    if key is not None:
+        tool_context.state["nl2sql_cache_key"] = None
+    return key
+
+
+def _remember_validated_sql(key, sql_string, final_result, tool_context):
+    """Caches SQL for a question if its query returned rows without warnings.
+
+    The cache serves SQL without asking the LLM again, so queries that may be
+    wrong are not stored: those that failed, returned no rows (e.g. because
+    they filter on a misspelled value) or came with warnings.
+
+    Args:
+        key (str): The NL2SQL cache key of the question, or None.
+        sql_string (str): The validated SQL.
+        final_result (dict): The response of `run_bigquery_validation`.
+        tool_context (ToolContext): The tool context of the session.
+    """
+    if nl2sql_cache is None or key is None:
+        return
+    if (
+        final_result.get("error_message")
+        or not final_result.get("returned_rows")
+        or final_result.get("warnings")
+    ):
+        return
+    nl2sql_cache.put(key, sql_string)
 
 
 def initial_bq_nl2sql(
@@ -164,6 +1177,7 @@ You are a BigQuery SQL expert tasked with answering user's questions about BigQu
 - **Column Usage:** Use *ONLY* the column names (column_name) mentioned in the Table Schema. Do *NOT* use any other column names. Associate `column_name` mentioned in the Table Schema only to the `table_name` specified under Table Schema.
 - **FILTERS:** You should write query effectively  to reduce and minimize the total rows to be returned. For example, you can use filters (like `WHERE`, `HAVING`, etc. (like 'COUNT', 'SUM', etc.) in the SQL query.
 - **LIMIT ROWS:**  The maximum number of rows returned should be less than {MAX_NUM_ROWS}.
+- **PARTITION FILTERS:** Tables with a `PARTITION BY` clause are partitioned. Filter them on the partitioning column (or `_PARTITIONTIME` / `_PARTITIONDATE`) in the `WHERE` clause whenever the question allows, so that only the needed partitions are scanned. Filtering on `CLUSTER BY` columns reduces the scan further.
 
 **Schema:**
 
@@ -183,14 +1197,25 @@ The database structure is defined by the following table schemas (possibly with
 
    """
 
-    ddl_schema = tool_context.state["database_settings"]["bq_ddl_schema"]
+    nl2sql_model = os.getenv("BASELINE_NL2SQL_MODEL")
+    sql = get_cached_sql(
+        question,
+        tool_context,
+        {"method": "BASELINE", "model": nl2sql_model, "temperature": 0.1},
+    )
+    if sql is not None:
+        return sql
+
+    ddl_schema = get_linked_schema(
+        question, tool_context.state["database_settings"]
+    ) + get_value_hints(question)
 
     prompt = prompt_template.format(
         MAX_NUM_ROWS=MAX_NUM_ROWS, SCHEMA=ddl_schema, QUESTION=question
     )
 
     response = llm_client.models.generate_content(
-        model=os.getenv("BASELINE_NL2SQL_MODEL"),
+        model=nl2sql_model,
         contents=prompt,
         config={"temperature": 0.1},
     )
@@ -206,6 +1231,123 @@ The database structure is defined by the following table schemas (possibly with
     return sql
 
 
+def _fetch_query_rows(query_job):
+    """Waits for a query job and fetches the rows `run_bigquery_validation` returns.
+
+    Only the first `MAX_NUM_ROWS` rows are requested, in a single page, however
+    many rows the query produced. They are downloaded as an Arrow table, without
+    converting values to Python objects. Whether the query produced more rows
+    is told by the job's row count, for which `run_bigquery_validation` limits
+    queries to one row more than is fetched.
+
+    With `BQ_STORAGE_EXPORT` enabled, a result with more rows is also exported
+    in full through the Storage Read API.
+
+    Args:
+        query_job (bigquery.QueryJob): The running query.
+
+    Returns:
+        tuple: The rows as a `QueryResult` (None if the query returns no data),
+        whether the query produced more rows than those and the handle of the
+        exported result (None if it was not exported).
+    """
+    results = query_job.result(max_results=MAX_NUM_ROWS, page_size=MAX_NUM_ROWS)
+    if not results.schema:
+        return None, False, None
+    table = results.to_arrow(create_bqstorage_client=False)
+    truncated = results.total_rows > table.num_rows
+    export = None
+    if BQ_STORAGE_EXPORT and truncated:
+        try:
+            export = export_query_results(query_job)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.warning("Exporting the query result failed: %s", e)
+    return QueryResult(table), truncated, export
+
+
+def _publish_query_result(final_result, query_result, export, tool_context):
+    """Puts a query result into the tool response and the session state.
+
+    The model gets the rows encoded by `result_encoder`, or as dicts; the
+    session state gets a handle to the Arrow-backed result, with a preview
+    of its rows, see `query_results.load_query_result`, and the handle of the
+    complete result if it was exported, see
+    `result_export.load_query_result_export`.
+
+    Args:
+        final_result (dict): The response of `run_bigquery_validation`.
+        query_result (QueryResult): The rows of the query.
+        export (dict): The handle of the exported result, or None.
+        tool_context (ToolContext): The tool context of the session.
+    """
+    if result_encoder is None:
+        final_result["query_result"] = query_result.to_rows()
+    else:
+        encoded, trimmed = result_encoder.encode(query_result)
+        final_result["query_result"] = encoded
+        final_result["query_result_format"] = result_encoder.result_format
+        if trimmed:
+            final_result["query_result_trimmed"] = trimmed
+    save_query_result(tool_context.state, query_result)
+    tool_context.state[EXPORT_STATE_KEY] = export
+
+
+def _get_dataset_modified_times(project_id, dataset_id):
+    """Returns the last modification time of every table in a dataset.
+
+    The times are listed with one `__TABLES__` query and reused for
+    `BQ_RESULT_CACHE_REVALIDATE_SECONDS`.
+
+    Args:
+        project_id (str): The project of the dataset.
+        dataset_id (str): The dataset.
+
+    Returns:
+        dict: The modification times keyed by table ID.
+    """
+    key = f"{project_id}.{dataset_id}"
+    now = time.monotonic()
+    with _dataset_modified_times_lock:
+        listed = _dataset_modified_times.get(key)
+    if listed is not None and now - listed[0] < BQ_RESULT_CACHE_REVALIDATE_SECONDS:
+        return listed[1]
+    modified_times = _list_table_modified_times(
+        bigquery.DatasetReference(project_id, dataset_id), get_bq_client()
+    )
+    with _dataset_modified_times_lock:
+        _dataset_modified_times[key] = (now, modified_times)
+    return modified_times
+
+
+def _get_table_modified_times(table_refs):
+    """Reads the last modification time of the tables a query reads.
+
+    The times come from one metadata query per dataset, see
+    `_get_dataset_modified_times`, rather than one request per table.
+
+    Args:
+        table_refs (list[str]): The fully qualified table names.
+
+    Returns:
+        dict: The modification times keyed by table name, or None if the
+        metadata of a table cannot be read (e.g. for views, wildcard tables or
+        INFORMATION_SCHEMA views), in which case the result must not be cached.
+    """
+    table_modified = {}
+    try:
+        for table_ref in table_refs:
+            project_id, dataset_id, table_id = table_ref.split(".")
+            modified_times = _get_dataset_modified_times(project_id, dataset_id)
+            if table_id not in modified_times:
+                logging.info("Not caching the query result of %s.", table_ref)
+                return None
+            table_modified[table_ref] = modified_times[table_id]
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logging.info("Not caching the query result: %s", e)
+        return None
+    return table_modified
+
+
 def run_bigquery_validation(
     sql_string: str,
     tool_context: ToolContext,
@@ -217,14 +1359,36 @@ def run_bigquery_validation(
 
     1. **SQL Cleanup:**  Preprocesses the SQL string using a `cleanup_sql`
     function
-    2. **DML/DDL Restriction:**  Rejects any SQL queries containing DML or DDL
-       statements (e.g., UPDATE, DELETE, INSERT, CREATE, ALTER) to ensure
-       read-only operations.
-    3. **Syntax and Execution:** Sends the cleaned SQL to BigQuery for validation.
+    2. **DML/DDL Restriction:**  Parses the SQL once with sqlglot and rejects
+       anything but a single read-only query (e.g. UPDATE, DELETE, INSERT,
+       CREATE, ALTER or multiple statements). The outermost `LIMIT` is added or
+       tightened to `MAX_NUM_ROWS` + 1, unless `BQ_STORAGE_EXPORT` is enabled.
+       SQL that sqlglot cannot tokenize or parse is rejected.
+    3. **Partition Filters:** With `BQ_PARTITION_FILTER_CHECK` set to `warn` or
+       `error`, flags queries that scan a partitioned table without filtering
+       on its partitioning column.
+    4. **Result Cache:** Returns the cached result of an identical query if
+       none of the tables it reads changed since, without running any job.
+       SQL that passes validation is also stored in the NL2SQL cache, for the
+       question it was generated for (see `get_cached_sql`).
+    5. **Dry Run:** With `BQ_DRY_RUN` enabled, dry-runs the SQL first. Invalid
+       queries, and queries estimated to process more than
+       `BQ_MAX_BYTES_PROCESSED` bytes, are rejected (or, in `warn` mode,
+       reported) before they consume any slots.
+    6. **Syntax and Execution:** Sends the cleaned SQL to BigQuery for validation.
        If the query is syntactically correct and executable, it retrieves the
-       results.
-    4. **Result Analysis:**  Checks if the query produced any results. If so, it
-       formats the first few rows of the result set for inspection.
+       results. Identical queries already running for another session are
+       joined rather than submitted again. The job runs under the
+       `query_policy` of the tool and tenant: it is cancelled when it exceeds
+       the policy's timeout or when the session ends, and its billed bytes
+       and priority are capped and set accordingly.
+    7. **Result Analysis:**  Checks if the query produced any results. If so, it
+       formats the first few rows of the result set for inspection. The rows
+       are kept as an Arrow table; the session state gets a handle to it
+       with a preview of the rows (see `query_results.load_query_result`).
+       With `BQ_STORAGE_EXPORT` enabled, results with more than
+       `MAX_NUM_ROWS` rows are also exported in full to a local file (see
+       `result_export`).
 
     Args:
         sql_string (str): The SQL query string to validate.
@@ -237,6 +1401,16 @@ def run_bigquery_validation(
                 is valid but returns no data.
              - "Invalid SQL: ..." if the query is invalid, along with the error
                 message from BigQuery.
+             - "Query cancelled: ..." with the reason if the job was cancelled.
+             The rows are returned as "query_result", encoded as
+             "query_result_format" (e.g. CSV with a header line); cells,
+             columns or rows cut to fit the token budget are reported under
+             "query_result_trimmed". At most `MAX_NUM_ROWS` rows are fetched;
+             their number is returned as "returned_rows", and "truncated" is
+             True if the query produced more. The dry-run estimate
+             is returned as "total_bytes_processed". In `warn` mode,
+             unfiltered partitioned tables and queries over the bytes limit
+             are reported under "warnings".
     """
 
     def cleanup_sql(sql_string):
@@ -254,56 +1428,142 @@ def run_bigquery_validation(
         # 4. Replace escaped newlines (those not preceded by a backslash)
         sql_string = sql_string.replace("\\n", "\n")
 
-        # 5. Add limit clause if not present
-        if "limit" not in sql_string.lower():
-            sql_string = sql_string + " limit " + str(MAX_NUM_ROWS)
-
         return sql_string
 
     logging.info("Validating SQL: %s", sql_string)
+    nl2sql_cache_key = _take_nl2sql_cache_key(tool_context)
     sql_string = cleanup_sql(sql_string)
-    logging.info("Validating SQL (after cleanup): %s", sql_string)
+    validated_sql = sql_string
 
     final_result = {"query_result": None, "error_message": None}
 
-    # More restrictive check for BigQuery - disallow DML and DDL
-    # Use word boundaries to match only complete words, not substrings
-    if re.search(
-        r"(?i)\b(update|delete|drop|insert|create|alter|truncate|merge)\b", sql_string
-    ):
+    # Parse the SQL once; the AST serves every check below. SQL that sqlglot
+    # cannot tokenize or parse cannot be checked for writes, so it is rejected.
+    try:
+        parsed_query = ParsedQuery(sql_string)
+    except sqlglot.errors.SqlglotError as e:
+        final_result["error_message"] = f"Invalid SQL: {e}"
+        return final_result
+
+    if not parsed_query.is_read_only():
         final_result["error_message"] = (
-            "Invalid SQL: Contains disallowed DML/DDL operations."
+            "Invalid SQL: Only a single read-only query is allowed."
         )
         return final_result
+    if not BQ_STORAGE_EXPORT:
+        # One row more than is fetched, so that truncation can be told.
+        sql_string = parsed_query.with_limit(MAX_NUM_ROWS + 1)
+    logging.info("Validating SQL (after cleanup): %s", sql_string)
 
-    try:
-        query_job = get_bq_client().query(sql_string)
-        results = query_job.result()  # Get the query results
-
-        if results.schema:  # Check if query returned data
-            rows = [
-                {
-                    key: (
-                        value
-                        if not isinstance(value, datetime.date)
-                        else value.strftime("%Y-%m-%d")
+    project_id = get_env_var("BQ_PROJECT_ID")
+    dataset_id = get_env_var("BQ_DATASET_ID")
+    if BQ_PARTITION_FILTER_CHECK in ("warn", "error"):
+        get_database_settings()
+        unfiltered = find_missing_partition_filters(
+            parsed_query.statements, _schema_tables, project_id, dataset_id
+        )
+        if unfiltered:
+            message = (
+                "Missing partition filter on partitioned table(s) "
+                + ", ".join(f"`{table_ref}`" for table_ref in unfiltered)
+                + ". Filter on their partitioning column to avoid a full scan."
+            )
+            if BQ_PARTITION_FILTER_CHECK == "error":
+                final_result["error_message"] = f"Invalid SQL: {message}"
+                return final_result
+            final_result.setdefault("warnings", []).append(message)
+
+    query_key = parsed_query.cache_key(project_id, dataset_id)
+
+    cache_key = table_modified = None
+    if result_cache is not None and parsed_query.is_deterministic():
+        table_modified = _get_table_modified_times(
+            parsed_query.table_refs(project_id, dataset_id)
+        )
+        if table_modified is not None:
+            cache_key = query_key
+            cached_result = result_cache.get(cache_key, table_modified)
+            if cached_result is not None:
+                logging.info("Serving the query result from the cache.")
+                query_result = cached_result["query_result"]
+                export = cached_result.pop("export")
+                if export is not None and not os.path.exists(export["path"]):
+                    export = None
+                if query_result is not None:
+                    _publish_query_result(
+                        cached_result, query_result, export, tool_context
                     )
-                    for (key, value) in row.items()
-                }
-                for row in results
-            ][
-                :MAX_NUM_ROWS
-            ]  # Convert BigQuery RowIterator to list of dicts
-            # return f"Valid SQL. Results: {rows}"
-            final_result["query_result"] = rows
+                _remember_validated_sql(
+                    nl2sql_cache_key, validated_sql, cached_result, tool_context
+                )
+                return cached_result
+
+    if BQ_DRY_RUN:
+        # Syntax and semantic errors come back without consuming any slots.
+        try:
+            dry_run_job = get_bq_client().query(
+                sql_string, job_config=bigquery.QueryJobConfig(dry_run=True)
+            )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            final_result["error_message"] = f"Invalid SQL: {e}"
+            return final_result
+        bytes_processed = dry_run_job.total_bytes_processed or 0
+        final_result["total_bytes_processed"] = bytes_processed
+        if BQ_MAX_BYTES_PROCESSED and bytes_processed > BQ_MAX_BYTES_PROCESSED:
+            message = (
+                f"The query would process {bytes_processed:,} bytes, more than"
+                f" the limit of {BQ_MAX_BYTES_PROCESSED:,} bytes. Select fewer"
+                " columns or filter on partitioning or clustering columns."
+            )
+            if BQ_MAX_BYTES_PROCESSED_MODE == "error":
+                final_result["error_message"] = f"Invalid SQL: {message}"
+                return final_result
+            final_result.setdefault("warnings", []).append(message)
 
-            tool_context.state["query_result"] = rows
+    policy = resolve_query_policy(
+        "run_bigquery_validation", tool_context.state.get("tenant_id")
+    )
+    try:
+        # Identical queries running concurrently in other sessions share a job.
+        query_result, truncated, export = query_flights.do(
+            f"{query_key}\n{policy}",
+            submit=lambda: get_bq_client().query(
+                sql_string, job_config=policy.job_config()
+            ),
+            fetch=_fetch_query_rows,
+            cancel=lambda query_job: query_job.cancel(),
+            timeout=policy.timeout_seconds,
+            cancelled=session_cancelled.get(),
+        )
 
+        if query_result is not None:  # Check if query returned data
+            final_result["returned_rows"] = query_result.num_rows
+            final_result["truncated"] = truncated
         else:
             final_result["error_message"] = (
                 "Valid SQL. Query executed successfully (no results)."
             )
 
+        if cache_key is not None:
+            # The Arrow-backed result is cached and rendered again on a hit.
+            result_cache.put(
+                cache_key,
+                dict(final_result, query_result=query_result, export=export),
+                table_modified,
+                size=query_result.nbytes if query_result is not None else 0,
+            )
+
+        if query_result is not None:
+            _publish_query_result(final_result, query_result, export, tool_context)
+
+    except concurrent.futures.TimeoutError:
+        final_result["error_message"] = (
+            "Query cancelled: it did not finish within"
+            f" {policy.timeout_seconds:g} seconds. Simplify the query or filter"
+            " it further."
+        )
+    except concurrent.futures.CancelledError:
+        final_result["error_message"] = "Query cancelled: the session ended."
     except (
         Exception
     ) as e:  # Catch generic exceptions from BigQuery  # pylint: disable=broad-exception-caught
@@ -311,4 +1571,8 @@ def run_bigquery_validation(
 
     print("\n run_bigquery_validation final_result: \n", final_result)
 
+    _remember_validated_sql(
+        nl2sql_cache_key, validated_sql, final_result, tool_context
+    )
+
     return final_result
@@ -0,0 +1,227 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local index of stored string values for literal matching in NL2SQL.
+
+The distinct values of low-cardinality `STRING` columns are fetched once per
+table and kept in the schema cache. A character trigram index over them maps
+the literals a question mentions, e.g. "NY", to the values actually stored,
+e.g. 'New York', so that generated filters match existing rows.
+"""
+
+import collections
+import re
+from typing import Any
+
+from google.cloud import bigquery
+
+from .schema_cache import SchemaTablesType
+from .schema_linking import STOP_WORDS
+
+ColumnType = dict[str, Any]
+
+# Values longer than this are free text rather than categories.
+_MAX_VALUE_CHARS = 100
+
+
+def build_distinct_values_query(
+    table_ref: str, columns: list[ColumnType], max_distinct: int
+) -> str | None:
+    """Builds the query fetching the distinct values of the `STRING` columns.
+
+    Each column yields at most `max_distinct + 1` values, so that columns with
+    more distinct values can be recognized and skipped.
+
+    Args:
+      table_ref: The fully qualified table name, `project.dataset.table`.
+      columns: The columns of the table, each with a `name`, `type` and `mode`.
+      max_distinct: The maximum number of distinct values of an indexed column.
+
+    Returns:
+      The GoogleSQL query, or None if the table has no `STRING` column. Its
+      result columns are named after the column positions, e.g. `values_3`.
+    """
+    expressions = [
+        f"ARRAY_AGG(DISTINCT `{column['name']}` IGNORE NULLS"
+        f" LIMIT {max_distinct + 1}) AS values_{position}"
+        for position, column in enumerate(columns)
+        if column["type"] == "STRING" and column["mode"] != "REPEATED"
+    ]
+    if not expressions:
+        return None
+    select_list = ",\n  ".join(expressions)
+    return f"SELECT\n  {select_list}\nFROM `{table_ref}`"
+
+
+def fetch_distinct_values(
+    client: bigquery.Client,
+    table_ref: str,
+    columns: list[ColumnType],
+    max_distinct: int = 1000,
+    maximum_bytes_billed: int | None = None,
+) -> dict[str, list[str]]:
+    """Fetches the distinct values of a table's low-cardinality string columns.
+
+    Args:
+      client: A BigQuery client.
+      table_ref: The fully qualified table name, `project.dataset.table`.
+      columns: The columns of the table, each with a `name`, `type` and `mode`.
+      max_distinct: Columns with more distinct values are not indexed.
+      maximum_bytes_billed: If set, the query fails instead of billing more.
+
+    Returns:
+      The sorted distinct values keyed by column name. Columns with too many
+      values, or with free text values, are omitted.
+    """
+    query = build_distinct_values_query(table_ref, columns, max_distinct)
+    if query is None:
+        return {}
+    job_config = bigquery.QueryJobConfig(
+        use_query_cache=True, maximum_bytes_billed=maximum_bytes_billed
+    )
+    row = next(iter(client.query(query, job_config=job_config).result()))
+    values = {}
+    for position, column in enumerate(columns):
+        column_values = row.get(f"values_{position}")
+        if column_values is None or len(column_values) > max_distinct:
+            continue
+        if any(len(value) > _MAX_VALUE_CHARS for value in column_values):
+            continue
+        values[column["name"]] = sorted(column_values)
+    return values
+
+
+def _trigrams(text: str) -> set[str]:
+    """Returns the character trigrams of a normalized, space-padded text."""
+    text = f"  {' '.join(re.findall(r'[a-z0-9]+', text.lower()))} "
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _initials(text: str) -> str:
+    """Returns the lowercased initials of a multi-word text, e.g. `ny`."""
+    words = re.findall(r"[A-Za-z0-9]+", text)
+    return "".join(word[0] for word in words).lower() if len(words) > 1 else ""
+
+
+def question_literals(question: str, max_words: int = 3) -> list[str]:
+    """Extracts the phrases of a question that may refer to stored values.
+
+    Quoted strings are taken as they are; otherwise every run of up to
+    `max_words` consecutive words that does not start or end with a stop word
+    is a candidate.
+    """
+    literals = re.findall(r"['\"]([^'\"]+)['\"]", question)
+    words = re.findall(r"[\w.&-]+", question)
+    for size in range(1, max_words + 1):
+        for start in range(len(words) - size + 1):
+            phrase = words[start : start + size]
+            if phrase[0].lower() in STOP_WORDS or phrase[-1].lower() in STOP_WORDS:
+                continue
+            literals.append(" ".join(phrase))
+    return list(dict.fromkeys(literals))
+
+
+class ValueIndex:
+    """Fuzzy lookup of stored column values by the literals of a question.
+
+    Attributes:
+      tables: The schema cache entries the index was built from. Entries
+        without indexed `values` are ignored.
+    """
+
+    def __init__(self, tables: SchemaTablesType):
+        """Builds the trigram and initials indexes."""
+        self.tables = tables
+        # (table ref, column name, value) of every indexed value.
+        self._values: list[tuple[str, str, str]] = []
+        self._trigram_postings = collections.defaultdict(list)
+        self._initials = collections.defaultdict(list)
+        for entry in tables.values():
+            for column_name, values in (entry.get("values") or {}).items():
+                for value in values:
+                    value_id = len(self._values)
+                    self._values.append((entry["table_ref"], column_name, value))
+                    for trigram in _trigrams(value):
+                        self._trigram_postings[trigram].append(value_id)
+                    if initials := _initials(value):
+                        self._initials[initials].append(value_id)
+        self._trigram_counts = [len(_trigrams(value)) for _, _, value in self._values]
+
+    def lookup(
+        self, question: str, min_similarity: float = 0.5, max_matches: int = 5
+    ) -> list[tuple[str, str, str, float]]:
+        """Finds the stored values closest to the literals of a question.
+
+        A value matches a literal if their trigram Dice similarity reaches
+        `min_similarity`, or if the literal is the value's initials (e.g. "NY"
+        for 'New York'). Exact matches are included too, since they confirm
+        the column to filter on.
+
+        Args:
+          question: The natural language question.
+          min_similarity: The minimum trigram similarity of a match.
+          max_matches: The maximum number of matches returned.
+
+        Returns:
+          The best matches as (table ref, column name, value, similarity),
+          best first.
+        """
+        best = {}
+        for literal in question_literals(question):
+            trigrams = _trigrams(literal)
+            overlaps = collections.Counter(
+                value_id
+                for trigram in trigrams
+                for value_id in self._trigram_postings.get(trigram, ())
+            )
+            for value_id, overlap in overlaps.items():
+                similarity = (
+                    2 * overlap / (len(trigrams) + self._trigram_counts[value_id])
+                )
+                if similarity >= min_similarity:
+                    best[value_id] = max(best.get(value_id, 0.0), similarity)
+            if len(literal) > 1 and literal.isupper():
+                for value_id in self._initials.get(literal.lower(), ()):
+                    best[value_id] = max(best.get(value_id, 0.0), min_similarity)
+        ranked = sorted(best.items(), key=lambda item: -item[1])[:max_matches]
+        return [
+            (*self._values[value_id], similarity) for value_id, similarity in ranked
+        ]
+
+    def hints(self, question: str, **kwargs) -> str:
+        """Renders the matches of `lookup` as a comment block for the prompt.
+
+        Args:
+          question: The natural language question.
+          **kwargs: Passed to `lookup`.
+
+        Returns:
+          The hints, or an empty string if nothing matched.
+        """
+        matches = self.lookup(question, **kwargs)
+        if not matches:
+            return ""
+        columns = collections.defaultdict(list)
+        for table_ref, column_name, value, _ in matches:
+            columns[(table_ref, column_name)].append(value)
+        lines = [
+            "-- Stored values resembling literals in the question. Filter on"
+            " these exact values:"
+        ]
+        for (table_ref, column_name), values in columns.items():
+            literals = ", ".join(
+                "'" + value.replace("'", "\\'") + "'" for value in values
+            )
+            lines.append(f"-- `{table_ref}`.`{column_name}`: {literals}")
+        return "\n" + "\n".join(lines) + "\n"
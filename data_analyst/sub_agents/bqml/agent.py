@@ -20,6 +20,7 @@ from google.adk.tools.agent_tool import AgentTool
 from google.adk.agents.callback_context import CallbackContext
 
 
+from data_analyst.sub_agents.bqml import async_tools
 from data_analyst.sub_agents.bqml.tools import (
     check_bq_models,
     execute_bqml_code,
@@ -29,6 +30,7 @@ from .prompts import return_instructions_bqml
 
 
 from data_analyst.sub_agents.bigquery.agent import database_agent as bq_db_agent
+from data_analyst.sub_agents.bigquery.async_tools import BQ_ASYNC_TOOLS
 from data_analyst.sub_agents.bigquery.tools import (
     get_database_settings as get_bq_database_settings,
 )
@@ -89,5 +91,10 @@ root_agent = Agent(
     name="bq_ml_agent",
     instruction=return_instructions_bqml(),
     before_agent_callback=setup_before_agent_call,
-    tools=[execute_bqml_code, check_bq_models, call_db_agent, rag_response],
+    tools=[
+        async_tools.execute_bqml_code if BQ_ASYNC_TOOLS else execute_bqml_code,
+        check_bq_models,
+        call_db_agent,
+        rag_response,
+    ],
 )
@@ -0,0 +1,83 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Asynchronous variants of the BQML agent tools.
+
+See `data_analyst.sub_agents.bigquery.async_tools`; the tools keep the names
+the BQML prompts refer to.
+"""
+
+import asyncio
+import time
+
+from google.adk.tools import ToolContext
+from google.cloud import bigquery
+
+from data_analyst.sub_agents.bigquery.async_tools import (
+    run_blocking,
+    run_control,
+    run_detached,
+)
+from data_analyst.sub_agents.bigquery.query_policy import resolve_query_policy
+from data_analyst.sub_agents.bqml.tools import (
+    cancel_bqml_job,
+    format_bqml_job_result,
+)
+
+
+async def execute_bqml_code(
+    bqml_code: str,
+    project_id: str,
+    dataset_id: str,
+    tool_context: ToolContext = None,
+) -> str:
+    """
+    Executes BigQuery ML code.
+    """
+
+    tenant_id = tool_context.state.get("tenant_id") if tool_context else None
+    policy = resolve_query_policy("execute_bqml_code", tenant_id)
+
+    client = bigquery.Client(project=project_id)
+
+    try:
+        query_job = await run_blocking(
+            client.query, bqml_code, job_config=policy.job_config()
+        )
+        start_time = time.time()
+
+        # Sleep on the event loop between polls rather than in a thread: BQML
+        # jobs such as model training can run for many minutes.
+        try:
+            while not await run_control(query_job.done):
+                elapsed_time = time.time() - start_time
+                if policy.timeout_seconds and elapsed_time > policy.timeout_seconds:
+                    return await run_control(
+                        cancel_bqml_job, query_job, policy.timeout_seconds
+                    )
+                print(
+                    f"Query Job Status: {query_job.state}, Elapsed Time:"
+                    f" {elapsed_time:.2f} seconds. Job ID: {query_job.job_id}"
+                )
+                await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            # The session ended; nobody will read the result. The cancel
+            # request must not block the event loop.
+            run_detached(query_job.cancel)
+            raise
+
+        return await run_blocking(format_bqml_job_result, query_job)
+
+    except Exception as e:
+        return f"An error occurred: {str(e)}"
@@ -14,9 +14,12 @@
 
 import time
 import os
+from google.adk.tools import ToolContext
 from google.cloud import bigquery
 from vertexai import rag
 
+from data_analyst.sub_agents.bigquery.query_policy import resolve_query_policy
+
 
 def check_bq_models(dataset_id: str) -> str:
     """Lists models in a BigQuery dataset and returns them as a string.
@@ -48,26 +51,29 @@ def check_bq_models(dataset_id: str) -> str:
         return f"An error occurred: {str(e)}"
 
 
-def execute_bqml_code(bqml_code: str, project_id: str, dataset_id: str) -> str:
+def execute_bqml_code(
+    bqml_code: str,
+    project_id: str,
+    dataset_id: str,
+    tool_context: ToolContext = None,
+) -> str:
     """
     Executes BigQuery ML code.
     """
 
-    # timeout_seconds = 1500
+    tenant_id = tool_context.state.get("tenant_id") if tool_context else None
+    policy = resolve_query_policy("execute_bqml_code", tenant_id)
 
     client = bigquery.Client(project=project_id)
 
     try:
-        query_job = client.query(bqml_code)
+        query_job = client.query(bqml_code, job_config=policy.job_config())
         start_time = time.time()
 
         while not query_job.done():
             elapsed_time = time.time() - start_time
-            # if elapsed_time > timeout_seconds:
-            #     return (
-            #         "Timeout: BigQuery job did not complete within"
-            #         f" {timeout_seconds} seconds. Job ID: {query_job.job_id}"
-            #     )
+            if policy.timeout_seconds and elapsed_time > policy.timeout_seconds:
+                return cancel_bqml_job(query_job, policy.timeout_seconds)
 
             print(
                 f"Query Job Status: {query_job.state}, Elapsed Time:"
@@ -75,25 +81,43 @@ def execute_bqml_code(bqml_code: str, project_id: str, dataset_id: str) -> str:
             )
             time.sleep(5)
 
-        if query_job.error_result:
-            return f"Error executing BigQuery ML code: {query_job.error_result}"
-
-        if query_job.exception():
-            return f"Exception during BigQuery ML execution: {query_job.exception()}"
-
-        results = query_job.result()
-        if results.total_rows > 0:
-            result_string = ""
-            for row in results:
-                result_string += str(dict(row.items())) + "\n"
-            return f"BigQuery ML code executed successfully. Results:\n{result_string}"
-        else:
-            return "BigQuery ML code executed successfully."
+        return format_bqml_job_result(query_job)
 
     except Exception as e:
         return f"An error occurred: {str(e)}"
 
 
+def cancel_bqml_job(query_job, timeout_seconds: float) -> str:
+    """Cancels a BQML job that ran out of time and says so."""
+    try:
+        query_job.cancel()
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print(f"Cancelling job {query_job.job_id} failed: {e}")
+    return (
+        "Timeout: BigQuery job did not complete within"
+        f" {timeout_seconds:g} seconds and was cancelled. Job ID:"
+        f" {query_job.job_id}"
+    )
+
+
+def format_bqml_job_result(query_job) -> str:
+    """Formats the outcome of a finished BigQuery ML job for the agent."""
+    if query_job.error_result:
+        return f"Error executing BigQuery ML code: {query_job.error_result}"
+
+    if query_job.exception():
+        return f"Exception during BigQuery ML execution: {query_job.exception()}"
+
+    results = query_job.result()
+    if results.total_rows > 0:
+        result_string = ""
+        for row in results:
+            result_string += str(dict(row.items())) + "\n"
+        return f"BigQuery ML code executed successfully. Results:\n{result_string}"
+    else:
+        return "BigQuery ML code executed successfully."
+
+
 def rag_response(query: str) -> str:
     """Retrieves contextually relevant information from a RAG corpus.
 
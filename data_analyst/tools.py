@@ -18,13 +18,41 @@
 -- then, it use NL2Py to do further data analysis as needed
 """
 
+import base64
+import json
+import os
+
+from google.adk.code_executors.code_execution_utils import File
+from google.adk.code_executors.code_executor_context import CodeExecutorContext
 from google.adk.tools import ToolContext
 from google.adk.tools.agent_tool import AgentTool
 
 from .sub_agents import ds_agent, db_agent
+from .sub_agents.bigquery.query_results import (
+    QUERY_RESULT_STATE_KEY,
+    QueryResult,
+    load_query_result,
+    load_query_result_preview,
+)
+from .sub_agents.bigquery.result_export import load_query_result_export
 from .sub_agents.search import search_agent
 from .sub_agents.rag import rag_agent
 
+# The format of the data file the analytics agent gets: "csv" or "parquet".
+ANALYTICS_INPUT_FILE_FORMAT = os.getenv("ANALYTICS_INPUT_FILE_FORMAT", "csv")
+# Number of rows of the data file shown in the analytics agent's prompt.
+ANALYTICS_PREVIEW_ROWS = int(os.getenv("ANALYTICS_PREVIEW_ROWS", "5"))
+# Maximum size of the data file, before base64 encoding; 0 sets no cap. Larger
+# results are cut to their first rows.
+ANALYTICS_INPUT_FILE_MAX_BYTES = int(
+    os.getenv("ANALYTICS_INPUT_FILE_MAX_BYTES", str(32 * 1024 * 1024))
+)
+
+_INPUT_FILE_MIME_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
 
 async def call_db_agent(
     question: str,
@@ -54,13 +82,36 @@ async def call_ds_agent(
     if question == "N/A":
         return tool_context.state["db_agent_output"]
 
-    input_data = tool_context.state["query_result"]
+    # The complete result when it was exported, otherwise the rows returned
+    # by the database agent.
+    query_result = load_query_result_export(
+        tool_context.state
+    ) or load_query_result(tool_context.state)
+
+    # The handle of a result that is no longer in memory still describes it.
+    preview = load_query_result_preview(tool_context.state)
+
+    if query_result is not None:
+        data_description = _attach_input_file(query_result, tool_context)
+    elif preview is not None:
+        data_description = (
+            f"The result of the previous query ({preview['num_rows']} rows,"
+            f" columns {', '.join(preview['columns'])}) is no longer available;"
+            f" its first rows were: {json.dumps(preview['preview'])}. Ask the"
+            " database agent to run the query again before analyzing it."
+        )
+    elif QUERY_RESULT_STATE_KEY in tool_context.state:
+        data_description = (
+            "The result of the previous query is no longer available. Ask the"
+            " database agent to run the query again before analyzing it."
+        )
+    else:
+        data_description = "No query result is available."
 
     question_with_data = f"""
   Question to answer: {question}
 
-  Actual data to analyze prevoius quesiton is already in the following:
-  {input_data}
+  {data_description}
 
   """
 
@@ -73,6 +124,94 @@ async def call_ds_agent(
     return ds_agent_output
 
 
+def _encode_input_file(query_result: QueryResult, file_format: str):
+    """Encodes a query result within `ANALYTICS_INPUT_FILE_MAX_BYTES`.
+
+    A result whose file would be larger is cut to as many of its first rows
+    as fit, estimated from the size per row of the larger file.
+
+    Args:
+        query_result: The rows to encode.
+        file_format: "csv" or "parquet".
+
+    Returns:
+        The file content and the number of rows it holds.
+    """
+    encode = (
+        QueryResult.to_parquet if file_format == "parquet" else QueryResult.to_csv
+    )
+    rows = query_result
+    content = encode(rows)
+    while (
+        ANALYTICS_INPUT_FILE_MAX_BYTES
+        and len(content) > ANALYTICS_INPUT_FILE_MAX_BYTES
+        and rows.num_rows
+    ):
+        num_rows = min(
+            rows.num_rows - 1,
+            rows.num_rows * ANALYTICS_INPUT_FILE_MAX_BYTES // len(content),
+        )
+        rows = query_result.head(num_rows)
+        content = encode(rows)
+    return content, rows.num_rows
+
+
+def _attach_input_file(query_result: QueryResult, tool_context: ToolContext) -> str:
+    """Hands a query result to the analytics agent's code executor as a file.
+
+    The rows go into the executor's input files rather than the prompt, so the
+    prompt only grows with the number of columns. Results larger than
+    `ANALYTICS_INPUT_FILE_MAX_BYTES` are cut to their first rows, which the
+    description says.
+
+    Args:
+        query_result: The rows to analyze.
+        tool_context: The tool context of the root agent, whose state the
+            analytics agent inherits.
+
+    Returns:
+        The description of the data for the prompt: file name, row count,
+        schema and the first rows.
+    """
+    file_format = ANALYTICS_INPUT_FILE_FORMAT
+    file_name = f"query_result_{query_result.result_id[:8]}.{file_format}"
+    content, num_rows = _encode_input_file(query_result, file_format)
+    code_executor_context = CodeExecutorContext(tool_context.state)
+    code_executor_context.clear_input_files()
+    code_executor_context.add_input_files(
+        [
+            File(
+                name=file_name,
+                content=base64.b64encode(content).decode(),
+                mime_type=_INPUT_FILE_MIME_TYPES[file_format],
+            )
+        ]
+    )
+
+    if num_rows < query_result.num_rows:
+        row_count = (
+            f"only the first {num_rows} of {query_result.num_rows} rows, as the"
+            f" full result exceeds {ANALYTICS_INPUT_FILE_MAX_BYTES} bytes; say"
+            " so in the answer"
+        )
+    else:
+        row_count = f"{num_rows} rows"
+    schema = "\n".join(
+        f"  - {field.name}: {field.type}" for field in query_result.table.schema
+    )
+    # Nested columns are JSON-encoded in CSV, so this works for every type.
+    preview = query_result.head(ANALYTICS_PREVIEW_ROWS).to_csv().decode()
+    return f"""Actual data to analyze previous question is in the file `{file_name}`
+  ({file_format}, {row_count}). Load it, e.g. with
+  `pd.read_{file_format}('{file_name}')`, unless it is already loaded.
+
+  Columns:
+{schema}
+
+  First rows:
+{preview}"""
+
+
 async def call_search_agent(
     question: str,
     tool_context: ToolContext,
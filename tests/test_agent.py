@@ -0,0 +1,55 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests of the per-session schema of the root agent instruction."""
+
+import types
+
+from data_analyst import agent
+
+
+def make_callback_context(question):
+    """Returns a callback context of a new session asking `question`."""
+    return types.SimpleNamespace(
+        state={},
+        user_content=types.SimpleNamespace(
+            parts=[types.SimpleNamespace(text=question)]
+        ),
+    )
+
+
+def test_sessions_get_the_schema_linked_to_their_own_question(monkeypatch):
+    """Concurrent sessions keep their linked schema in their own state."""
+    monkeypatch.setattr(
+        agent, "get_bq_database_settings", lambda: {"bq_ddl_schema": "full"}
+    )
+    monkeypatch.setattr(
+        agent, "get_bq_linked_schema", lambda question, settings: f"-- {question}"
+    )
+    sales = make_callback_context("sales per store")
+    users = make_callback_context("active users")
+    agent.setup_before_agent_call(sales)
+    agent.setup_before_agent_call(users)
+
+    sales_instruction = agent.root_instruction(sales)
+    users_instruction = agent.root_instruction(users)
+    assert "-- sales per store" in sales_instruction
+    assert "-- active users" not in sales_instruction
+    assert "-- active users" in users_instruction
+
+
+def test_instruction_without_a_linked_schema():
+    """Before the callback ran, the instruction has no schema section."""
+    context = types.SimpleNamespace(state={})
+    assert agent.root_instruction(context) == agent.return_instructions_root()
@@ -0,0 +1,55 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests of the thread pools behind the asynchronous tools."""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from data_analyst.sub_agents.bigquery import async_tools
+
+
+def test_control_calls_do_not_wait_for_the_tool_pool(monkeypatch):
+    """A cancel runs while every tool pool thread waits for a job."""
+    busy_pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(async_tools, "_executor", busy_pool)
+    job_done = threading.Event()
+    busy_pool.submit(job_done.wait, 5)
+
+    async def cancel_job():
+        return await asyncio.wait_for(
+            async_tools.run_control(job_done.set), timeout=5
+        )
+
+    try:
+        asyncio.run(cancel_job())
+        assert job_done.is_set()
+    finally:
+        job_done.set()
+        busy_pool.shutdown()
+
+
+def test_detached_calls_run_on_the_control_pool():
+    """Clean-up calls run on the control pool."""
+    thread_name = []
+    ran = threading.Event()
+
+    def cancel():
+        thread_name.append(threading.current_thread().name)
+        ran.set()
+
+    async_tools.run_detached(cancel)
+    assert ran.wait(5)
+    assert thread_name[0].startswith("bigquery_control")
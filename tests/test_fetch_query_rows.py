@@ -0,0 +1,61 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests of the bounded fetching of query results."""
+
+import types
+
+import pyarrow as pa
+
+from data_analyst.sub_agents.bigquery import tools
+
+
+class FakeQueryJob:
+    """A finished query job that produced `total_rows` rows."""
+
+    def __init__(self, total_rows):
+        self.total_rows = total_rows
+        self.requested = None
+
+    def result(self, max_results=None, page_size=None):
+        """Returns the first `max_results` rows, like `QueryJob.result`."""
+        self.requested = (max_results, page_size)
+        num_rows = min(self.total_rows, max_results)
+        table = pa.table({"x": list(range(num_rows))})
+        return types.SimpleNamespace(
+            schema=["x"],
+            total_rows=self.total_rows,
+            to_arrow=lambda create_bqstorage_client: table,
+        )
+
+
+def test_only_the_returned_rows_are_fetched(monkeypatch):
+    """A larger result is cut to `MAX_NUM_ROWS` rows and reported truncated."""
+    monkeypatch.setattr(tools, "BQ_STORAGE_EXPORT", False)
+    job = FakeQueryJob(tools.MAX_NUM_ROWS + 1)
+    query_result, truncated, export = tools._fetch_query_rows(job)
+    assert job.requested == (tools.MAX_NUM_ROWS, tools.MAX_NUM_ROWS)
+    assert query_result.num_rows == tools.MAX_NUM_ROWS
+    assert truncated
+    assert export is None
+
+
+def test_complete_results_are_not_truncated(monkeypatch):
+    """A result of at most `MAX_NUM_ROWS` rows is returned in full."""
+    monkeypatch.setattr(tools, "BQ_STORAGE_EXPORT", False)
+    query_result, truncated, _ = tools._fetch_query_rows(
+        FakeQueryJob(tools.MAX_NUM_ROWS)
+    )
+    assert query_result.num_rows == tools.MAX_NUM_ROWS
+    assert not truncated
@@ -0,0 +1,100 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests of the data file that hands query results to the analytics agent."""
+
+import base64
+import io
+import types
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from data_analyst import tools
+from data_analyst.sub_agents.bigquery.query_results import QueryResult
+
+
+class FakeCodeExecutorContext:
+    """Records the input files added to the code executor."""
+
+    files = []
+
+    def __init__(self, state):
+        del state
+
+    def clear_input_files(self):
+        FakeCodeExecutorContext.files = []
+
+    def add_input_files(self, files):
+        FakeCodeExecutorContext.files.extend(files)
+
+
+@pytest.fixture(autouse=True)
+def code_executor(monkeypatch):
+    """Replaces the code executor's input files with a list."""
+    monkeypatch.setattr(tools, "CodeExecutorContext", FakeCodeExecutorContext)
+    monkeypatch.setattr(tools, "File", types.SimpleNamespace)
+
+
+def attach(query_result, file_format):
+    """Attaches a result and returns the description and the file's rows."""
+    tool_context = types.SimpleNamespace(state={})
+    description = tools._attach_input_file(query_result, tool_context)
+    (file,) = FakeCodeExecutorContext.files
+    content = io.BytesIO(base64.b64decode(file.content))
+    read = pd.read_parquet if file_format == "parquet" else pd.read_csv
+    return description, read(content)
+
+
+def nested_result():
+    """Returns a result with ARRAY and STRUCT columns."""
+    return QueryResult(
+        pa.table(
+            {
+                "id": [1, 2],
+                "tags": [["a", "b"], None],
+                "address": [{"city": "Paris"}, {"city": "Oslo"}],
+            }
+        )
+    )
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+def test_nested_columns_are_attached(monkeypatch, file_format):
+    """ARRAY and STRUCT columns neither break the file nor the preview."""
+    monkeypatch.setattr(tools, "ANALYTICS_INPUT_FILE_FORMAT", file_format)
+    description, rows = attach(nested_result(), file_format)
+    assert len(rows) == 2
+    assert '"[""a"", ""b""]"' in description
+    assert '"{""city"": ""Paris""}"' in description
+
+
+def test_large_results_are_cut_to_their_first_rows(monkeypatch):
+    """Over the size cap, the file holds the first rows and the prompt says so."""
+    monkeypatch.setattr(tools, "ANALYTICS_INPUT_FILE_FORMAT", "csv")
+    monkeypatch.setattr(tools, "ANALYTICS_INPUT_FILE_MAX_BYTES", 1000)
+    query_result = QueryResult(pa.table({"id": list(range(10000))}))
+    description, rows = attach(query_result, "csv")
+    assert 0 < len(rows) < 10000
+    assert rows["id"].tolist() == list(range(len(rows)))
+    assert f"only the first {len(rows)} of 10000 rows" in description
+
+
+def test_small_results_are_attached_in_full(monkeypatch):
+    """Under the size cap, every row is attached."""
+    monkeypatch.setattr(tools, "ANALYTICS_INPUT_FILE_FORMAT", "csv")
+    description, rows = attach(QueryResult(pa.table({"id": [1, 2, 3]})), "csv")
+    assert len(rows) == 3
+    assert "(csv, 3 rows)" in description
@@ -0,0 +1,94 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests of the persistent cache of generated SQL."""
+
+from data_analyst.sub_agents.bigquery import tools
+from data_analyst.sub_agents.bigquery.nl2sql_cache import (
+    NL2SQLCache,
+    make_nl2sql_cache_key,
+    normalize_question,
+)
+from data_analyst.sub_agents.bigquery.schema_cache import make_table_entry
+
+
+def test_normalize_question_drops_case_punctuation_and_filler_words():
+    """Rephrasings that ask the same thing normalize alike."""
+    assert (
+        normalize_question("Can you show me the   total sales per region?")
+        == normalize_question("total sales per region")
+        == "total sales per region"
+    )
+
+
+def test_normalize_question_keeps_literals_numbers_and_negations():
+    """Words and values that change the SQL are kept."""
+    assert normalize_question("Top 10 stores NOT in 'New York'.") == (
+        "top 10 stores not in 'New York'"
+    )
+    assert normalize_question("top 5 stores") != normalize_question("top 50 stores")
+
+
+def test_cache_key_covers_schema_and_settings():
+    """Keys differ by schema fingerprint and NL2SQL settings."""
+    settings = {"method": "BASELINE"}
+    key = make_nl2sql_cache_key("What are total sales?", "fp1", settings)
+    assert make_nl2sql_cache_key("total sales", "fp1", settings) == key
+    assert make_nl2sql_cache_key("total sales", "fp2", settings) != key
+    assert make_nl2sql_cache_key("total sales", "fp1", {"method": "CHASE"}) != key
+
+
+def test_entries_persist_across_instances(tmp_path):
+    """Cached SQL is reloaded from the cache file."""
+    path = str(tmp_path / "nl2sql.json")
+    NL2SQLCache(path, max_entries=10).put("k", "SELECT 1")
+    assert NL2SQLCache(path, max_entries=10).get("k") == "SELECT 1"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    """Over `max_entries`, the least recently used entry goes first."""
+    cache = NL2SQLCache(str(tmp_path / "nl2sql.json"), max_entries=2)
+    cache.put("a", "SELECT 1")
+    cache.put("b", "SELECT 2")
+    cache.get("a")
+    cache.put("c", "SELECT 3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "SELECT 1"
+    assert cache.get("c") == "SELECT 3"
+
+
+def test_entries_of_other_schemas_are_kept(tmp_path):
+    """Storing SQL for a new schema does not drop that of the previous one."""
+    cache = NL2SQLCache(str(tmp_path / "nl2sql.json"), max_entries=10)
+    old_key = make_nl2sql_cache_key("total sales", "fp1", {})
+    new_key = make_nl2sql_cache_key("total sales", "fp2", {})
+    cache.put(old_key, "SELECT 1")
+    cache.put(new_key, "SELECT 2")
+    assert cache.get(old_key) == "SELECT 1"
+    assert cache.get(new_key) == "SELECT 2"
+
+
+def test_schema_fingerprint_only_covers_the_structure():
+    """Refreshed sample rows keep the fingerprint; new columns change it."""
+    column = {"name": "id", "type": "INTEGER", "mode": "NULLABLE"}
+    tables = {
+        "t": make_table_entry(
+            "p.d.t", columns=[column], sample_rows=[["1"]]
+        )
+    }
+    fingerprint = tools.get_schema_fingerprint(tables)
+    tables["t"] = dict(tables["t"], sample_rows=[["2"]], profile={"id": {}})
+    assert tools.get_schema_fingerprint(tables) == fingerprint
+    tables["t"] = dict(tables["t"], columns=[column, dict(column, name="name")])
+    assert tools.get_schema_fingerprint(tables) != fingerprint
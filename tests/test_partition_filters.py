@@ -0,0 +1,92 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests of the detection of unfiltered scans of partitioned tables."""
+
+import pytest
+
+from data_analyst.sub_agents.bigquery.partition_filters import (
+    find_missing_partition_filters,
+    partition_filter_columns,
+)
+from data_analyst.sub_agents.bigquery.sql_parsing import ParsedQuery
+
+TABLES = {
+    "events": {"table_ref": "p.d.events", "partitioning": {"field": "ts"}},
+    "logs": {"table_ref": "p.d.logs", "partitioning": {"field": None}},
+    "users": {"table_ref": "p.d.users", "partitioning": None},
+}
+
+
+def find_missing(sql):
+    """Runs `find_missing_partition_filters` on a query of dataset `p.d`."""
+    statements = ParsedQuery(sql).statements
+    return find_missing_partition_filters(statements, TABLES, "p", "d")
+
+
+def test_partition_filter_columns():
+    """Column and ingestion time partitioning are filtered differently."""
+    assert partition_filter_columns(TABLES["events"]) == {"ts"}
+    assert partition_filter_columns(TABLES["logs"]) == {
+        "_partitiontime",
+        "_partitiondate",
+    }
+    assert partition_filter_columns(TABLES["users"]) == frozenset()
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT * FROM events WHERE ts > '2025-01-01'",
+        "SELECT * FROM d.events AS e WHERE e.TS > '2025-01-01'",
+        "SELECT * FROM logs WHERE _PARTITIONDATE = '2025-01-01'",
+        "SELECT * FROM users",
+        "SELECT * FROM other.events",
+        "SELECT * FROM (SELECT * FROM events) WHERE ts > '2025-01-01'",
+        "SELECT * FROM (SELECT ts AS day FROM events) AS e WHERE e.day > '2025-01-01'",
+        "WITH recent AS (SELECT id, ts FROM events) "
+        "SELECT * FROM recent WHERE ts > '2025-01-01'",
+    ],
+)
+def test_filtered_or_unpartitioned_scans_pass(sql):
+    """Filtered scans, also by an outer query, and other tables pass."""
+    assert find_missing(sql) == []
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT * FROM events",
+        "SELECT * FROM `p.d.events` WHERE id = 1",
+        "SELECT * FROM events e JOIN users u ON e.id = u.id WHERE u.ts > 0",
+        "SELECT * FROM (SELECT id FROM events) WHERE id > 0",
+        "SELECT * FROM (SELECT * EXCEPT (ts) FROM events) WHERE ts > 0",
+        "SELECT * FROM (SELECT ts FROM events) AS e JOIN users AS u "
+        "ON e.ts = u.ts WHERE u.ts > 0",
+        "WITH recent AS (SELECT ts FROM events) "
+        "SELECT * FROM recent WHERE ts > 0 UNION ALL SELECT * FROM recent",
+    ],
+)
+def test_unfiltered_scans_are_reported(sql):
+    """Scans without a filter on their own partition column are reported."""
+    assert find_missing(sql) == ["p.d.events"]
+
+
+def test_ctes_are_not_tables():
+    """A CTE named like a partitioned table is not checked itself."""
+    sql = (
+        "WITH events AS (SELECT * FROM `p.d.events` WHERE ts > '2025-01-01') "
+        "SELECT * FROM events"
+    )
+    assert find_missing(sql) == []
@@ -0,0 +1,84 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests of the in-process query result cache."""
+
+import datetime
+
+from data_analyst.sub_agents.bigquery import query_cache
+from data_analyst.sub_agents.bigquery.query_cache import QueryResultCache
+
+MODIFIED = {"p.d.t": datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)}
+
+
+def make_cache(**kwargs):
+    """Returns a cache with generous limits, overridden by `kwargs`."""
+    settings = {"max_entries": 10, "ttl_seconds": 600, "max_bytes": 10**6}
+    settings.update(kwargs)
+    return QueryResultCache(**settings)
+
+
+def test_get_returns_a_copy_of_the_cached_result():
+    """A hit returns the result; changing the copy does not change the cache."""
+    cache = make_cache()
+    cache.put("k", {"total_rows": 3}, MODIFIED)
+    result = cache.get("k", MODIFIED)
+    assert result == {"total_rows": 3}
+    result["total_rows"] = 0
+    assert cache.get("k", MODIFIED) == {"total_rows": 3}
+    assert cache.get("other", MODIFIED) is None
+
+
+def test_modified_tables_invalidate_the_result():
+    """A result is dropped once a table it read changed."""
+    cache = make_cache()
+    cache.put("k", {"total_rows": 3}, MODIFIED)
+    changed = {"p.d.t": MODIFIED["p.d.t"] + datetime.timedelta(seconds=1)}
+    assert cache.get("k", changed) is None
+    assert cache.get("k", MODIFIED) is None
+
+
+def test_expired_results_are_dropped(monkeypatch):
+    """A result is not served after its TTL."""
+    now = [1000.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    cache = make_cache(ttl_seconds=10)
+    cache.put("k", {"total_rows": 3}, MODIFIED)
+    now[0] += 5
+    assert cache.get("k", MODIFIED) is not None
+    now[0] += 10
+    assert cache.get("k", MODIFIED) is None
+
+
+def test_least_recently_used_results_are_evicted():
+    """Over `max_entries`, the least recently used result goes first."""
+    cache = make_cache(max_entries=2)
+    cache.put("a", {"x": 1}, MODIFIED)
+    cache.put("b", {"x": 2}, MODIFIED)
+    cache.get("a", MODIFIED)
+    cache.put("c", {"x": 3}, MODIFIED)
+    assert cache.get("b", MODIFIED) is None
+    assert cache.get("a", MODIFIED) is not None
+    assert cache.get("c", MODIFIED) is not None
+
+
+def test_memory_cap():
+    """Results are evicted to stay within `max_bytes`; larger ones are skipped."""
+    cache = make_cache(max_bytes=100)
+    cache.put("big", {"x": 1}, MODIFIED, size=101)
+    assert cache.get("big", MODIFIED) is None
+    cache.put("a", {"x": 1}, MODIFIED, size=60)
+    cache.put("b", {"x": 2}, MODIFIED, size=60)
+    assert cache.get("a", MODIFIED) is None
+    assert cache.get("b", MODIFIED) is not None
@@ -0,0 +1,88 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests of the Arrow-backed query results and their session state handles."""
+
+import decimal
+import json
+
+import pyarrow as pa
+import pytest
+
+from data_analyst.sub_agents.bigquery import query_results
+from data_analyst.sub_agents.bigquery.query_results import (
+    QueryResult,
+    QueryResultStore,
+    load_query_result,
+    load_query_result_preview,
+    save_query_result,
+)
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch):
+    """Gives each test an empty result store."""
+    store = QueryResultStore(max_bytes=1024 * 1024)
+    monkeypatch.setattr(query_results, "result_store", store)
+    return store
+
+
+def make_result(num_rows):
+    """Returns a result with an id and a NUMERIC column."""
+    return QueryResult(
+        pa.table(
+            {
+                "id": list(range(num_rows)),
+                "price": [decimal.Decimal("1.50")] * num_rows,
+            }
+        )
+    )
+
+
+def test_handle_holds_only_a_bounded_preview():
+    """Session state gets the shape and a few rows, never all of them."""
+    state = {}
+    save_query_result(state, make_result(1000))
+    handle = state[query_results.QUERY_RESULT_STATE_KEY]
+    assert handle["num_rows"] == 1000
+    assert handle["columns"] == ["id", "price"]
+    assert len(handle["preview"]) == query_results.BQ_RESULT_PREVIEW_ROWS
+    assert "rows" not in handle
+    assert json.loads(json.dumps(handle))["preview"][0] == {
+        "id": 0,
+        "price": "1.50",
+    }
+
+
+def test_stored_results_are_loaded_in_full():
+    """The rows are read from the store, not from session state."""
+    state = {}
+    result = make_result(1000)
+    save_query_result(state, result)
+    assert load_query_result(state) is result
+
+
+def test_evicted_results_leave_only_the_preview(store):
+    """A result missing from the store is not rebuilt from its preview."""
+    state = {}
+    save_query_result(state, make_result(1000))
+    store.put(QueryResult(pa.table({"x": [0] * 1024 * 1024})))
+    assert load_query_result(state) is None
+    assert load_query_result_preview(state)["num_rows"] == 1000
+
+
+def test_sessions_without_results_load_nothing():
+    """Nothing is loaded before the first query."""
+    assert load_query_result({}) is None
+    assert load_query_result_preview({}) is None
@@ -0,0 +1,141 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests of the retries of Gemini calls."""
+
+import asyncio
+
+from google.api_core import exceptions
+import pytest
+
+from data_analyst.sub_agents.bigquery.chase_sql import retry_policy
+from data_analyst.sub_agents.bigquery.chase_sql.retry_policy import (
+    RetryPolicy,
+    is_retryable_error,
+)
+
+
+class FlakyCall:
+    """Raises the given errors in turn, then returns "ok"."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+    async def call_async(self):
+        """Like `__call__`, as a coroutine."""
+        return self()
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    """Skips the backoff delays."""
+    monkeypatch.setattr(retry_policy.time, "sleep", lambda seconds: None)
+
+    async def sleep(seconds):
+        del seconds
+
+    monkeypatch.setattr(retry_policy.asyncio, "sleep", sleep)
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        exceptions.ResourceExhausted("quota"),
+        exceptions.ServiceUnavailable("unavailable"),
+        exceptions.InternalServerError("internal"),
+        TimeoutError("timed out"),
+        ConnectionResetError("reset"),
+    ],
+)
+def test_transient_errors_are_retryable(error):
+    """Quota, server and network errors are retried."""
+    assert is_retryable_error(error)
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        exceptions.InvalidArgument("invalid"),
+        exceptions.PermissionDenied("denied"),
+        ValueError("blocked by the safety filters"),
+    ],
+)
+def test_permanent_errors_are_fatal(error):
+    """Errors that would recur on every attempt are not retried."""
+    assert not is_retryable_error(error)
+
+
+def test_transient_failures_are_retried():
+    """A call succeeds once its transient failures stop."""
+    policy = RetryPolicy()
+    func = FlakyCall(exceptions.ResourceExhausted("quota"), TimeoutError())
+    assert policy.call(func) == "ok"
+    assert func.calls == 3
+    stats = policy.stats()
+    assert (stats["calls"], stats["attempts"], stats["retries"]) == (1, 3, 2)
+    assert stats["successes"] == 1
+
+
+def test_fatal_errors_are_raised_at_once():
+    """A fatal error is raised without a retry."""
+    policy = RetryPolicy()
+    func = FlakyCall(exceptions.InvalidArgument("invalid"))
+    with pytest.raises(exceptions.InvalidArgument):
+        policy.call(func)
+    assert func.calls == 1
+    assert policy.stats()["fatal_errors"] == 1
+
+
+def test_attempts_are_limited():
+    """The last error is raised once `max_attempts` attempts failed."""
+    policy = RetryPolicy(max_attempts=2)
+    func = FlakyCall(*[exceptions.ServiceUnavailable("unavailable")] * 3)
+    with pytest.raises(exceptions.ServiceUnavailable):
+        policy.call(func)
+    assert func.calls == 2
+    assert policy.stats()["exhausted"] == 1
+
+
+def test_retries_stop_at_the_deadline():
+    """No retry starts after the deadline."""
+    policy = RetryPolicy(base_delay=10, deadline_seconds=0)
+    func = FlakyCall(exceptions.ResourceExhausted("quota"))
+    with pytest.raises(exceptions.ResourceExhausted):
+        policy.call(func)
+    assert func.calls == 1
+    assert policy.stats()["deadline_exceeded"] == 1
+
+
+def test_call_async_retries_transient_failures():
+    """Coroutine functions are retried like functions."""
+    policy = RetryPolicy()
+    func = FlakyCall(exceptions.ResourceExhausted("quota"))
+    assert asyncio.run(policy.call_async(func.call_async)) == "ok"
+    assert func.calls == 2
+    assert policy.stats()["retries"] == 1
+
+
+def test_delays_are_jittered_and_capped():
+    """Delays stay between 0 and the capped exponential backoff."""
+    policy = RetryPolicy(base_delay=1, max_delay=5, backoff_factor=2)
+    for retry_number, bound in ((1, 1), (2, 2), (3, 4), (4, 5), (10, 5)):
+        delays = [policy.get_delay(retry_number) for _ in range(50)]
+        assert all(0 <= delay <= bound for delay in delays)
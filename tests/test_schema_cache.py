@@ -0,0 +1,71 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests of the reuse of cached schema entries across configurations."""
+
+from data_analyst.sub_agents.bigquery import tools
+from data_analyst.sub_agents.bigquery.schema_cache import make_table_entry
+
+
+def make_entry(**kwargs):
+    """Returns an entry fetched with the current settings."""
+    return make_table_entry(
+        "p.d.t",
+        columns=[{"name": "id", "type": "INTEGER", "mode": "NULLABLE"}],
+        sample_rows=[["1"]],
+        settings=tools._get_table_entry_settings(),
+        **kwargs,
+    )
+
+
+def test_entries_of_the_current_settings_are_reused(monkeypatch):
+    """Entries fetched with the current settings need no re-fetch."""
+    monkeypatch.setattr(tools, "BQ_SCHEMA_SAMPLE_MODE", "rows")
+    monkeypatch.setattr(tools, "BQ_VALUE_INDEX", False)
+    assert tools._has_required_data(make_entry())
+
+
+def test_entries_of_another_sample_mode_are_refetched(monkeypatch):
+    """Rows fetched in `rows` mode are not reused in `profile` mode."""
+    monkeypatch.setattr(tools, "BQ_SCHEMA_SAMPLE_MODE", "rows")
+    entry = make_entry()
+    tables = {"t": entry}
+    monkeypatch.setattr(tools, "BQ_SCHEMA_SAMPLE_MODE", "profile")
+    assert not tools._has_required_data(entry)
+    assert not tools._has_current_settings(tables)
+
+
+def test_entries_without_a_profile_are_refetched(monkeypatch):
+    """An entry whose profile is None is profiled again."""
+    monkeypatch.setattr(tools, "BQ_SCHEMA_SAMPLE_MODE", "profile")
+    monkeypatch.setattr(tools, "BQ_VALUE_INDEX", False)
+    assert not tools._has_required_data(make_entry())
+    assert tools._has_required_data(make_entry(profile={"id": {}}))
+
+
+def test_entries_without_values_are_refetched(monkeypatch):
+    """Entries fetched before the value index was enabled are indexed."""
+    monkeypatch.setattr(tools, "BQ_SCHEMA_SAMPLE_MODE", "rows")
+    monkeypatch.setattr(tools, "BQ_VALUE_INDEX", True)
+    assert not tools._has_required_data(make_entry())
+    assert tools._has_required_data(make_entry(values={}))
+
+
+def test_entries_of_another_value_limit_are_refetched(monkeypatch):
+    """Changing `BQ_VALUE_INDEX_MAX_DISTINCT` re-indexes the values."""
+    monkeypatch.setattr(tools, "BQ_SCHEMA_SAMPLE_MODE", "rows")
+    monkeypatch.setattr(tools, "BQ_VALUE_INDEX", True)
+    entry = make_entry(values={})
+    monkeypatch.setattr(tools, "BQ_VALUE_INDEX_MAX_DISTINCT", 10)
+    assert not tools._has_required_data(entry)
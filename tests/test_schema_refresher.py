@@ -0,0 +1,158 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests of the background schema refresher."""
+
+import threading
+
+import pytest
+
+from data_analyst.sub_agents.bigquery import tools
+from data_analyst.sub_agents.bigquery.schema_cache import make_table_entry
+
+
+class StopRefresher(Exception):
+    """Ends the refresher loop of a test."""
+
+
+def make_tables(*column_names):
+    """Returns the schema cache entries of one table with the given columns."""
+    return {
+        "t": make_table_entry(
+            "p.d.t",
+            columns=[
+                {
+                    "name": name,
+                    "type": "STRING",
+                    "mode": "NULLABLE",
+                    "description": None,
+                }
+                for name in column_names
+            ],
+            sample_rows=[],
+        )
+    }
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    """Isolates the database settings of a test."""
+    monkeypatch.setenv("BQ_PROJECT_ID", "p")
+    monkeypatch.setenv("BQ_DATASET_ID", "d")
+    monkeypatch.setattr(tools, "database_settings", None)
+    monkeypatch.setattr(tools, "_schema_tables", None)
+    monkeypatch.setattr(tools, "schema_cache", None)
+
+
+def test_swapped_settings_are_always_complete():
+    """Readers see the old or the new settings in full, never a mix."""
+    old_tables, new_tables = make_tables("a"), make_tables("a", "b")
+    tools._swap_database_settings(old_tables)
+    expected = {
+        tools.get_schema_fingerprint(tables): tools.schema_renderer.render(tables)[0]
+        for tables in (old_tables, new_tables)
+    }
+    done = threading.Event()
+    seen = []
+
+    def read():
+        while not done.is_set():
+            settings = tools.database_settings
+            seen.append(
+                expected.get(settings["bq_schema_fingerprint"])
+                == settings["bq_ddl_schema"]
+            )
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for i in range(200):
+        tools._swap_database_settings(new_tables if i % 2 else old_tables)
+    done.set()
+    reader.join()
+    assert seen and all(seen)
+
+
+def test_unchanged_schema_keeps_the_settings(monkeypatch):
+    """A refresh that finds no change does not replace the settings."""
+    tables = make_tables("a")
+    settings = tools._swap_database_settings(tables)
+    monkeypatch.setattr(
+        tools, "refresh_bigquery_schema_tables", lambda *args, **kwargs: tables
+    )
+    monkeypatch.setattr(tools, "get_bq_client", lambda: None)
+    assert tools.refresh_database_settings() is settings
+
+
+def test_failed_refresh_keeps_the_settings(monkeypatch):
+    """A failing background refresh is logged and the settings are kept."""
+    settings = tools._swap_database_settings(make_tables("a"))
+
+    def fail():
+        raise OSError("BigQuery unavailable")
+
+    monkeypatch.setattr(tools, "refresh_database_settings", fail)
+    assert not tools._refresh_database_settings_in_background()
+    assert tools.database_settings is settings
+
+
+def run_refresher(monkeypatch, outcomes, interval, revalidate_now=True):
+    """Runs the refresher loop with the given refresh outcomes.
+
+    Returns:
+      The delays the refresher slept for, until it exited or ran out of
+      outcomes.
+    """
+    outcomes = list(outcomes)
+    delays = []
+
+    def refresh():
+        if not outcomes:
+            raise StopRefresher()
+        return outcomes.pop(0)
+
+    monkeypatch.setattr(tools, "BQ_SCHEMA_REFRESH_INTERVAL_SECONDS", interval)
+    monkeypatch.setattr(tools, "_refresh_database_settings_in_background", refresh)
+    monkeypatch.setattr(tools.time, "sleep", delays.append)
+    try:
+        tools._run_schema_refresher(revalidate_now)
+    except StopRefresher:
+        pass
+    return delays
+
+
+def test_failed_revalidation_is_retried_with_backoff(monkeypatch):
+    """Without periodic refreshes, revalidation is retried until it succeeds."""
+    delays = run_refresher(monkeypatch, [False, False, False, True], interval=0)
+    base = tools._SCHEMA_REFRESH_RETRY_SECONDS
+    assert delays == [base, 2 * base, 4 * base]
+
+
+def test_retry_delays_are_capped(monkeypatch):
+    """Retry delays never exceed the maximum delay."""
+    delays = run_refresher(monkeypatch, [False] * 10, interval=0)
+    assert max(delays) == tools._SCHEMA_REFRESH_MAX_RETRY_SECONDS
+
+
+def test_periodic_refreshes_back_off_up_to_the_interval(monkeypatch):
+    """Failures shorten the next wait until the refresh succeeds again."""
+    base = tools._SCHEMA_REFRESH_RETRY_SECONDS
+    delays = run_refresher(
+        monkeypatch, [False, False, True, True], interval=3 * base
+    )
+    assert delays == [base, 2 * base, 3 * base, 3 * base]
+
+
+def test_refresher_without_work_exits(monkeypatch):
+    """Without revalidation or periodic refreshes, the thread does nothing."""
+    assert run_refresher(monkeypatch, [], interval=0, revalidate_now=False) == []
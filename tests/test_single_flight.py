@@ -0,0 +1,144 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests of the coalescing of identical concurrent jobs."""
+
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+from data_analyst.sub_agents.bigquery.single_flight import SingleFlight
+
+
+class FakeJob:
+    """A job that finishes once `finished` is set."""
+
+    def __init__(self, result="rows"):
+        self.result = result
+        self.finished = threading.Event()
+        self.cancelled = threading.Event()
+
+    def fetch(self):
+        """Waits for the job, like `QueryJob.result`."""
+        self.finished.wait(5)
+        if self.cancelled.is_set():
+            raise RuntimeError("cancelled")
+        return self.result
+
+    def cancel(self):
+        """Cancels the job, like `QueryJob.cancel`."""
+        self.cancelled.set()
+        self.finished.set()
+
+
+def run_concurrently(flights, job, num_callers, **kwargs):
+    """Calls `flights.do` for the same key from several threads."""
+    submitted = []
+
+    def submit():
+        submitted.append(job)
+        return job
+
+    with concurrent.futures.ThreadPoolExecutor(num_callers) as executor:
+        futures = [
+            executor.submit(
+                flights.do,
+                "key",
+                submit=submit,
+                fetch=FakeJob.fetch,
+                cancel=FakeJob.cancel,
+                **kwargs,
+            )
+            for _ in range(num_callers)
+        ]
+        # Every caller joins before the job finishes.
+        while flights._flights.get("key") is None or (
+            flights._flights["key"].waiters < num_callers
+        ):
+            time.sleep(0.01)
+        job.finished.set()
+        return [future.result() for future in futures], submitted
+
+
+def test_concurrent_callers_share_one_job():
+    """Identical concurrent calls submit one job and share its result."""
+    results, submitted = run_concurrently(SingleFlight(), FakeJob(), 4)
+    assert results == ["rows"] * 4
+    assert len(submitted) == 1
+
+
+def test_errors_are_raised():
+    """A failing job raises its error and is not kept in flight."""
+    flights = SingleFlight()
+
+    def submit():
+        raise ValueError("invalid query")
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            flights.do(
+                "key", submit=submit, fetch=FakeJob.fetch, cancel=FakeJob.cancel
+            )
+
+
+def test_sequential_calls_run_separate_jobs():
+    """A finished job is not reused by later calls."""
+    flights = SingleFlight()
+    jobs = [FakeJob("first"), FakeJob("second")]
+    for job in jobs:
+        job.finished.set()
+    results = [
+        flights.do(
+            "key",
+            submit=lambda job=job: job,
+            fetch=FakeJob.fetch,
+            cancel=FakeJob.cancel,
+        )
+        for job in jobs
+    ]
+    assert results == ["first", "second"]
+
+
+def test_timeout_cancels_an_abandoned_job():
+    """The job is cancelled once its only waiter timed out."""
+    flights = SingleFlight()
+    job = FakeJob()
+    with pytest.raises(concurrent.futures.TimeoutError):
+        flights.do(
+            "key",
+            submit=lambda: job,
+            fetch=FakeJob.fetch,
+            cancel=FakeJob.cancel,
+            timeout=0.1,
+        )
+    assert job.cancelled.wait(5)
+
+
+def test_cancelled_waiter_cancels_an_abandoned_job():
+    """The job is cancelled once its only waiter's session ended."""
+    flights = SingleFlight()
+    job = FakeJob()
+    cancelled = threading.Event()
+    cancelled.set()
+    with pytest.raises(concurrent.futures.CancelledError):
+        flights.do(
+            "key",
+            submit=lambda: job,
+            fetch=FakeJob.fetch,
+            cancel=FakeJob.cancel,
+            cancelled=cancelled,
+        )
+    assert job.cancelled.wait(5)
@@ -0,0 +1,139 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests of the single-parse SQL analysis used by run_bigquery_validation."""
+
+import types
+
+import pytest
+import sqlglot
+
+from data_analyst.sub_agents.bigquery import tools
+from data_analyst.sub_agents.bigquery.sql_parsing import ParsedQuery
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT * FROM t",
+        "SELECT created_at, update_time FROM t WHERE deleted = FALSE",
+        "WITH a AS (SELECT 1 AS x) SELECT x FROM a",
+        "SELECT 1 UNION ALL SELECT 2",
+    ],
+)
+def test_is_read_only_accepts_queries(sql):
+    """Queries are read-only, whatever their identifiers are called."""
+    assert ParsedQuery(sql).is_read_only()
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "DELETE FROM t WHERE TRUE",
+        "UPDATE t SET x = 1 WHERE TRUE",
+        "INSERT INTO t (x) VALUES (1)",
+        "DROP TABLE t",
+        "CREATE TABLE t2 AS SELECT * FROM t",
+        "MERGE t USING s ON t.id = s.id WHEN MATCHED THEN DELETE",
+        "SELECT 1; DROP TABLE t",
+    ],
+)
+def test_is_read_only_rejects_writes_and_scripts(sql):
+    """Writes and multi-statement scripts are rejected."""
+    assert not ParsedQuery(sql).is_read_only()
+
+
+def test_is_deterministic():
+    """Queries calling time or random functions are not deterministic."""
+    assert ParsedQuery("SELECT x FROM t").is_deterministic()
+    assert not ParsedQuery("SELECT CURRENT_DATE()").is_deterministic()
+    assert not ParsedQuery("SELECT RAND() FROM t").is_deterministic()
+
+
+def test_with_limit_adds_a_missing_limit():
+    """A query without a limit gets one."""
+    sql = ParsedQuery("SELECT x FROM t").with_limit(80)
+    assert sql.upper().endswith("LIMIT 80")
+
+
+def test_with_limit_tightens_a_larger_limit():
+    """A larger literal limit is lowered to the maximum."""
+    sql = ParsedQuery("SELECT x FROM t LIMIT 1000").with_limit(80)
+    assert "LIMIT 80" in sql.upper()
+    assert "1000" not in sql
+
+
+def test_with_limit_keeps_a_smaller_limit_and_subquery_limits():
+    """Sufficient limits leave the query text unchanged."""
+    sql = "SELECT x FROM t LIMIT 10"
+    assert ParsedQuery(sql).with_limit(80) == sql
+    subquery = ParsedQuery("SELECT x FROM (SELECT x FROM t LIMIT 1000)")
+    assert "LIMIT 1000" in subquery.with_limit(80).upper()
+
+
+def test_with_limit_leaves_non_queries_alone():
+    """Only queries get a limit."""
+    sql = "DELETE FROM t WHERE TRUE"
+    assert ParsedQuery(sql).with_limit(80) == sql
+
+
+def test_table_refs_resolves_names_and_skips_ctes():
+    """Table names are fully qualified and CTEs are left out."""
+    query = ParsedQuery(
+        "WITH recent AS (SELECT * FROM orders) "
+        "SELECT * FROM recent JOIN other.customers USING (id) "
+        "JOIN `p2.d2.items` USING (id)"
+    )
+    assert sorted(query.table_refs("p", "d")) == [
+        "p.d.orders",
+        "p.other.customers",
+        "p2.d2.items",
+    ]
+
+
+def test_cache_key_ignores_formatting():
+    """Whitespace, comments and keyword case do not change the key."""
+    key = ParsedQuery("SELECT x FROM t WHERE y = 1").cache_key("p", "d")
+    same = ParsedQuery("select x\n  from t -- rows\n where y = 1")
+    assert same.cache_key("p", "d") == key
+
+
+def test_cache_key_depends_on_query_and_defaults():
+    """Different queries, or default datasets, have different keys."""
+    key = ParsedQuery("SELECT x FROM t").cache_key("p", "d")
+    assert ParsedQuery("SELECT y FROM t").cache_key("p", "d") != key
+    assert ParsedQuery("SELECT x FROM t").cache_key("p", "other") != key
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT 'unterminated FROM t",
+        "SELECT FROM WHERE (",
+    ],
+)
+def test_unparseable_sql_raises_a_sqlglot_error(sql):
+    """Tokenizer and parser errors share the sqlglot base class."""
+    with pytest.raises(sqlglot.errors.SqlglotError):
+        ParsedQuery(sql)
+
+
+def test_run_bigquery_validation_rejects_untokenizable_sql():
+    """A tokenizer error is reported as invalid SQL instead of raised."""
+    tool_context = types.SimpleNamespace(state={})
+    result = tools.run_bigquery_validation(
+        "SELECT 'unterminated FROM t", tool_context
+    )
+    assert result["error_message"].startswith("Invalid SQL:")
+    assert result["query_result"] is None